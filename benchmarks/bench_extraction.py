@@ -0,0 +1,99 @@
+import argparse
+import json
+import os
+import time
+
+import extraction
+from benchmarks.stepstone_stub import StepstoneStub, make_padding
+from extraction import compile_spec, extract
+from parse_pool import ParsePool
+
+"""
+This module benchmarks the shared extraction engine (see extraction.py) with the detail pages of both sources.
+
+The Stepstone pages are the job pages of the stub server (stepstone_stub.py), the Indeed pages are generated with the
+same padding and contain the elements and the embedded JSON object of the "indeed_detail" spec. For every spec it
+reports the compile time of the spec and the time per page of `extract` in the current process and in the parse
+pool (one task per page, as in the scrapers). The benchmark only measures speed; the extracted fields are checked
+by tests/test_extraction.py.
+
+Usage:
+- ``python -m benchmarks.bench_extraction [--pages 200] [--padding-kb 200] [--workers N]``
+  (default: one worker process per CPU core)
+"""
+
+
+def indeed_html(job_id, padding):
+    """Return an Indeed job page with location, benefits, description and the embedded job data."""
+    initial_data = json.dumps({"hostQueryExecutionResult": {"data": {"jobData": {"results": [
+        {"job": {"key": f"{job_id:x}", "sourceEmployerName": f"Firma {job_id}"}}
+    ]}}}})
+    description = "".join(f"<p>Absatz {i} der Stellenanzeige {job_id}.</p>" for i in range(1, 9))
+    description += "<ul>" + "".join(f"<li>Aufgabe {i}</li>" for i in range(1, 6)) + "</ul>"
+    return (
+        "<!DOCTYPE html><html><head><title>Job</title>" + padding + "</head><body>"
+        f"<div id=\"jobLocationText\"><span>Berlin</span> <span>Mitte</span></div>"
+        "<div id=\"benefits\"><ul>" + "".join(f"<li>Benefit {i}</li>" for i in range(1, 6)) + "</ul></div>"
+        f"<div id=\"jobDescriptionText\">{description}</div>"
+        f"<script>window._initialData = {initial_data};</script></body></html>"
+    )
+
+
+def make_pages(pages, padding_kb):
+    stub = StepstoneStub(padding_kb=padding_kb)
+    padding = make_padding(padding_kb)
+    first = 10000000
+    return {
+        "stepstone_detail": [stub.detail_html(job_id) for job_id in range(first, first + pages)],
+        "indeed_detail": [indeed_html(job_id, padding) for job_id in range(first, first + pages)],
+    }
+
+
+def bench_spec(name, pages, workers):
+    """
+    Measure compile time, in-process extraction and extraction in the parse pool for one spec.
+
+    :return: A dictionary with the timings in milliseconds.
+    """
+    extraction._compile.cache_clear()
+    start = time.perf_counter()
+    compile_spec(name)
+    result = {"compile": (time.perf_counter() - start) * 1000}
+
+    start = time.perf_counter()
+    for html in pages:
+        extract(name, html)
+    result["inline"] = (time.perf_counter() - start) * 1000 / len(pages)
+
+    pool = ParsePool(workers)
+    try:
+        # Warm up the workers, so the measurement does not include their start and the spec compilation
+        for future in [pool.submit(extract, name, html) for html in pages[:pool.workers]]:
+            future.result()
+        start = time.perf_counter()
+        for future in [pool.submit(extract, name, html) for html in pages]:
+            future.result()
+        result["pool"] = (time.perf_counter() - start) * 1000 / len(pages)
+    finally:
+        pool.shutdown()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the extraction specs of Indeed and Stepstone.")
+    parser.add_argument("--pages", type=int, default=200)
+    parser.add_argument("--padding-kb", type=int, default=200)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    pages = make_pages(args.pages, args.padding_kb)
+    results = {name: bench_spec(name, spec_pages, args.workers) for name, spec_pages in pages.items()}
+
+    columns = ["compile", "inline", "pool"]
+    print(f"{'spec':<18} " + " ".join(f"{column:>9}" for column in columns) + "  (compile: ms, others: ms/page)")
+    for name, result in results.items():
+        print(f"{name:<18} " + " ".join(f"{result[column]:>9.2f}" for column in columns))
+
+
+if __name__ == "__main__":
+    main()
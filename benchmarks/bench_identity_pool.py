@@ -0,0 +1,112 @@
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.bench_stepstone_modes import PROJECT_PATH, REPO_ROOT, crawl, free_port, start_stub, stub_call
+
+"""
+This module exercises the identity rotation of the Stepstone crawler (see identity_pool.py) against local stand-ins.
+
+It starts the stub server and a set of stand-in proxies (benchmarks/proxy_stub.py), crawls the same pages once
+over the direct connection and once through the proxies with the same ``DOWNLOAD_DELAY``, and reports the wall time
+per page and how the requests were spread over proxies and user agents. Broken proxies (``--broken``) answer 502 and
+should be benched by the health scoring after a few requests.
+
+Usage:
+- ``python -m benchmarks.bench_identity_pool [--proxies 3] [--broken 1] [--delay 0.5]``
+"""
+
+
+def start_proxies(port, count, broken):
+    """
+    Start the stand-in proxies in a subprocess and wait until all of them accept connections.
+
+    :return: The proxy process.
+    """
+    process = subprocess.Popen(
+        [sys.executable, "-m", "benchmarks.proxy_stub", "--port", str(port), "--count", str(count),
+         "--broken", str(broken)],
+        cwd=REPO_ROOT, stdout=subprocess.DEVNULL,
+    )
+    for i in range(count):
+        for _ in range(100):
+            try:
+                with socket.create_connection(("127.0.0.1", port + i), timeout=0.1):
+                    break
+            except OSError:
+                time.sleep(0.1)
+        else:
+            process.kill()
+            raise RuntimeError("Stand-in proxies did not start")
+    return process
+
+
+def run_setup(base_url, name, proxy_urls, max_jobs, delay, workdir):
+    """
+    Run both spiders with the given proxies and collect the stub counters.
+
+    :return: A dictionary with pages, seconds, clients and user agents.
+    """
+    stub_call(base_url, "/__reset")
+    links_file = os.path.join(workdir, f"links_{name}.json")
+    job_title = f"bench-{name}"
+    settings = {"STEPSTONE_BASE_URL": base_url, "DOWNLOAD_DELAY": delay}
+    env = {**os.environ, "PROXY_URLS": ",".join(proxy_urls)}
+
+    start = time.perf_counter()
+    crawl("Links", {**settings, "FEEDS": json.dumps({links_file: {"format": "json", "overwrite": True}})},
+          {"job_title": job_title, "max_pages": max_jobs, "max_jobs": max_jobs}, env=env)
+    crawl("sitespider", settings, {"input_file": links_file, "job_title": job_title}, env=env)
+    elapsed = time.perf_counter() - start
+
+    stats = stub_call(base_url, "/__stats")
+    for name_ in os.listdir(PROJECT_PATH):
+        if name_.startswith(job_title):
+            os.remove(os.path.join(PROJECT_PATH, name_))
+    return {
+        "pages": stats["total_requests"],
+        "seconds": elapsed,
+        "clients": stats["clients"],
+        "user_agents": len(stats["user_agents"]),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare direct and proxied crawls with the identity rotation.")
+    parser.add_argument("--jobs", type=int, default=30)
+    parser.add_argument("--proxies", type=int, default=3)
+    parser.add_argument("--broken", type=int, default=0, help="number of stand-in proxies answering 502")
+    parser.add_argument("--delay", type=float, default=0.5, help="DOWNLOAD_DELAY (applies per identity)")
+    args = parser.parse_args()
+
+    port = free_port()
+    proxy_port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    proxy_urls = [f"http://127.0.0.1:{proxy_port + i}" for i in range(args.proxies)]
+    stub = start_stub(port, ["--padding-kb", "20"])
+    proxies = start_proxies(proxy_port, args.proxies, args.broken)
+    try:
+        with tempfile.TemporaryDirectory() as workdir:
+            results = {
+                "direct": run_setup(base_url, "direct", [], args.jobs, args.delay, workdir),
+                "proxies": run_setup(base_url, "proxies", proxy_urls, args.jobs, args.delay, workdir),
+            }
+    finally:
+        for process in (stub, proxies):
+            process.terminate()
+            process.wait()
+
+    print(f"{'setup':<8} {'pages':>6} {'ms/page':>8} {'UAs':>4}  requests per client")
+    for name, result in results.items():
+        pages = result["pages"] or 1
+        print(f"{name:<8} {result['pages']:>6} {result['seconds'] * 1000 / pages:>8.1f} {result['user_agents']:>4}  "
+              f"{result['clients']}")
+
+
+if __name__ == "__main__":
+    main()
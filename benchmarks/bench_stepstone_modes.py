@@ -0,0 +1,141 @@
+import argparse
+import json
+import os
+import socket
+import ssl
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+"""
+This module compares the HTML and the API fetch mode of the Stepstone spiders.
+
+It starts the local stub server (benchmarks/stepstone_stub.py), runs the Links and sitespider spiders in both
+modes against it and reports the transferred bytes and the wall time per job.
+
+Usage:
+- ``python -m benchmarks.bench_stepstone_modes``
+"""
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PROJECT_PATH = os.path.join(REPO_ROOT, "stepstonesearch")
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_stub(port, extra_args=()):
+    """
+    Start the stub server in a subprocess and wait until it accepts connections.
+
+    :param port: The port to listen on.
+    :param extra_args: Additional command line arguments for the stub.
+    :return: The stub process.
+    """
+    process = subprocess.Popen(
+        [sys.executable, "-m", "benchmarks.stepstone_stub", "--port", str(port), *extra_args],
+        cwd=REPO_ROOT, stdout=subprocess.DEVNULL,
+    )
+    for _ in range(100):
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.1):
+                return process
+        except OSError:
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError("Stub server did not start")
+
+
+def stub_call(base_url, path):
+    # The TLS stub uses a self-signed certificate
+    context = ssl._create_unverified_context() if base_url.startswith("https") else None
+    with urllib.request.urlopen(base_url + path, context=context) as response:
+        return json.loads(response.read())
+
+
+def crawl(spider, settings, args, env=None):
+    """
+    Run a spider as subprocess in the Scrapy project directory.
+
+    :param spider: The spider name.
+    :param settings: A dictionary of Scrapy settings passed with ``-s``.
+    :param args: A dictionary of spider arguments passed with ``-a``.
+    :param env: Optional environment for the subprocess.
+    """
+    command = ["scrapy", "crawl", spider, "--loglevel", "WARNING"]
+    for key, value in settings.items():
+        command += ["-s", f"{key}={value}"]
+    for key, value in args.items():
+        command += ["-a", f"{key}={value}"]
+    subprocess.run(command, cwd=PROJECT_PATH, check=True, env=env)
+
+
+def run_mode(base_url, mode, max_jobs, workdir):
+    """
+    Run both spiders in the given mode and collect the stub counters.
+
+    :return: A dictionary with jobs, bytes, requests and seconds.
+    """
+    stub_call(base_url, "/__reset")
+    links_file = os.path.join(workdir, f"links_{mode}.json")
+    job_title = f"bench-{mode}"
+    settings = {
+        "STEPSTONE_BASE_URL": base_url,
+        "STEPSTONE_FETCH_MODE": mode,
+        "DOWNLOAD_DELAY": 0,
+    }
+
+    start = time.perf_counter()
+    crawl("Links", {**settings, "FEEDS": json.dumps({links_file: {"format": "json", "overwrite": True}})},
+          {"job_title": job_title, "max_pages": max_jobs, "max_jobs": max_jobs})
+    crawl("sitespider", settings, {"input_file": links_file, "job_title": job_title})
+    elapsed = time.perf_counter() - start
+
+    stats = stub_call(base_url, "/__stats")
+    for name in os.listdir(PROJECT_PATH):
+        if name.startswith(job_title):
+            os.remove(os.path.join(PROJECT_PATH, name))
+    return {
+        "jobs": max_jobs,
+        "bytes": stats["total_bytes"],
+        "requests": stats["total_requests"],
+        "seconds": elapsed,
+        "by_kind": stats["bytes"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare bytes and time per job of the HTML and API fetch modes.")
+    parser.add_argument("--jobs", type=int, default=50)
+    parser.add_argument("--padding-kb", type=int, default=200)
+    parser.add_argument("--incomplete-payloads", action="store_true",
+                        help="serve detail payloads without list sections to measure the HTML fallback")
+    args = parser.parse_args()
+
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    stub_args = ["--padding-kb", str(args.padding_kb)]
+    if args.incomplete_payloads:
+        stub_args.append("--incomplete-payloads")
+    stub = start_stub(port, stub_args)
+    try:
+        with tempfile.TemporaryDirectory() as workdir:
+            results = {mode: run_mode(base_url, mode, args.jobs, workdir) for mode in ("html", "api")}
+    finally:
+        stub.terminate()
+        stub.wait()
+
+    print(f"{'mode':<6} {'jobs':>5} {'requests':>9} {'KiB/job':>10} {'ms/job':>8}")
+    for mode, result in results.items():
+        print(f"{mode:<6} {result['jobs']:>5} {result['requests']:>9} "
+              f"{result['bytes'] / 1024 / result['jobs']:>10.1f} {result['seconds'] * 1000 / result['jobs']:>8.1f}")
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
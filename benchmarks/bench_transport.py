@@ -0,0 +1,79 @@
+import argparse
+import json
+import os
+import tempfile
+import time
+
+from benchmarks.bench_stepstone_modes import PROJECT_PATH, crawl, free_port, start_stub, stub_call
+from stepstonesearch.transport import TRANSPORT_PROFILES
+
+"""
+This module benchmarks the transport profiles of the Stepstone crawler (see stepstonesearch/transport.py).
+
+It starts the stub server with TLS (HTTP/2 and HTTP/1.1 via ALPN), crawls the same search and job pages with
+every profile and reports the TLS handshakes (accepted connections), the transferred bytes and the wall time per page.
+The download delay is disabled to measure the transport itself; with the project's ``DOWNLOAD_DELAY`` the wall time
+per page is dominated by the delay.
+
+Usage:
+- ``python -m benchmarks.bench_transport [--profiles default http2]``
+"""
+
+
+def run_profile(base_url, profile, max_jobs, workdir):
+    """
+    Run both spiders with the given transport profile and collect the stub counters.
+
+    :return: A dictionary with pages, connections, bytes, protocols and seconds.
+    """
+    stub_call(base_url, "/__reset")
+    links_file = os.path.join(workdir, f"links_{profile}.json")
+    job_title = f"bench-{profile}"
+    settings = {"STEPSTONE_BASE_URL": base_url, "DOWNLOAD_DELAY": 0}
+    env = {**os.environ, "STEPSTONE_TRANSPORT_PROFILE": profile}
+
+    start = time.perf_counter()
+    crawl("Links", {**settings, "FEEDS": json.dumps({links_file: {"format": "json", "overwrite": True}})},
+          {"job_title": job_title, "max_pages": max_jobs, "max_jobs": max_jobs}, env=env)
+    crawl("sitespider", settings, {"input_file": links_file, "job_title": job_title}, env=env)
+    elapsed = time.perf_counter() - start
+
+    stats = stub_call(base_url, "/__stats")
+    for name in os.listdir(PROJECT_PATH):
+        if name.startswith(job_title):
+            os.remove(os.path.join(PROJECT_PATH, name))
+    return {
+        "pages": stats["total_requests"],
+        "connections": stats["connections"],
+        "bytes": stats["total_bytes"],
+        "protocols": stats["protocols"],
+        "seconds": elapsed,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare handshakes and bandwidth per page of the transport profiles.")
+    parser.add_argument("--jobs", type=int, default=50)
+    parser.add_argument("--padding-kb", type=int, default=200)
+    parser.add_argument("--profiles", nargs="+", default=list(TRANSPORT_PROFILES))
+    args = parser.parse_args()
+
+    port = free_port()
+    base_url = f"https://127.0.0.1:{port}"
+    stub = start_stub(port, ["--tls", "--padding-kb", str(args.padding_kb)])
+    try:
+        with tempfile.TemporaryDirectory() as workdir:
+            results = {profile: run_profile(base_url, profile, args.jobs, workdir) for profile in args.profiles}
+    finally:
+        stub.terminate()
+        stub.wait()
+
+    print(f"{'profile':<10} {'pages':>6} {'handshakes':>11} {'hs/page':>8} {'KiB/page':>9} {'ms/page':>8}  protocols")
+    for profile, result in results.items():
+        pages = result["pages"] or 1
+        print(f"{profile:<10} {result['pages']:>6} {result['connections']:>11} {result['connections'] / pages:>8.2f} "
+              f"{result['bytes'] / 1024 / pages:>9.1f} {result['seconds'] * 1000 / pages:>8.1f}  {result['protocols']}")
+
+
+if __name__ == "__main__":
+    main()
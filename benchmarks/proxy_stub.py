@@ -0,0 +1,75 @@
+import argparse
+
+from twisted.internet import reactor
+from twisted.web import http, proxy
+
+"""
+This module starts local stand-in HTTP forward proxies for exercising the identity rotation (see identity_pool.py).
+
+Every proxy adds a ``Via: stand-in-proxy-<port>`` header, so the Stepstone stub (stepstone_stub.py) can count
+the requests per proxy. Broken proxies answer every request with ``502 Bad Gateway`` to exercise the health
+scoring. The proxies only forward plain HTTP, so the stub must run without ``--tls``.
+
+Usage:
+- ``python -m benchmarks.proxy_stub --port 8960 --count 3 [--broken 1]``
+- ``PROXY_URLS=http://127.0.0.1:8960,http://127.0.0.1:8961,http://127.0.0.1:8962``
+"""
+
+
+class StandInProxyRequest(proxy.ProxyRequest):
+    """
+    A proxy request that marks the forwarded request with the port of its proxy.
+    """
+
+    def process(self):
+        port = self.channel.transport.getHost().port
+        self.requestHeaders.setRawHeaders(b"via", [f"stand-in-proxy-{port}".encode("ascii")])
+        super().process()
+
+
+class BrokenProxyRequest(proxy.ProxyRequest):
+    """
+    A proxy request that fails like an overloaded or banned proxy.
+    """
+
+    def process(self):
+        self.setResponseCode(http.BAD_GATEWAY)
+        self.setHeader(b"Content-Type", b"text/plain")
+        self.write(b"bad gateway")
+        self.finish()
+
+
+def make_factory(broken=False):
+    """
+    Create the server factory of one stand-in proxy.
+
+    :param broken: If True, the proxy answers every request with 502.
+    :return: A Twisted HTTP factory.
+    """
+    request_factory = BrokenProxyRequest if broken else StandInProxyRequest
+
+    class StandInProxy(proxy.Proxy):
+        requestFactory = request_factory
+
+    factory = http.HTTPFactory()
+    factory.protocol = StandInProxy
+    return factory
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stand-in HTTP forward proxies.")
+    parser.add_argument("--port", type=int, default=8960, help="port of the first proxy")
+    parser.add_argument("--count", type=int, default=3)
+    parser.add_argument("--broken", type=int, default=0, help="number of proxies (the last ones) answering 502")
+    args = parser.parse_args()
+
+    for i in range(args.count):
+        broken = i >= args.count - args.broken
+        reactor.listenTCP(args.port + i, make_factory(broken), interface="127.0.0.1")
+        print(f"Stand-in proxy listening on http://127.0.0.1:{args.port + i}{' (broken)' if broken else ''}",
+              flush=True)
+    reactor.run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,319 @@
+import argparse
+import datetime
+import gzip
+import json
+import random
+import re
+from urllib.parse import parse_qs
+
+from twisted.internet import reactor, ssl
+from twisted.web import resource, server
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+"""
+This module provides a local stand-in for the Stepstone website used to exercise and benchmark the spiders
+without touching the real site.
+
+It serves HTML search result pages with the embedded ``"items":[...]`` array, HTML job pages with the
+``job-ad-display-*`` markup parsed by sitespider, and the structured search and detail payloads of the API mode.
+Responses are compressed with Brotli or gzip when the client asks for it, and with ``--tls`` the stub serves
+HTTPS with a self-signed certificate and negotiates HTTP/2 via ALPN (requires ``Twisted[http2]``).
+Every response is counted per kind together with the accepted connections (i.e. TLS handshakes) and the
+HTTP versions used, and per client (the ``Via`` header added by the stand-in proxies of proxy_stub.py, or
+"direct") and user agent; ``GET /__stats`` returns the counters and ``GET /__reset`` clears them.
+
+Usage:
+- ``python -m benchmarks.stepstone_stub --port 8950 [--tls]``
+- Point the spiders at it with ``-s STEPSTONE_BASE_URL=http://127.0.0.1:8950`` (or ``https://``)
+"""
+
+JOBS_PER_PAGE = 25
+
+CHALLENGE_PAGE = (
+    "<!DOCTYPE html><html><head><title>Just a moment...</title></head><body>"
+    "<div id=\"challenge-platform\"><div class=\"cf-turnstile\"></div></div></body></html>"
+)
+
+
+def make_padding(size_kb):
+    """
+    Build filler markup that stands in for the scripts, styles and tracking code of the real pages.
+
+    The content is pseudo-random, so it compresses roughly like minified JavaScript instead of collapsing to nothing.
+
+    :param size_kb: The approximate size of the filler in KiB.
+    :return: The filler markup.
+    """
+    rng = random.Random(size_kb)
+    chunks = []
+    size = 0
+    while size < size_kb * 1024:
+        chunk = f"<script>window.__t{rng.getrandbits(32):x}=\"{rng.getrandbits(512):0128x}\";</script>\n"
+        chunks.append(chunk)
+        size += len(chunk)
+    return "".join(chunks)
+
+
+def make_item(job_id):
+    """
+    Build a search result item as it appears in the embedded JSON and the search payload.
+
+    :param job_id: The numeric job ID.
+    :return: The item dictionary.
+    """
+    return {
+        "id": job_id,
+        "title": f"Consultant (m/w/d) {job_id}",
+        "companyName": "Stub GmbH",
+        "location": "Berlin",
+        "url": f"/stellenangebote--Consultant-Berlin-Stub-GmbH--{job_id}-inline.html",
+        "textSnippet": "Wir suchen Verstärkung für unser Team.",
+        "salary": "",
+        "datePosted": "2025-01-01T00:00:00+01:00",
+    }
+
+
+def make_details(job_id):
+    """
+    Build the description paragraphs and lists of a job.
+
+    :param job_id: The numeric job ID.
+    :return: A tuple of (paragraphs, lists).
+    """
+    paragraphs = [f"Absatz {i} der Stellenanzeige {job_id}." for i in range(1, 9)]
+    lists = {
+        "content/benefits": [[f"Benefit {i}" for i in range(1, 6)]],
+        "company": [["Beratung", "Wirtschaftsprüfung"]],
+    }
+    return paragraphs, lists
+
+
+class StubStats:
+    """
+    Counts requests and response bytes per kind of endpoint.
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.requests = {}
+        self.bytes = {}
+        self.connections = 0
+        self.protocols = {}
+        self.clients = {}
+        self.user_agents = {}
+
+    def record(self, kind, body, protocol, client="direct", user_agent=""):
+        self.requests[kind] = self.requests.get(kind, 0) + 1
+        self.bytes[kind] = self.bytes.get(kind, 0) + len(body)
+        self.protocols[protocol] = self.protocols.get(protocol, 0) + 1
+        self.clients[client] = self.clients.get(client, 0) + 1
+        self.user_agents[user_agent] = self.user_agents.get(user_agent, 0) + 1
+
+    def as_dict(self):
+        return {
+            "requests": self.requests,
+            "bytes": self.bytes,
+            "connections": self.connections,
+            "protocols": self.protocols,
+            "clients": self.clients,
+            "user_agents": self.user_agents,
+            "total_requests": sum(self.requests.values()),
+            "total_bytes": sum(self.bytes.values()),
+        }
+
+
+class StepstoneStub(resource.Resource):
+    """
+    A Twisted resource that answers all Stepstone endpoints used by the spiders.
+
+    :ivar pages: The number of search result pages per job title.
+    :ivar padding: The filler markup added to every HTML page.
+    :ivar incomplete_payloads: If True, detail payloads lack the list sections to force the HTML fallback.
+    :ivar challenge_every: If set, every n-th HTML job page is answered with a Cloudflare-like challenge.
+    :ivar stats: The request and byte counters.
+    """
+    isLeaf = True
+
+    def __init__(self, pages=5, padding_kb=200, incomplete_payloads=False, challenge_every=0):
+        super().__init__()
+        self.pages = pages
+        self.padding = make_padding(padding_kb)
+        self.incomplete_payloads = incomplete_payloads
+        self.challenge_every = challenge_every
+        self.detail_requests = 0
+        self.stats = StubStats()
+
+    def render_GET(self, request):
+        path = request.path.decode("utf-8")
+        query = parse_qs(request.uri.decode("utf-8").partition("?")[2])
+        page = int(query.get("page", ["1"])[0])
+
+        if path == "/__stats":
+            return self.respond(request, None, json.dumps(self.stats.as_dict()), "application/json")
+        if path == "/__reset":
+            self.stats.reset()
+            return self.respond(request, None, "{}", "application/json")
+        if path.startswith("/public-api/resultlist/"):
+            return self.respond(request, "search_api", json.dumps({"items": self.page_items(page)}), "application/json")
+        match = re.match(r"^/public-api/job-ads/(\d+)$", path)
+        if match:
+            return self.respond(request, "detail_api", self.detail_payload(int(match.group(1))), "application/json")
+        if path.startswith("/jobs/"):
+            return self.respond(request, "search_html", self.search_html(page), "text/html; charset=utf-8")
+        match = re.search(r"-(\d+)-inline\.html$", path)
+        if match and self.challenge_every:
+            self.detail_requests += 1
+            if self.detail_requests % self.challenge_every == 0:
+                request.setResponseCode(403)
+                return self.respond(request, "challenge", CHALLENGE_PAGE, "text/html; charset=utf-8")
+        if match:
+            return self.respond(request, "detail_html", self.detail_html(int(match.group(1))), "text/html; charset=utf-8")
+
+        request.setResponseCode(404)
+        return self.respond(request, "not_found", "not found", "text/plain")
+
+    def respond(self, request, kind, text, content_type):
+        body = text.encode("utf-8")
+        accepted = (request.getHeader(b"accept-encoding") or b"").decode("ascii").lower()
+        if brotli is not None and "br" in accepted:
+            body = brotli.compress(body, quality=5)
+            request.setHeader(b"Content-Encoding", b"br")
+        elif "gzip" in accepted:
+            body = gzip.compress(body, compresslevel=6)
+            request.setHeader(b"Content-Encoding", b"gzip")
+        if kind:
+            self.stats.record(kind, body, request.clientproto.decode("ascii"),
+                              (request.getHeader(b"via") or b"direct").decode("ascii"),
+                              (request.getHeader(b"user-agent") or b"").decode("ascii"))
+        request.setHeader(b"Content-Type", content_type.encode("ascii"))
+        return body
+
+    def page_items(self, page):
+        if page > self.pages:
+            return []
+        first = 10000000 + (page - 1) * JOBS_PER_PAGE
+        return [make_item(job_id) for job_id in range(first, first + JOBS_PER_PAGE)]
+
+    def search_html(self, page):
+        state = json.dumps({"searchResult": {"items": self.page_items(page)}}, ensure_ascii=False, separators=(",", ":"))
+        return (
+            "<!DOCTYPE html><html><head><title>Jobs</title>" + self.padding + "</head><body>"
+            f"<div id=\"app\"></div><script>window.__PRELOADED_STATE__ = {state};</script>"
+            "</body></html>"
+        )
+
+    def detail_html(self, job_id):
+        paragraphs, lists = make_details(job_id)
+        content = "".join(f"<p>{p}</p>" for p in paragraphs)
+        content += '<div class="job-ad-display-1cat3iu"><ul>' + "".join(
+            f"<li>{b}</li>" for b in lists["content/benefits"][0]
+        ) + "</ul></div>"
+        content += '<div class="job-ad-display-kyg8or"><ul>' + "".join(
+            f"<li>{c}</li>" for c in lists["company"][0]
+        ) + "</ul></div>"
+        return (
+            "<!DOCTYPE html><html><head><title>Job</title>" + self.padding + "</head><body>"
+            f"<div id=\"JobAdContent\">{content}</div></body></html>"
+        )
+
+    def detail_payload(self, job_id):
+        paragraphs, lists = make_details(job_id)
+        payload = {"id": job_id, "textSections": paragraphs}
+        if not self.incomplete_payloads:
+            payload["listSections"] = lists
+        return json.dumps(payload, ensure_ascii=False)
+
+
+class CountingSite(server.Site):
+    """
+    A Twisted site that counts the accepted connections in the stub statistics.
+    """
+    noisy = False
+
+    def __init__(self, stub):
+        super().__init__(stub)
+        self.stub = stub
+
+    def buildProtocol(self, addr):
+        self.stub.stats.connections += 1
+        return super().buildProtocol(addr)
+
+
+def make_site(**kwargs):
+    """
+    Create the Twisted site serving the stub.
+
+    :param kwargs: Options passed to :class:`StepstoneStub`.
+    :return: A tuple of (site, stub resource).
+    """
+    stub = StepstoneStub(**kwargs)
+    return CountingSite(stub), stub
+
+
+def make_tls_options():
+    """
+    Create TLS options with a freshly generated self-signed certificate for 127.0.0.1.
+
+    ALPN offers HTTP/2 and HTTP/1.1, so clients with an HTTP/2 handler negotiate h2.
+
+    :return: A :class:`twisted.internet.ssl.CertificateOptions` instance.
+    """
+    import ipaddress
+
+    from cryptography import x509
+    from cryptography.hazmat.primitives import hashes
+    from cryptography.hazmat.primitives.asymmetric import rsa
+    from cryptography.x509.oid import NameOID
+    from OpenSSL import crypto
+
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "127.0.0.1")])
+    now = datetime.datetime.now(datetime.timezone.utc)
+    certificate = (
+        x509.CertificateBuilder()
+        .subject_name(name)
+        .issuer_name(name)
+        .public_key(key.public_key())
+        .serial_number(x509.random_serial_number())
+        .not_valid_before(now - datetime.timedelta(days=1))
+        .not_valid_after(now + datetime.timedelta(days=7))
+        .add_extension(x509.SubjectAlternativeName([x509.IPAddress(ipaddress.ip_address("127.0.0.1"))]), critical=False)
+        .sign(key, hashes.SHA256())
+    )
+    return ssl.CertificateOptions(
+        privateKey=crypto.PKey.from_cryptography_key(key),
+        certificate=crypto.X509.from_cryptography(certificate),
+        acceptableProtocols=[b"h2", b"http/1.1"],
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stand-in for the Stepstone website.")
+    parser.add_argument("--port", type=int, default=8950)
+    parser.add_argument("--pages", type=int, default=5)
+    parser.add_argument("--padding-kb", type=int, default=200)
+    parser.add_argument("--incomplete-payloads", action="store_true")
+    parser.add_argument("--tls", action="store_true", help="serve HTTPS (HTTP/2 and HTTP/1.1 via ALPN)")
+    parser.add_argument("--challenge-every", type=int, default=0,
+                        help="answer every n-th HTML job page with a challenge page")
+    args = parser.parse_args()
+
+    site, _ = make_site(pages=args.pages, padding_kb=args.padding_kb, incomplete_payloads=args.incomplete_payloads,
+                        challenge_every=args.challenge_every)
+    if args.tls:
+        reactor.listenSSL(args.port, site, make_tls_options(), interface="127.0.0.1")
+    else:
+        reactor.listenTCP(args.port, site, interface="127.0.0.1")
+    scheme = "https" if args.tls else "http"
+    print(f"Stepstone stub listening on {scheme}://127.0.0.1:{args.port}", flush=True)
+    reactor.run()
+
+
+if __name__ == "__main__":
+    main()
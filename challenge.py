@@ -0,0 +1,152 @@
+import time
+
+"""
+This module detects bot challenge pages (e.g. Cloudflare, captchas) and provides a circuit breaker per source.
+
+When a source starts answering with challenge pages, every further request in the same session is usually
+wasted. The CircuitBreaker counts consecutive challenges; once a threshold is reached it opens and blocks
+requests for an exponentially growing pause. Afterwards a single trial request is allowed (half-open): if it
+succeeds the breaker closes again, otherwise the next, longer pause starts. The affected URLs are requeued by
+the callers. The challenge rate is kept as a metric.
+
+Used by:
+- indeed_scraper.py: pauses the browser loop and only runs the slow captcha solve path on challenge pages.
+- stepstonesearch/middlewares.py (ChallengeMiddleware): pauses the Scrapy engine and requeues the requests.
+"""
+
+# Markers that only appear on challenge interstitials. Regular pages behind Cloudflare also load
+# "/cdn-cgi/challenge-platform/..." scripts, and captcha widgets (reCAPTCHA, hCaptcha, Turnstile) can be embedded
+# in any form, so those are no markers on their own.
+CHALLENGE_MARKERS = (
+    "cf-chl",
+    "_cf_chl_opt",
+    "<title>just a moment...</title>",
+    "verifying you are human",
+    "zusätzliche überprüfung erforderlich",
+)
+
+# Status codes that are typical for blocked requests
+CHALLENGE_STATUS_CODES = (403, 429, 503)
+
+
+class SourceBlocked(Exception):
+    """
+    Raised when a source only answers with challenge pages, so a job title could not be scraped.
+    """
+
+
+def is_challenge_page(html, status=None):
+    """
+    Check whether a page is a bot challenge instead of the requested content.
+
+    :param html: The page source (str or bytes).
+    :param status: The HTTP status code, if known.
+    :return: True if the page is a challenge page.
+    """
+    if isinstance(html, bytes):
+        html = html.decode("utf-8", errors="ignore")
+    text = html.lower()
+    if any(marker in text for marker in CHALLENGE_MARKERS):
+        return True
+    # Blocked responses without any content of the requested page
+    return status in CHALLENGE_STATUS_CODES and len(text) < 2048
+
+
+class CircuitBreaker:
+    """
+    A circuit breaker with exponential backoff for one source.
+
+    :ivar name: The name of the source.
+    :ivar threshold: The number of consecutive challenges that opens the breaker.
+    :ivar base_delay: The pause in seconds after the breaker opened for the first time.
+    :ivar max_delay: The upper limit of the pause in seconds.
+    :ivar state: "closed", "open" or "half-open".
+    :ivar requests: The number of recorded responses.
+    :ivar challenges: The number of recorded challenge pages.
+    :ivar opens: The number of times the breaker opened.
+    """
+
+    def __init__(self, name, threshold=3, base_delay=30, max_delay=900, clock=time.monotonic):
+        self.name = name
+        self.threshold = threshold
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.clock = clock
+        self.state = "closed"
+        self.consecutive = 0
+        self.backoff = 0
+        self.open_until = 0.0
+        self.requests = 0
+        self.challenges = 0
+        self.opens = 0
+
+    def allow(self):
+        """
+        Check whether a request may be sent now.
+
+        An open breaker switches to half-open once its pause is over, which allows a single trial request.
+
+        :return: True if the request may be sent.
+        """
+        if self.state == "open" and self.clock() >= self.open_until:
+            self.state = "half-open"
+        return self.state != "open"
+
+    def remaining(self):
+        """
+        Return the seconds until an open breaker allows the next request.
+        """
+        return max(0.0, self.open_until - self.clock()) if self.state == "open" else 0.0
+
+    def record_success(self):
+        """
+        Record a regular page; closes the breaker and resets the backoff.
+        """
+        self.requests += 1
+        self.consecutive = 0
+        self.backoff = 0
+        self.state = "closed"
+
+    def record_challenge(self):
+        """
+        Record a challenge page and open the breaker if the threshold is reached or a trial request failed.
+
+        :return: The pause in seconds if the breaker opened, otherwise 0.
+        """
+        self.requests += 1
+        self.challenges += 1
+        self.consecutive += 1
+        if self.state == "half-open" or self.consecutive >= self.threshold:
+            delay = min(self.max_delay, self.base_delay * 2 ** self.backoff)
+            self.backoff += 1
+            self.opens += 1
+            self.state = "open"
+            self.open_until = self.clock() + delay
+            return delay
+        return 0
+
+    @property
+    def challenge_rate(self):
+        """The share of challenge pages among all recorded responses."""
+        return self.challenges / self.requests if self.requests else 0.0
+
+    def stats(self):
+        """
+        Return the breaker metrics.
+
+        :return: A dictionary with requests, challenges, challenge rate, opens and state.
+        """
+        return {
+            "requests": self.requests,
+            "challenges": self.challenges,
+            "challenge_rate": self.challenge_rate,
+            "opens": self.opens,
+            "state": self.state,
+        }
+
+    def report(self):
+        """
+        Print the breaker metrics.
+        """
+        print(f"🛡️ {self.name}: {self.challenges}/{self.requests} Challenge-Seiten "
+              f"({self.challenge_rate:.1%}), Circuit Breaker {self.opens}x geöffnet, Status {self.state}")
@@ -0,0 +1,11 @@
+#!/bin/sh
+# Container entry point: starts the virtual display (unless SKIP_XVFB=1) and the scrapers.
+# SKIP_XVFB=1 is suitable for headless runs; the captcha solve path of the Indeed scraper
+# (pyautogui) needs the display, so keep Xvfb when Indeed is scraped in UC mode.
+export CONTAINER_START_NS="$(date +%s%N)"
+
+if [ "${SKIP_XVFB:-0}" != "1" ]; then
+    Xvfb "${DISPLAY}" -screen 0 "${XVFB_SIZE}" &
+fi
+
+exec python run_scrapers_parallel.py
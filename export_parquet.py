@@ -0,0 +1,298 @@
+import argparse
+import json
+import os
+import re
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from bson import ObjectId
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+"""
+This module exports the scraped jobs from MongoDB into partitioned Parquet files for analytics.
+
+The per-title collections ``indeed_<title>`` and ``stepstone_<title>`` of the "stepstone_data" database use different
+field names. Every document is mapped to one normalized schema (see SCHEMA) and written to a Hive-partitioned dataset::
+
+    <output>/source=indeed/title=data_analyst/date=2025-01-31/part-<run>-<chunk>-0.parquet
+
+The export is incremental and works on closed time windows of the insert time encoded in the ObjectIds. ObjectIds
+are generated by the clients, so with several containers (``QUEUE_MODE``) they do not grow monotonically: a document
+inserted later can carry an older timestamp (clock skew, slow inserts). Every run therefore exports the window from
+`EXPORT_OVERLAP` before the end of the previous window up to its own start time, and skips the documents that were
+already exported in the overlap. The window end and the IDs exported in the overlap are stored per collection in
+``<output>/_export_state.json``; while a window is exported, the state also holds the last written ObjectId, so an
+interrupted export continues after it. Documents whose ObjectId is more than `EXPORT_OVERLAP` older than their actual
+insert (or older than the last written document of an interrupted export) are not exported. Documents are read in
+chunks and only the IDs of the overlap are kept, so memory use and state size do not depend on the size of a
+collection.
+Updates of already exported Stepstone jobs (upserts keep their ObjectId) are not exported again.
+
+Dependencies:
+- pyarrow (optional dependency, only needed for the export)
+
+Usage:
+- ``python export_parquet.py /data/jobs_parquet [--sources indeed stepstone]`` (uses `MONGO_URI`)
+- run_scrapers_parallel.py exports after every run if `PARQUET_EXPORT_DIR` is set.
+"""
+
+STATE_FILE = "_export_state.json"
+CHUNK_SIZE = 5000  # Documents per Parquet file
+EXPORT_OVERLAP = timedelta(minutes=10)  # Tolerated clock skew and insert delay between the containers
+SOURCES = ("indeed", "stepstone")
+
+if pa is not None:
+    SCHEMA = pa.schema([
+        ("source", pa.string()),
+        ("title", pa.string()),
+        ("date", pa.string()),
+        ("scraped_at", pa.timestamp("s", tz="UTC")),
+        ("mongo_id", pa.string()),
+        ("job_id", pa.string()),
+        ("search_title", pa.string()),
+        ("specific_title", pa.string()),
+        ("company_name", pa.string()),
+        ("location", pa.string()),
+        ("salary", pa.string()),
+        ("date_posted", pa.string()),
+        ("url", pa.string()),
+        ("paragraphs", pa.list_(pa.string())),
+        ("benefits", pa.list_(pa.string())),
+        ("lists_json", pa.string()),
+    ])
+
+
+def as_list(value):
+    """Return the value as list of strings; placeholders like "Nicht gefunden" become an empty list."""
+    if isinstance(value, list):
+        return [str(v) for v in value]
+    return []
+
+
+def as_text(value):
+    """Return the value as string, or None for missing values and the "Nicht gefunden" placeholder."""
+    if value in (None, "", "Nicht gefunden"):
+        return None
+    return str(value)
+
+
+def partition_value(title):
+    """Return a title as safe directory or file name part ("/" or "=" would create nested or invalid directories)."""
+    return re.sub(r"[^\w.-]+", "_", title).strip("._") or "_"
+
+
+def normalize_job(doc, source, title):
+    """
+    Map an Indeed or Stepstone job document to the normalized export schema.
+
+    :param doc: The MongoDB document.
+    :param source: "indeed" or "stepstone".
+    :param title: The title part of the collection name (e.g. "data_analyst").
+    :return: A dictionary with the fields of SCHEMA.
+    """
+    scraped_at = doc["_id"].generation_time
+    row = {
+        "source": source,
+        "title": partition_value(title),
+        "date": scraped_at.strftime("%Y-%m-%d"),
+        "scraped_at": scraped_at,
+        "mongo_id": str(doc["_id"]),
+        "search_title": as_text(doc.get("Job Title")),
+        "paragraphs": as_list(doc.get("paragraphs")),
+    }
+    if source == "indeed":
+        row.update({
+            "job_id": as_text(doc.get("jobID")),
+            "specific_title": None,
+            "company_name": as_text(doc.get("Company Name")),
+            "location": as_text(doc.get("jobLocationText")),
+            "salary": None,
+            "date_posted": None,
+            "url": as_text(doc.get("URL")),
+            "benefits": as_list(doc.get("benefits")),
+            "lists_json": None,
+        })
+    else:
+        lists = doc.get("lists") or {}
+        row.update({
+            "job_id": as_text(doc.get("jobId")),
+            "specific_title": as_text(doc.get("specific job title")),
+            "company_name": as_text(doc.get("companyName")),
+            "location": as_text(doc.get("location")),
+            "salary": as_text(doc.get("salary")),
+            "date_posted": as_text(doc.get("datePosted")),
+            "url": as_text(doc.get("url")),
+            "benefits": [item for group in lists.get("content/benefits", []) for item in as_list(group)],
+            "lists_json": json.dumps(lists, ensure_ascii=False) if lists else None,
+        })
+    return row
+
+
+def load_state(output):
+    path = os.path.join(output, STATE_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as file:
+        return json.load(file)
+
+
+def save_state(output, state):
+    """Write the export state atomically, so an interrupted export never leaves a broken state file."""
+    path = os.path.join(output, STATE_FILE)
+    with open(path + ".tmp", "w", encoding="utf-8") as file:
+        json.dump(state, file, indent=2)
+    os.replace(path + ".tmp", path)
+
+
+def write_chunk(rows, output, basename):
+    """
+    Append a chunk of normalized rows to the partitioned dataset.
+
+    :param rows: The normalized rows.
+    :param output: The root directory of the dataset.
+    :param basename: The unique file name prefix of the chunk.
+    """
+    table = pa.Table.from_pylist(rows, schema=SCHEMA)
+    pq.write_to_dataset(
+        table,
+        output,
+        partition_cols=["source", "title", "date"],
+        basename_template=basename + "-{i}.parquet",
+        existing_data_behavior="overwrite_or_ignore",
+    )
+
+
+def collection_state(state, name):
+    """
+    Return the export state of a collection.
+
+    :param state: The export state of all collections.
+    :param name: The collection name.
+    :return: A dictionary with "until" (end of the last closed window as ISO string, or None), "seen" (the IDs of the
+        last window that the overlap of the next window reads again) and, while a window is exported, "last" (the
+        ObjectId of the last written document) and "pending" (the written IDs inside the overlap of the window).
+    """
+    entry = state.get(name, {})
+    return {
+        "until": entry.get("until"),
+        "seen": list(entry.get("seen", [])),
+        "last": entry.get("last"),
+        "pending": list(entry.get("pending", [])),
+    }
+
+
+def export_collection(collection, source, title, output, state, run_id, until=None, chunk_size=CHUNK_SIZE):
+    """
+    Export the documents of one collection that were inserted in the window since the last export.
+
+    :param collection: The MongoDB collection.
+    :param source: "indeed" or "stepstone".
+    :param title: The title part of the collection name.
+    :param output: The root directory of the dataset.
+    :param state: The export state (updated in place and saved after every chunk).
+    :param run_id: A unique ID of the export run used in the file names.
+    :param until: The end of the export window; defaults to now.
+    :param chunk_size: The number of documents per Parquet file.
+    :return: The number of exported documents.
+    """
+    until = until or datetime.now(timezone.utc)
+    overlap_start = until - EXPORT_OVERLAP
+    progress = collection_state(state, collection.name)
+    seen = set(progress["seen"])
+    query = {"_id": {"$lt": ObjectId.from_datetime(until)}}
+    if progress["until"]:
+        query["_id"]["$gte"] = ObjectId.from_datetime(datetime.fromisoformat(progress["until"]) - EXPORT_OVERLAP)
+    if progress["last"]:
+        # An interrupted export continues after the last written document
+        query["_id"]["$gt"] = ObjectId(progress["last"])
+
+    count = 0
+    chunk = 0
+    rows = []
+    prefix = f"part-{run_id}-{partition_value(collection.name)}"
+    cursor = collection.find(query, batch_size=chunk_size).sort("_id", 1)
+    for doc in cursor:
+        if str(doc["_id"]) in seen:
+            continue
+        rows.append(normalize_job(doc, source, title))
+        if len(rows) >= chunk_size:
+            count += flush_rows(rows, collection.name, output, state, progress, overlap_start, f"{prefix}-{chunk}")
+            chunk += 1
+            rows = []
+    if rows:
+        count += flush_rows(rows, collection.name, output, state, progress, overlap_start, f"{prefix}-{chunk}")
+
+    # Close the window: only the IDs that the overlap of the next window reads again are kept
+    state[collection.name] = {
+        "until": until.isoformat(),
+        "seen": sorted(i for i in seen.union(progress["pending"]) if ObjectId(i).generation_time >= overlap_start),
+    }
+    save_state(output, state)
+    return count
+
+
+def flush_rows(rows, collection_name, output, state, progress, overlap_start, basename):
+    """
+    Write a chunk and remember the position of the export.
+
+    The window stays open until the whole collection was read; the state stores the last written ObjectId and the
+    written IDs inside the overlap of the window, so its size does not grow with the number of exported documents.
+    """
+    write_chunk(rows, output, basename)
+    progress["last"] = rows[-1]["mongo_id"]
+    progress["pending"].extend(row["mongo_id"] for row in rows if row["scraped_at"] >= overlap_start)
+    state[collection_name] = progress
+    save_state(output, state)
+    return len(rows)
+
+
+def export_jobs(db, output, sources=SOURCES):
+    """
+    Export the new jobs of all Indeed and Stepstone collections to the Parquet dataset.
+
+    :param db: The MongoDB database with the job collections ("stepstone_data").
+    :param output: The root directory of the dataset.
+    :param sources: The sources to export.
+    :return: A dictionary mapping collection names to the number of exported documents.
+    """
+    if pa is None:
+        raise ImportError("pyarrow is required for the Parquet export (pip install pyarrow)")
+
+    os.makedirs(output, exist_ok=True)
+    state = load_state(output)
+    run_id = f"{datetime.now().strftime('%Y%m%d%H%M%S')}-{uuid.uuid4().hex[:6]}"
+    until = datetime.now(timezone.utc)
+    exported = {}
+    for name in sorted(db.list_collection_names()):
+        source, _, title = name.partition("_")
+        if source not in sources or not title:
+            continue
+        exported[name] = export_collection(db[name], source, title, output, state, run_id, until)
+    print(f"📦 Parquet-Export: {sum(exported.values())} neue Jobs aus {len(exported)} Collections nach '{output}'")
+    return exported
+
+
+def main():
+    import pymongo
+    from dotenv import load_dotenv
+
+    parser = argparse.ArgumentParser(description="Export the scraped jobs to partitioned Parquet files.")
+    parser.add_argument("output")
+    parser.add_argument("--sources", nargs="+", choices=SOURCES, default=list(SOURCES))
+    args = parser.parse_args()
+
+    load_dotenv()
+    client = pymongo.MongoClient(os.getenv("MONGO_URI"))
+    try:
+        export_jobs(client["stepstone_data"], args.output, args.sources)
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    main()
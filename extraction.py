@@ -0,0 +1,285 @@
+import json
+import re
+from functools import lru_cache
+
+from lxml import etree
+from parsel import Selector
+from parsel.csstranslator import HTMLTranslator
+
+"""
+This module provides the extraction engine shared by the Indeed scraper and the Stepstone spiders.
+
+What is extracted from a page is described declaratively in SPECS, one spec per source and page type. A spec is
+compiled once per process and spec version: CSS selectors are translated to XPath, all XPath expressions and
+regular expressions are compiled, and the compiled spec is cached. `extract` applies a compiled spec to the raw
+HTML of one page (in the calling process or as a parse pool task), and `map_record` applies a record spec to
+already decoded JSON (e.g. the job items of the Stepstone search results).
+
+A layout change of a source is a spec update: change the selectors and increase the spec version.
+
+Field types of HTML specs:
+- ``text``: the text of the first matching element (``default`` if there is none).
+- ``list``: the texts of the ``items`` inside the first ``container`` element without empty texts (with
+  ``keep_empty`` empty items stay in the list as ""); ``empty`` if the list is empty, ``default`` if there is no
+  container.
+- ``strings``: all matching text nodes, cleaned with the ``clean`` function and without empty strings.
+- ``values``: all matching attribute values or strings.
+- ``groups``: lists of texts grouped by the first class of the nearest ancestor with a class attribute
+  (``rename``/``skip``/``key_default`` map and filter the group names).
+- ``json``: a value of a JSON object embedded in a script (``script`` names an entry of the spec's ``scripts``),
+  addressed by a dotted path. Missing values leave the field out. Only scripts containing
+  the ``marker`` of the script entry are searched with its ``pattern``.
+
+Used by:
+- indeed_scraper.py: `parse_indeed_job` ("indeed_detail") and the click pagination ("indeed_search").
+- stepstonesearch/spiders/sitespider.py: `extract_job_details` ("stepstone_detail").
+- stepstonesearch/spiders/Links.py: the link entries of the search results ("stepstone_search_item").
+"""
+
+
+def clean_text(text):
+    """Clean the text by stripping whitespace and removing text with unwanted characters."""
+    return text.strip() if not ("{" in text or ":" in text or "}" in text) else ""
+
+
+CLEANERS = {
+    "strip": str.strip,
+    "no_code": clean_text,  # Drops fragments of inline JSON/CSS
+}
+
+SPECS = {
+    "indeed_detail": {
+        "version": 1,
+        "scripts": {
+            "initial_data": {
+                "marker": "_initialData",
+                "pattern": r"window\._initialData\s*=\s*(\{.*?\});",
+                "normalize_whitespace": True,
+            },
+        },
+        "fields": {
+            "jobLocationText": {"type": "text", "css": "#jobLocationText", "join": " ", "default": "Nicht gefunden"},
+            "benefits": {"type": "list", "container": "#benefits", "items": "li", "keep_empty": True,
+                         "empty": "Keine Vorteile angegeben", "default": "Nicht gefunden"},
+            "paragraphs": {"type": "list", "container": "#jobDescriptionText", "items": "p, li",
+                           "default": "Nicht gefunden"},
+            "jobID": {"type": "json", "script": "initial_data",
+                      "path": "hostQueryExecutionResult.data.jobData.results.0.job.key"},
+            "Company Name": {"type": "json", "script": "initial_data",
+                             "path": "hostQueryExecutionResult.data.jobData.results.0.job.sourceEmployerName"},
+        },
+    },
+    "indeed_search": {
+        "version": 1,
+        "fields": {
+            "links": {"type": "values", "css": "a[data-mobtk]::attr(href)"},
+        },
+    },
+    "stepstone_detail": {
+        "version": 1,
+        "fields": {
+            "paragraphs": {"type": "strings", "clean": "no_code",
+                           "xpath": '//p[not(ancestor::*[contains(@class, "job-ad-display-1wh962r")])]//text()'},
+            "lists": {
+                "type": "groups",
+                "xpath": '//ul[not(ancestor::*[contains(@class, "job-ad-display-1wh962r")])]',
+                "key": './ancestor::*[contains(@class, "")][1]/@class',
+                "items": ".//li//text()",
+                "clean": "no_code",
+                "key_default": "CompanyInfo",
+                # Related searches share the company class but are no company information
+                "skip": {"job-ad-display-kyg8or": './ancestor::*[@id="SeoRelatedLinks"]'},
+                "rename": {
+                    "job-ad-display-1cat3iu": "content/benefits",
+                    "job-ad-display-kyg8or": "company",
+                    "job-ad-display-1yd5hr5": "companySize",
+                },
+            },
+        },
+    },
+    "stepstone_search_item": {
+        "version": 1,
+        "fields": {
+            "title": {"path": "title", "strip": True},
+            "companyName": {"path": "companyName", "strip": True},
+            "location": {"path": "location", "strip": True},
+            "link": {"path": "url"},
+            "Kurztext": {"path": "textSnippet"},
+            "salary": {"path": "salary"},
+            "datePosted": {"path": "datePosted"},
+        },
+    },
+}
+
+_translator = HTMLTranslator()
+# Text nodes of an element as BeautifulSoup's get_text returns them (without script and style contents)
+_TEXT_NODES = etree.XPath("descendant-or-self::text()[not(ancestor::script) and not(ancestor::style)]")
+
+
+def _xpath(field, key="xpath", css_key="css"):
+    """Compile the XPath or CSS selector of a field."""
+    if css_key in field:
+        return etree.XPath(_translator.css_to_xpath(field[css_key]))
+    return etree.XPath(field[key])
+
+
+def _path(path):
+    return [int(part) if part.isdigit() else part for part in path.split(".")]
+
+
+class CompiledSpec:
+    """
+    A spec with compiled selectors, regular expressions and JSON paths.
+
+    :ivar name: The name of the spec.
+    :ivar version: The version of the spec.
+    :ivar fields: A list of (field name, field spec, compiled selectors) tuples in output order.
+    """
+
+    def __init__(self, name, spec):
+        self.name = name
+        self.version = spec["version"]
+        self.scripts = {
+            key: (etree.XPath(f'//script[contains(., "{script["marker"]}")]/text()'), re.compile(script["pattern"]),
+                  script.get("normalize_whitespace", False))
+            for key, script in spec.get("scripts", {}).items()
+        }
+        self.fields = []
+        for field_name, field in spec["fields"].items():
+            kind = field.get("type", "record")
+            if kind in ("text", "strings", "values"):
+                compiled = {"match": _xpath(field)}
+            elif kind == "list":
+                compiled = {"container": _xpath(field, css_key="container"),
+                            # Items are searched below the container
+                            "items": etree.XPath(_translator.css_to_xpath(field["items"], prefix="descendant::"))}
+            elif kind == "groups":
+                compiled = {"match": _xpath(field), "key": etree.XPath(field["key"]),
+                            "items": etree.XPath(field["items"]),
+                            "skip": {key: etree.XPath(xpath) for key, xpath in field.get("skip", {}).items()}}
+            else:
+                compiled = {"path": _path(field["path"])}
+            self.fields.append((field_name, field, compiled))
+
+    def script_data(self, root):
+        """Decode the JSON objects embedded in the scripts of a page (first match per script spec)."""
+        data = {}
+        for key, (scripts, pattern, normalize) in self.scripts.items():
+            for source in scripts(root):
+                if normalize:
+                    source = " ".join(source.split())
+                match = pattern.search(source)
+                if not match:
+                    continue
+                try:
+                    data[key] = json.loads(match.group(1))
+                    break
+                except json.JSONDecodeError:
+                    continue
+        return data
+
+
+@lru_cache(maxsize=None)
+def _compile(name, version):
+    return CompiledSpec(name, SPECS[name])
+
+
+def compile_spec(name):
+    """
+    Return the compiled spec, compiled once per process and spec version.
+
+    :param name: The name of the spec in SPECS.
+    :return: The CompiledSpec.
+    """
+    return _compile(name, SPECS[name]["version"])
+
+
+def element_text(element, join=""):
+    """Return the stripped, non-empty text nodes of an element joined by `join` (like get_text(join, strip=True))."""
+    return join.join(text.strip() for text in _TEXT_NODES(element) if text.strip())
+
+
+def lookup(data, path, default=None):
+    """
+    Return the value at a JSON path.
+
+    :param data: The decoded JSON.
+    :param path: The path as list of keys and list indices.
+    :param default: The value returned if the path does not exist.
+    """
+    for part in path:
+        try:
+            data = data[part]
+        except (KeyError, IndexError, TypeError):
+            return default
+    return data
+
+
+def extract(name, html):
+    """
+    Apply an HTML spec to the raw HTML of one page.
+
+    :param name: The name of the spec.
+    :param html: The raw HTML (str).
+    :return: A dictionary with the extracted fields in spec order.
+    """
+    spec = compile_spec(name)
+    root = Selector(text=html).root
+    scripts = spec.script_data(root)
+    result = {}
+    for field_name, field, compiled in spec.fields:
+        kind = field["type"]
+        if kind == "text":
+            matches = compiled["match"](root)
+            result[field_name] = element_text(matches[0], field.get("join", "")) if matches else field["default"]
+        elif kind == "list":
+            containers = compiled["container"](root)
+            if not containers:
+                result[field_name] = field["default"]
+                continue
+            texts = [element_text(item, field.get("join", "")) for item in compiled["items"](containers[0])]
+            if not field.get("keep_empty"):
+                texts = [text for text in texts if text]
+            result[field_name] = texts if texts or "empty" not in field else field["empty"]
+        elif kind == "strings":
+            clean = CLEANERS[field.get("clean", "strip")]
+            result[field_name] = [text for text in map(clean, compiled["match"](root)) if text]
+        elif kind == "values":
+            result[field_name] = [str(value) for value in compiled["match"](root)]
+        elif kind == "groups":
+            result[field_name] = _groups(root, field, compiled)
+        elif kind == "json":
+            value = lookup(scripts.get(field["script"]), compiled["path"])
+            if value:
+                result[field_name] = value
+    return result
+
+
+def _groups(root, field, compiled):
+    clean = CLEANERS[field.get("clean", "strip")]
+    groups = {}
+    for element in compiled["match"](root):
+        classes = compiled["key"](element)
+        key = classes[0].split()[0] if classes and classes[0].split() else field["key_default"]
+        skip = compiled["skip"].get(key)
+        if skip is not None and skip(element):
+            continue
+        key = field.get("rename", {}).get(key, key)
+        items = [text for text in map(clean, compiled["items"](element)) if text]
+        groups.setdefault(key, []).append(items)
+    return groups
+
+
+def map_record(name, record):
+    """
+    Apply a record spec to a decoded JSON object.
+
+    :param name: The name of the spec.
+    :param record: The JSON object (dict).
+    :return: A dictionary with the mapped fields; missing values become empty strings.
+    """
+    result = {}
+    for field_name, field, compiled in compile_spec(name).fields:
+        value = lookup(record, compiled["path"], "")
+        result[field_name] = value.strip() if field.get("strip") and isinstance(value, str) else value
+    return result
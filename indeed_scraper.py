@@ -1,14 +1,20 @@
+import os
 import urllib.parse
 import re
 import json
-from bs4 import BeautifulSoup
+from collections import deque
 from pymongo import ASCENDING
 from pymongo.errors import DuplicateKeyError
 
+from challenge import CircuitBreaker, SourceBlocked, is_challenge_page
+from extraction import extract
+from parse_pool import ParsePool
+from profiling import stage
+
 """
 This module provides functionality to scrape job listings from Indeed for specified job titles.
 It utilizes SeleniumBase for browser automation to handle dynamic content and bypass CAPTCHA tests,
-and BeautifulSoup for parsing HTML. The scraped data is stored in a MongoDB database for further analysis.
+and the shared extraction engine (see extraction.py) for parsing HTML. The scraped data is stored in a MongoDB database for further analysis.
 
 Key Features:
 - Automates browser interactions to search for job titles on Indeed.
@@ -18,7 +24,7 @@ Key Features:
 
 Dependencies:
 - seleniumbase: For browser automation and CAPTCHA handling.
-- beautifulsoup4: For HTML parsing.
+- parsel/lxml: For HTML parsing with the extraction specs (in worker processes of the ParsePool, see parse_pool.py).
 - pymongo: For MongoDB interactions.
 
 Note:
@@ -26,19 +32,297 @@ Note:
 - The script is designed to scrape a given number of pages and jobs. Adjust the `max_pages` and job link slicing as needed for full-scale scraping or testing purposes.
 """
 
-# Identifiers for HTML elements containing job details
-TEXT_IDS = ["jobLocationText"]  # List of IDs for text elements like job location
-LIST_ID = "benefits"  # ID for the benefits list section
-DESCRIPTION_ID = "jobDescriptionText"  # ID for the job description section
+MAX_CHALLENGE_RETRIES = 2  # How often a job URL is requeued after a challenge page
+SOLVE_WAIT = 5  # Seconds to wait after the captcha solve attempt
+
+BASE_URL = "https://de.indeed.com"
+RESULTS_PER_PAGE = 10  # Step of the `start` parameter of the search result pages
+# "url" builds the result page URLs and loads them in parallel tabs, "click" follows the "Nächste Seite" button
+PAGINATION = os.getenv("INDEED_PAGINATION", "url")
+SEARCH_TABS = int(os.getenv("INDEED_SEARCH_TABS", 4))  # Result pages loaded at the same time
+SEARCH_WAIT = 5  # Seconds to wait for a batch of result pages
+
+# Job cards embedded in the search result page as JSON
+MOSAIC_PATTERN = re.compile(
+    r'window\.mosaic\.providerData\["mosaic-provider-jobcards"\]\s*=\s*(\{.*?\});\s*(?:window\.|</script>)', re.S
+)
+# `jk` link parameters are also found in HTML-escaped URLs ("&amp;jk=")
+JOB_KEY_PATTERN = re.compile(r'data-jk="([0-9a-f]+)"|[?&;]jk=([0-9a-f]+)')
+
+
+def parse_indeed_job(raw_html, job_url, job_title):
+    """
+    Extract the job details from the raw HTML of an Indeed job page.
+
+    This function only depends on its arguments, so it can run in a worker process of the ParsePool
+    while the browser already loads the next job page.
+
+    Parameters:
+    - raw_html (str): The page source of the job page.
+    - job_url (str): The URL of the job page.
+    - job_title (str): The job title that was searched for.
+
+    Returns:
+    - dict: The extracted job data including location, benefits, description paragraphs, jobID and company name.
+    """
+    job_data = {
+        "Job Title": job_title,
+        "URL": job_url,
+    }
+    # Location, benefits, description paragraphs and the jobID/company name of the embedded JSON object
+    job_data.update(extract("indeed_detail", raw_html))
+    return job_data
+
+
+def job_key(job_url):
+    """
+    Return the Indeed job key (`jk` parameter) of a job URL.
+
+    Parameters:
+    - job_url (str): The URL of the job page.
+
+    Returns:
+    - str: The job key, or the URL itself if it has no `jk` parameter.
+    """
+    query = urllib.parse.parse_qs(urllib.parse.urlparse(job_url).query)
+    return query.get("jk", [job_url])[0]
+
+
+def search_page_url(job_title, page):
+    """
+    Return the URL of a search result page.
+
+    Parameters:
+    - job_title (str): The job title to search for.
+    - page (int): The result page number (starting at 0).
+
+    Returns:
+    - str: The URL of the result page.
+    """
+    url = f"{BASE_URL}/jobs?q={urllib.parse.quote(job_title)}"
+    return f"{url}&start={page * RESULTS_PER_PAGE}" if page else url
+
+
+def job_view_url(key):
+    """Return the URL of the job page of an Indeed job key."""
+    return f"{BASE_URL}/viewjob?jk={key}"
+
+
+def extract_job_keys(raw_html):
+    """
+    Extract the job keys of a search result page in their order on the page.
+
+    The keys are taken from the job cards JSON embedded in the page (`window.mosaic.providerData`), which does not
+    require parsing the whole DOM. If the JSON is missing, the `data-jk` attributes and `jk` link parameters are used.
+
+    Parameters:
+    - raw_html (str): The page source of the search result page.
+
+    Returns:
+    - list: The unique job keys.
+    """
+    match = MOSAIC_PATTERN.search(raw_html)
+    if match:
+        try:
+            data = json.loads(match.group(1))
+            results = data["metaData"]["mosaicProviderJobCardsModel"]["results"]
+            keys = [result["jobkey"] for result in results if result.get("jobkey")]
+            if keys:
+                return list(dict.fromkeys(keys))
+        except (json.JSONDecodeError, KeyError, TypeError):
+            pass
+    return list(dict.fromkeys(a or b for a, b in JOB_KEY_PATTERN.findall(raw_html)))
+
+
+def fetch_in_tabs(sb, urls, wait=SEARCH_WAIT):
+    """
+    Load several pages at the same time in new browser tabs and return their sources.
+
+    The tabs are opened one after another without waiting, so the pages load in parallel; after a single wait each
+    tab is read and closed. Browsers without the CDP tab API load the pages one by one. Challenge pages are returned
+    like any other page; the caller checks them (see `collect_links_by_url`).
+
+    Parameters:
+    - sb (seleniumbase.SB): An instance of SeleniumBase in CDP mode.
+    - urls (list): The URLs to load.
+    - wait (int): Seconds to wait for the pages to load.
+
+    Returns:
+    - list: Tuples of (URL, page source) in the order of the URLs.
+    """
+    if not hasattr(sb, "cdp") or not hasattr(sb.cdp, "open_new_tab"):
+        pages = []
+        for url in urls:
+            sb.open(url)
+            sb.sleep(wait)
+            pages.append((url, sb.get_page_source()))
+        return pages
+
+    main_tab = sb.cdp.get_active_tab()
+    for url in urls:
+        sb.cdp.open_new_tab(url, switch_to=False)
+    sb.sleep(wait)
+    # New tabs are appended to the tab list in the order they were opened
+    tabs = [tab for tab in sb.cdp.get_tabs() if tab != main_tab][-len(urls):]
+
+    pages = []
+    for url, tab in zip(urls, tabs):
+        sb.cdp.switch_to_tab(tab)
+        pages.append((url, sb.get_page_source()))
+        sb.cdp.close_active_tab()
+    sb.cdp.switch_to_tab(main_tab)
+    return pages
+
+
+def collect_links_by_url(sb, job_title, raw_html, breaker, archive=None, max_pages=10):
+    """
+    Collect the job URLs of the search result pages by building the page URLs (`start` parameter).
+
+    The first page is already loaded; the following pages are loaded in batches of `SEARCH_TABS` parallel tabs.
+    Collection stops at the first page without new job keys.
+
+    Parameters:
+    - sb (seleniumbase.SB): An instance of SeleniumBase in CDP mode.
+    - job_title (str): The job title that was searched for.
+    - raw_html (str): The page source of the first result page.
+    - breaker (CircuitBreaker): The circuit breaker of the Indeed source.
+    - archive (PageArchive, optional): Raw page archive for the result pages.
+    - max_pages (int): The maximum number of result pages.
+
+    Returns:
+    - list: The unique job URLs in the order of the result pages.
+    """
+    keys = dict.fromkeys(extract_job_keys(raw_html))
+    if archive:
+        archive.append(search_page_url(job_title, 0), raw_html, kind="search", job_title=job_title)
+
+    page = 1
+    while page < max_pages:
+        urls = [search_page_url(job_title, p) for p in range(page, min(page + SEARCH_TABS, max_pages))]
+        page += len(urls)
+        print(f"Scraping Seiten {page - len(urls) + 1}-{page} für {job_title}")
+        wait_for_breaker(sb, breaker)
+        finished = False
+        for url, html in fetch_in_tabs(sb, urls):
+            if is_challenge_page(html):
+                # Solve path on the current page, then use its source if the challenge is gone
+                sb.open(url)
+                sb.sleep(SEARCH_WAIT)
+                html = solve_challenge(sb, breaker)
+                if html is None:
+                    print("Weitere Suchseiten blockiert")
+                    return [job_view_url(key) for key in keys]
+            else:
+                breaker.record_success()
+            if archive:
+                archive.append(url, html, kind="search", job_title=job_title)
+            new_keys = [key for key in extract_job_keys(html) if key not in keys]
+            keys.update(dict.fromkeys(new_keys))
+            if not new_keys:
+                finished = True
+        if finished:
+            print("Keine weiteren Seiten verfügbar")
+            break
+    return [job_view_url(key) for key in keys]
+
+
+def collect_links_by_clicking(sb, job_title, raw_html, breaker, archive=None, max_pages=10):
+    """
+    Collect the job URLs of the search result pages by clicking the "Nächste Seite" button.
+
+    Parameters:
+    - sb (seleniumbase.SB): An instance of SeleniumBase for browser automation.
+    - job_title (str): The job title that was searched for.
+    - raw_html (str): The page source of the first result page.
+    - breaker (CircuitBreaker): The circuit breaker of the Indeed source.
+    - archive (PageArchive, optional): Raw page archive for the result pages.
+    - max_pages (int): The maximum number of result pages.
+
+    Returns:
+    - list: The unique job URLs in the order of the result pages.
+    """
+    job_links = {}
+    for page in range(max_pages):
+        print(f"Scraping Seite {page + 1} für {job_title}")
+        if archive:
+            archive.append(sb.get_current_url(), raw_html, kind="search", job_title=job_title)
+        for href in extract("indeed_search", raw_html)["links"]:
+            job_url = BASE_URL + href
+            job_links.setdefault(job_key(job_url), job_url)
+
+        if page < max_pages - 1:
+            try:
+                next_button = sb.find_element('a[aria-label="Nächste Seite"]')
+                sb.click(next_button)
+                sb.sleep(5)  # Wait for next page; static delay
+            except Exception:
+                print("Keine weiteren Seiten verfügbar")
+                break
+            raw_html = solve_challenge(sb, breaker)
+            if raw_html is None:
+                print("Weitere Suchseiten blockiert")
+                break
+    return list(job_links.values())
+
+
+def solve_challenge(sb, breaker):
+    """
+    Check the current page for a bot challenge and run the slow solve path only if one is shown.
+
+    Parameters:
+    - sb (seleniumbase.SB): An instance of SeleniumBase for browser automation.
+    - breaker (CircuitBreaker): The circuit breaker of the Indeed source.
+
+    Returns:
+    - str or None: The page source, or None if the page is still a challenge after the solve attempt.
+    """
+    raw_html = sb.get_page_source()
+    if not is_challenge_page(raw_html):
+        breaker.record_success()
+        return raw_html
+
+    print("🧩 Challenge-Seite erkannt, versuche sie zu lösen")
+    try:
+        sb.uc_gui_click_captcha()
+        sb.sleep(SOLVE_WAIT)
+    except Exception as e:
+        print(f"⚠️ Lösen fehlgeschlagen: {str(e)}")
+
+    raw_html = sb.get_page_source()
+    if not is_challenge_page(raw_html):
+        breaker.record_success()
+        return raw_html
+
+    delay = breaker.record_challenge()
+    if delay:
+        print(f"⛔ Circuit Breaker geöffnet, nächster Versuch in {delay:.0f}s")
+    return None
+
 
-def scrape_indeed_for_title(job_title, sb, db):
+def wait_for_breaker(sb, breaker):
+    """
+    Pause the browser loop while the circuit breaker is open.
+
+    Parameters:
+    - sb (seleniumbase.SB): An instance of SeleniumBase for browser automation.
+    - breaker (CircuitBreaker): The circuit breaker of the Indeed source.
+    """
+    if not breaker.allow():
+        remaining = breaker.remaining()
+        print(f"⏸️ Pausiere {remaining:.0f}s wegen Challenge-Seiten")
+        sb.sleep(remaining)
+        breaker.allow()
+
+
+def scrape_indeed_for_title(job_title, sb, db, parse_pool=None, archive=None, breaker=None, stop=None):
     """
     Scrape job listings from Indeed for the given job title and store them in MongoDB.
 
     This function performs the following steps:
     1. Sets up a MongoDB collection for the specified job title with a unique index on jobID.
     2. Constructs the Indeed search URL for the job title and opens the search page using SeleniumBase.
-    3. Scrapes job links from the defined number of pages of search results.
+    3. Scrapes job links from the defined number of pages of search results, either by loading the result page
+       URLs in parallel tabs (default) or by clicking the "Nächste Seite" button (`INDEED_PAGINATION=click`).
     4. For each job link, extracts detailed job information including location, benefits, description, and additional data from embedded JSON.
     5. Stores the extracted job data in the MongoDB collection, skipping duplicates.
 
@@ -46,6 +330,18 @@ def scrape_indeed_for_title(job_title, sb, db):
     - job_title (str): The job title to search for.
     - sb (seleniumbase.SB): An instance of SeleniumBase for browser automation.
     - db (pymongo.database.Database): MongoDB database instance to store the scraped data.
+    - parse_pool (ParsePool, optional): Pool that parses the job pages in worker processes while the browser
+      loads the next page. If omitted, the pages are parsed inline.
+    - archive (PageArchive, optional): Raw page archive that receives the source of every fetched page
+      (see page_archive.py).
+    - breaker (CircuitBreaker, optional): Circuit breaker shared across job titles (see challenge.py).
+      Challenge pages pause the loop with exponential backoff and the affected job URLs are requeued.
+    - stop (threading.Event, optional): Stops the scraping before the next job page when set (e.g. the lease of
+      the job title was lost, see work_queue.py); the pages that are not stored yet are dropped.
+
+    Raises:
+    - SourceBlocked: If the search page or every job page stayed blocked by challenges, so the caller
+      (e.g. the lease queue, see work_queue.py) can retry the job title later.
 
     Note:
     - Currently limits scraping to 10 pages and processes 100 job links; adjust these limits for full scraping or testing purposes.
@@ -61,36 +357,26 @@ def scrape_indeed_for_title(job_title, sb, db):
 
     # Section: Construct Search URL and Open Page
     # Build the Indeed search URL and initiate browser navigation
-    encoded_job_title = urllib.parse.quote(job_title)
-    url = f"https://de.indeed.com/jobs?q={encoded_job_title}"
+    url = search_page_url(job_title, 0)
     print(f"\n🔍 Suche nach: {job_title}")
     print(url)
 
-    sb.activate_cdp_mode(url)  # Enable Chrome DevTools Protocol for enhanced control
-    sb.open(url)
-    sb.sleep(15)  # Wait for initial page load; static delay, replaceable with explicit waits
+    breaker = breaker or CircuitBreaker("Indeed")
+    with stage("link collection"):
+        wait_for_breaker(sb, breaker)
+        sb.activate_cdp_mode(url)  # Enable Chrome DevTools Protocol for enhanced control
+        sb.open(url)
+        sb.sleep(15)  # Wait for initial page load; static delay, replaceable with explicit waits
+        raw_html = solve_challenge(sb, breaker)
+        if raw_html is None:
+            print(f"Suchseite für {job_title} blockiert. Jobtitel wird übersprungen.")
+            raise SourceBlocked(f"Indeed search page for '{job_title}' is blocked")
 
-    # Section: Scrape Job Links from Multiple Pages
-    # Collect unique job URLs across multiple search result pages
-    job_links = []
-    max_pages = 10
-    for page in range(max_pages):
-        print(f"Scraping Seite {page + 1} für {job_title}")
-        raw_html = sb.get_page_source()
-        soup = BeautifulSoup(raw_html, "html.parser")
-        for link in soup.select("a[data-mobtk]"):  # Select job links with specific attribute
-            job_url = "https://de.indeed.com" + link["href"]
-            if job_url not in job_links:
-                job_links.append(job_url)
-
-        if page < max_pages - 1:
-            try:
-                next_button = sb.find_element('a[aria-label="Nächste Seite"]')
-                sb.click(next_button)
-                sb.sleep(5)  # Wait for next page; static delay
-            except:
-                print("Keine weiteren Seiten verfügbar")
-                break
+        # Section: Scrape Job Links from Multiple Pages
+        # Collect unique job URLs across multiple search result pages (INDEED_PAGINATION: "url" or "click")
+        max_pages = 10
+        collect_links = collect_links_by_clicking if PAGINATION == "click" else collect_links_by_url
+        job_links = collect_links(sb, job_title, raw_html, breaker, archive, max_pages)
 
     print(f"🔎 {len(job_links)} Jobangebote gefunden für {job_title}")
     print(job_links)
@@ -100,76 +386,82 @@ def scrape_indeed_for_title(job_title, sb, db):
         return
 
     # Section: Extract and Store Job Details
-    # Visit each job page, extract details, and save to MongoDB
-    for idx, job_url in enumerate(job_links, start=1):
+    # Visit each job page and hand its source to the parse pool; while the browser loads the next page,
+    # the finished pages are stored in MongoDB. Job pages answered with a challenge are requeued.
+    parse_pool = parse_pool or ParsePool(workers=0)
+    pending = []
+    queue = deque(enumerate(job_links, start=1))
+    attempts = {}
+    blocked = 0
+    while queue:
+        if stop is not None and stop.is_set():
+            print(f"⏹️ Scraping für {job_title} abgebrochen")
+            return
+        wait_for_breaker(sb, breaker)
+        idx, job_url = queue.popleft()
         try:
-            sb.open(job_url)
-            sb.sleep(5)  # Wait for job page load
-            raw_html = sb.get_page_source()
-            soup = BeautifulSoup(raw_html, "html.parser")
-
-            job_data = {
-                "Job Title": job_title,
-                "URL": job_url,
-            }
-
-            # Extract text from specified IDs (e.g., location)
-            for text_id in TEXT_IDS:
-                element = soup.find(id=text_id)
-                job_data[text_id] = element.get_text(separator=" ", strip=True) if element else "Nicht gefunden"
-
-            # Extract benefits list
-            benefits_div = soup.find(id=LIST_ID)
-            if benefits_div:
-                benefits = [li.get_text(strip=True) for li in benefits_div.find_all("li")]
-                job_data[LIST_ID] = benefits if benefits else "Keine Vorteile angegeben"
-            else:
-                job_data[LIST_ID] = "Nicht gefunden"
-
-            # Extract job description from paragraphs and list items
-            description_div = soup.find(id=DESCRIPTION_ID)
-            if description_div:
-                elements = description_div.find_all(["p", "li"])
-                paragraphs = [elem.get_text(strip=True) for elem in elements if elem.get_text(strip=True)]
-                job_data["paragraphs"] = paragraphs
+            with stage("detail fetch"):
+                sb.open(job_url)
+                sb.sleep(5)  # Wait for job page load
+                raw_html = solve_challenge(sb, breaker)
+        except Exception as e:
+            print(f"⚠️ Fehler bei Job {job_url}: {str(e)}")  # Broad exception catch; refine in production
+            continue
+
+        if raw_html is None:
+            attempts[job_url] = attempts.get(job_url, 0) + 1
+            if attempts[job_url] <= MAX_CHALLENGE_RETRIES:
+                queue.append((idx, job_url))
             else:
-                job_data["paragraphs"] = "Nicht gefunden"
-
-            # Extract additional data from embedded JSON object
-            scripts = soup.find_all("script")
-            pattern = r"window\._initialData\s*=\s*(\{.*?\});"  # Matches initial data JSON in script tags
-            for script in scripts:
-                script_text = script.string
-                if script_text:
-                    cleaned_script = " ".join(script_text.split())
-                    match = re.search(pattern, cleaned_script)
-                    if match:
-                        json_str = match.group(1)
-                        try:
-                            initial_data = json.loads(json_str)
-                            host_query_result = initial_data.get("hostQueryExecutionResult", {})
-                            job_dataElement = host_query_result.get("data", {}).get("jobData", {})
-                            results = job_dataElement.get("results", [])
-                            if results and len(results) > 0:
-                                first_result = results[0]
-                                jobElement = first_result.get("job", {})
-                                key = jobElement.get("key")
-                                CompanyName = jobElement.get("sourceEmployerName")
-                                if key:
-                                    job_data["jobID"] = key
-                                if CompanyName:
-                                    job_data["Company Name"] = CompanyName
-                        except json.JSONDecodeError:
-                            print("Fehler beim Parsen des JSON-Strings")
-                            continue
-
-            # Insert job data into MongoDB, handling duplicates
-            try:
-                collection.insert_one(job_data)
-                print(f"✅ {job_title} - Job {idx} erfolgreich gespeichert")
-            except DuplicateKeyError:
-                print(f"⏩ Übersprungen: {job_url} existiert bereits")
+                print(f"⏩ Übersprungen nach {attempts[job_url]} Challenges: {job_url}")
+                blocked += 1
+            continue
+
+        if archive:
+            archive.append(job_url, raw_html, key=job_key(job_url), kind="detail", job_title=job_title)
+
+        future = parse_pool.submit(parse_indeed_job, raw_html, job_url, job_title)
+        pending.append((idx, job_url, future))
+        with stage("store"):
+            pending = store_parsed_jobs(pending, collection, job_title)
+
+    with stage("store"):
+        store_parsed_jobs(pending, collection, job_title, wait=True)
+    parse_pool.report(f"Parse-Pool {job_title}")
+    breaker.report()
+    if blocked == len(job_links):
+        raise SourceBlocked(f"All {blocked} Indeed job pages for '{job_title}' are blocked")
+
+
+def store_parsed_jobs(pending, collection, job_title, wait=False):
+    """
+    Store the job data of all finished parse futures in MongoDB.
+
+    Parameters:
+    - pending (list): Tuples of (index, job URL, future) for the submitted job pages.
+    - collection (pymongo.collection.Collection): The MongoDB collection of the job title.
+    - job_title (str): The job title that was searched for.
+    - wait (bool): If True, wait for all futures; otherwise only finished futures are stored.
+
+    Returns:
+    - list: The tuples of the futures that are still running.
+    """
+    remaining = []
+    for idx, job_url, future in pending:
+        if not wait and not future.done():
+            remaining.append((idx, job_url, future))
+            continue
 
+        try:
+            job_data = future.result()
         except Exception as e:
-            print(f"⚠️ Fehler bei Job {job_url}: {str(e)}")  # Broad exception catch; refine in production
+            print(f"⚠️ Fehler bei Job {job_url}: {str(e)}")
             continue
+
+        # Insert job data into MongoDB, handling duplicates
+        try:
+            collection.insert_one(job_data)
+            print(f"✅ {job_title} - Job {idx} erfolgreich gespeichert")
+        except DuplicateKeyError:
+            print(f"⏩ Übersprungen: {job_url} existiert bereits")
+    return remaining
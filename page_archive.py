@@ -0,0 +1,284 @@
+import argparse
+import json
+import mmap
+import os
+import zlib
+from datetime import datetime, timezone
+
+"""
+This module provides an append-only archive of the raw pages fetched by both scrapers.
+
+Every page is compressed on its own and appended to a segment file; an index (one JSON line per page)
+stores the key (jobId/jobkey or URL), the URL, the fetch time and the position of the record in its segment.
+Because records are compressed individually, the reader can map the segment files with `mmap` and decompress
+a single page straight from the mapped memory without reading the rest of the segment.
+
+Layout of an archive directory::
+
+    <archive>/<source>/segment-000001.dat
+    <archive>/<source>/segment-000002.dat
+    <archive>/<source>/index.jsonl
+
+Configuration:
+- The archive is written if the environment variable `PAGE_ARCHIVE_DIR` is set
+  (Indeed: run_scrapers_parallel.py, Stepstone: PageArchiveMiddleware in stepstonesearch/middlewares.py).
+
+Usage:
+- Re-run the current parsers over the archive without network I/O:
+  ``python page_archive.py reextract <archive> --source stepstone --output jobs.jsonl [--workers N]``
+  (one worker process per CPU core by default)
+"""
+
+SEGMENT_SIZE = 64 * 1024 * 1024  # Start a new segment file after 64 MiB
+INDEX_FILE = "index.jsonl"
+
+
+def segment_name(number):
+    return f"segment-{number:06d}.dat"
+
+
+class PageArchive:
+    """
+    Append-only writer for the raw pages of one source.
+
+    :ivar directory: The directory of the source inside the archive.
+    :ivar segment_size: The size after which a new segment file is started.
+    """
+
+    def __init__(self, root, source, segment_size=SEGMENT_SIZE):
+        """
+        Open the archive of a source for appending.
+
+        :param root: The archive directory.
+        :param source: The name of the source (e.g. "indeed" or "stepstone").
+        :param segment_size: The size after which a new segment file is started.
+        """
+        self.directory = os.path.join(root, source)
+        self.segment_size = segment_size
+        os.makedirs(self.directory, exist_ok=True)
+
+        segments = sorted(f for f in os.listdir(self.directory) if f.startswith("segment-"))
+        self.segment = int(segments[-1][8:14]) if segments else 1
+        self.segment_file = open(os.path.join(self.directory, segment_name(self.segment)), "ab")
+        self.index_file = open(os.path.join(self.directory, INDEX_FILE), "a", encoding="utf-8")
+
+    def append(self, url, body, key=None, kind="detail", fetched_at=None, **meta):
+        """
+        Compress and append a page to the archive.
+
+        :param url: The URL of the page.
+        :param body: The raw page as str or bytes.
+        :param key: The key of the page (jobId/jobkey); defaults to the URL.
+        :param kind: The kind of page, e.g. "search" or "detail".
+        :param fetched_at: The fetch time as datetime; defaults to now (UTC).
+        :param meta: Additional fields stored in the index entry (e.g. job_title).
+        :return: The index entry of the record.
+        """
+        if isinstance(body, str):
+            body = body.encode("utf-8")
+        compressed = zlib.compress(body, 6)
+
+        if self.segment_file.tell() > 0 and self.segment_file.tell() + len(compressed) > self.segment_size:
+            self.segment_file.close()
+            self.segment += 1
+            self.segment_file = open(os.path.join(self.directory, segment_name(self.segment)), "ab")
+
+        offset = self.segment_file.tell()
+        self.segment_file.write(compressed)
+        self.segment_file.flush()
+
+        entry = {
+            "key": key or url,
+            "url": url,
+            "kind": kind,
+            "fetched_at": (fetched_at or datetime.now(timezone.utc)).isoformat(),
+            "segment": self.segment,
+            "offset": offset,
+            "length": len(compressed),
+            "size": len(body),
+            **meta,
+        }
+        self.index_file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        self.index_file.flush()
+        return entry
+
+    def close(self):
+        self.segment_file.close()
+        self.index_file.close()
+
+
+class ArchiveReader:
+    """
+    Random access to the archived pages of one source via memory-mapped segment files.
+
+    :ivar directory: The directory of the source inside the archive.
+    :ivar entries: All index entries in the order they were written.
+    """
+
+    def __init__(self, root, source, load_index=True):
+        """
+        Load the index of a source.
+
+        :param root: The archive directory.
+        :param source: The name of the source.
+        :param load_index: If False, the index is not loaded and pages can only be read by their index entries.
+        """
+        self.directory = os.path.join(root, source)
+        self.entries = []
+        self.by_key = {}
+        self.maps = {}
+        if not load_index:
+            return
+        with open(os.path.join(self.directory, INDEX_FILE), "r", encoding="utf-8") as file:
+            for line in file:
+                if line.strip():
+                    entry = json.loads(line)
+                    self.entries.append(entry)
+                    self.by_key.setdefault(entry["key"], []).append(entry)
+
+    def segment_map(self, segment):
+        """
+        Return the memory map of a segment file (mapped once and cached).
+
+        :param segment: The segment number.
+        :return: A read-only :class:`mmap.mmap`.
+        """
+        if segment not in self.maps:
+            with open(os.path.join(self.directory, segment_name(segment)), "rb") as file:
+                self.maps[segment] = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        return self.maps[segment]
+
+    def read(self, entry):
+        """
+        Decompress the page of an index entry directly from the mapped segment.
+
+        :param entry: An index entry.
+        :return: The raw page as bytes.
+        """
+        view = memoryview(self.segment_map(entry["segment"]))
+        try:
+            return zlib.decompress(view[entry["offset"]:entry["offset"] + entry["length"]])
+        finally:
+            view.release()
+
+    def get(self, key, at=None):
+        """
+        Return the latest archived version of a page.
+
+        :param key: The key (jobId/jobkey or URL) of the page.
+        :param at: Optional datetime; only versions fetched at or before this time are considered.
+        :return: A tuple of (index entry, raw page bytes), or None if the key is not archived.
+        """
+        entries = self.by_key.get(key, [])
+        if at is not None:
+            entries = [e for e in entries if datetime.fromisoformat(e["fetched_at"]) <= at]
+        if not entries:
+            return None
+        entry = max(entries, key=lambda e: e["fetched_at"])
+        return entry, self.read(entry)
+
+    def latest(self, kind=None):
+        """
+        Iterate over the latest archived version of every page.
+
+        :param kind: Optional kind of page (e.g. "detail"); other entries are skipped.
+        :return: A generator of index entries in the order their keys were first archived.
+        """
+        for entries in self.by_key.values():
+            if kind is not None:
+                entries = [e for e in entries if e["kind"] == kind]
+            if entries:
+                yield max(entries, key=lambda e: e["fetched_at"])
+
+    def close(self):
+        for mapped in self.maps.values():
+            mapped.close()
+        self.maps = {}
+
+
+# Readers of the worker processes, opened once per process and source
+_worker_readers = {}
+
+
+def reextract_entry(root, source, entry):
+    """
+    Run the current parser of a source over one archived page.
+
+    This function runs in a worker process of the ParsePool; only the index entry is sent to the worker,
+    which reads the page from its own memory map of the segment file.
+
+    :param root: The archive directory.
+    :param source: The name of the source ("indeed" or "stepstone").
+    :param entry: The index entry of a detail page.
+    :return: The extracted job data.
+    """
+    if (root, source) not in _worker_readers:
+        _worker_readers[(root, source)] = ArchiveReader(root, source, load_index=False)
+    html = _worker_readers[(root, source)].read(entry).decode("utf-8", errors="replace")
+
+    if source == "indeed":
+        from indeed_scraper import parse_indeed_job
+        return parse_indeed_job(html, entry["url"], entry.get("job_title", ""))
+
+    from stepstonesearch.spiders.sitespider import extract_job_details
+    paragraphs, lists = extract_job_details(html)
+    return {
+        "Job Title": entry.get("job_title", ""),
+        "url": entry["url"],
+        "jobId": entry["key"],
+        "paragraphs": paragraphs,
+        "lists": lists,
+    }
+
+
+def reextract(root, source, output, workers=None):
+    """
+    Re-run the current parsers over all archived detail pages of a source in parallel.
+
+    Only the latest version of every key is parsed. The results are written as JSON lines.
+
+    :param root: The archive directory.
+    :param source: The name of the source ("indeed" or "stepstone").
+    :param output: The path of the JSON lines output file.
+    :param workers: The number of worker processes (default: one per CPU core, the re-extraction is CPU-bound).
+    :return: The number of extracted jobs.
+    """
+    from parse_pool import ParsePool
+
+    reader = ArchiveReader(root, source)
+    latest = list(reader.latest("detail"))
+    reader.close()
+
+    pool = ParsePool(os.cpu_count() if workers is None else workers)
+    futures = [pool.submit(reextract_entry, root, source, entry) for entry in latest]
+    count = 0
+    with open(output, "w", encoding="utf-8") as file:
+        for future in futures:
+            try:
+                job_data = future.result()
+            except Exception as e:
+                print(f"⚠️ Fehler beim Re-Extrahieren: {e}")
+                continue
+            file.write(json.dumps(job_data, ensure_ascii=False) + "\n")
+            count += 1
+    pool.shutdown()
+    pool.report(f"Re-Extraktion {source}")
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Raw page archive of the scrapers.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    command = commands.add_parser("reextract", help="run the current parsers over the archived detail pages")
+    command.add_argument("archive")
+    command.add_argument("--source", choices=["indeed", "stepstone"], required=True)
+    command.add_argument("--output", required=True)
+    command.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    count = reextract(args.archive, args.source, args.output, args.workers)
+    print(f"✅ {count} Jobs nach '{args.output}' geschrieben")
+
+
+if __name__ == "__main__":
+    main()
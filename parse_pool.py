@@ -0,0 +1,162 @@
+import os
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+
+from profiling import stage
+
+"""
+This module provides a process pool for the CPU-bound HTML parsing of both scrapers.
+
+Parsing large job pages with XPath (see extraction.py) blocks the thread that also drives the browser (Indeed)
+or the Twisted reactor (Stepstone). The ParsePool hands raw HTML bodies to worker processes and returns the
+extracted dictionaries as futures, so the next page can be downloaded while the previous ones are parsed.
+It also keeps track of the queue depth and the parse throughput.
+
+Configuration:
+- The number of worker processes of the scraper pools is taken from the environment variable `PARSE_WORKERS`
+  (default: 2). `PARSE_WORKERS=0` parses inline without worker processes. The bulk re-extraction of the page
+  archive (see page_archive.py) is CPU-bound and uses one worker per CPU core unless `--workers` is given.
+"""
+
+# A page takes milliseconds to parse while both scrapers wait seconds between pages, and every Stepstone crawl
+# starts its own pool next to the one of the Indeed scraper, so a few workers are enough on any host
+DEFAULT_WORKERS = 2
+
+
+def default_workers():
+    """
+    Return the configured number of parse worker processes.
+
+    :return: The value of `PARSE_WORKERS`, or DEFAULT_WORKERS if it is not set.
+    """
+    return int(os.getenv("PARSE_WORKERS", DEFAULT_WORKERS))
+
+
+def _timed_call(fn, args):
+    """Run a parse function in the worker process and measure its CPU-bound duration."""
+    start = time.perf_counter()
+    with stage("parse"):
+        result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+class ParsePool:
+    """
+    A process pool for parse functions with queue depth and throughput statistics.
+
+    Parse functions must be module-level functions that take the raw HTML (and other picklable arguments)
+    and return a picklable result, usually a dictionary.
+
+    :ivar workers: The number of worker processes (0 parses inline in the calling thread).
+    :ivar submitted: The number of submitted pages.
+    :ivar completed: The number of finished pages (including failures).
+    :ivar failed: The number of pages whose parse function raised an exception.
+    :ivar max_queue_depth: The highest number of pages waiting or being parsed at the same time.
+    :ivar parse_seconds: The summed parse time measured in the workers.
+    """
+
+    def __init__(self, workers=None):
+        """
+        Initialize the pool.
+
+        :param workers: The number of worker processes; defaults to :func:`default_workers`.
+        """
+        self.workers = default_workers() if workers is None else workers
+        self.executor = ProcessPoolExecutor(max_workers=self.workers) if self.workers > 0 else None
+        self.lock = threading.Lock()
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.max_queue_depth = 0
+        self.parse_seconds = 0.0
+        self.started = None
+
+    @property
+    def queue_depth(self):
+        """The number of pages that are waiting or being parsed."""
+        return self.submitted - self.completed
+
+    def submit(self, fn, *args):
+        """
+        Submit a page to the pool.
+
+        :param fn: The module-level parse function.
+        :param args: The arguments for the parse function, usually starting with the raw HTML.
+        :return: A :class:`concurrent.futures.Future` resolving to the result of the parse function.
+        """
+        with self.lock:
+            if self.started is None:
+                self.started = time.perf_counter()
+            self.submitted += 1
+            self.max_queue_depth = max(self.max_queue_depth, self.queue_depth)
+
+        outer = Future()
+        if self.executor is None:
+            try:
+                result = _timed_call(fn, args)
+            except Exception as e:
+                self._finish(outer, exception=e)
+            else:
+                self._finish(outer, result=result)
+            return outer
+
+        inner = self.executor.submit(_timed_call, fn, args)
+        inner.add_done_callback(lambda f: self._finish(outer, future=f))
+        return outer
+
+    def _finish(self, outer, result=None, exception=None, future=None):
+        """Record a finished page and resolve the future returned by `submit`."""
+        if future is not None:
+            try:
+                result = future.result()
+            except Exception as e:
+                exception = e
+        with self.lock:
+            self.completed += 1
+            if exception is not None:
+                self.failed += 1
+            else:
+                self.parse_seconds += result[1]
+        if exception is not None:
+            outer.set_exception(exception)
+        else:
+            outer.set_result(result[0])
+
+    def stats(self):
+        """
+        Return the current pool statistics.
+
+        :return: A dictionary with counters, queue depth, throughput (pages per second) and average parse time.
+        """
+        with self.lock:
+            elapsed = time.perf_counter() - self.started if self.started else 0.0
+            succeeded = self.completed - self.failed
+            return {
+                "workers": self.workers,
+                "submitted": self.submitted,
+                "completed": self.completed,
+                "failed": self.failed,
+                "queue_depth": self.queue_depth,
+                "max_queue_depth": self.max_queue_depth,
+                "pages_per_second": self.completed / elapsed if elapsed else 0.0,
+                "avg_parse_ms": self.parse_seconds * 1000 / succeeded if succeeded else 0.0,
+            }
+
+    def report(self, label="Parse-Pool"):
+        """
+        Print the current pool statistics.
+
+        :param label: A label printed in front of the statistics.
+        """
+        s = self.stats()
+        print(f"📊 {label}: {s['completed']}/{s['submitted']} Seiten geparst ({s['failed']} Fehler), "
+              f"Queue {s['queue_depth']} (max {s['max_queue_depth']}), "
+              f"{s['pages_per_second']:.1f} Seiten/s, {s['avg_parse_ms']:.1f} ms/Seite, {s['workers']} Worker")
+
+    def shutdown(self):
+        """
+        Wait for pending pages and stop the worker processes.
+        """
+        if self.executor is not None:
+            self.executor.shutdown(wait=True)
@@ -0,0 +1,221 @@
+import atexit
+import multiprocessing
+import multiprocessing.util
+import os
+import random
+import signal
+import sys
+import threading
+import uuid
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+
+"""
+This module provides an opt-in sampling profiler for the pipeline stages of a scraper run.
+
+A wall-clock timer (SIGALRM) interrupts the process every `PROFILE_INTERVAL` seconds and records the current
+Python stack together with the active stages (e.g. "link collection", "detail fetch", "parse", "store").
+Because the timer runs on wall-clock time, waits for the network or the browser show up next to the CPU-bound
+XPath parsing, JSON handling and MongoDB writes. Only the active stages are sampled, so the overhead
+is one stack walk per interval and the profiler can stay enabled on a fraction of the production runs.
+
+The decision to profile a run is made once in run_scrapers_parallel.py and passed to all child processes (Scrapy
+crawl subprocess, parse workers) with the environment variable `PROFILE_RUN_ID`. Each process writes its samples to
+``<PROFILE_DIR>/<run id>/<process>-<pid>.folded``; at the end of the run they are merged into:
+
+- ``merged.folded``: all samples of the run, rooted at process and stage names
+- ``stage-<name>.folded``: the samples of one stage
+
+The files use the folded stack format (``frame;frame;frame count``) of flamegraph.pl, inferno and speedscope.
+
+Configuration:
+- `PROFILE_RATE`: the share of runs that are profiled (0 = off, 1 = every run).
+- `PROFILE_DIR`: the output directory (default: "profiles").
+- `PROFILE_INTERVAL`: the sampling interval in seconds (default: 0.01).
+"""
+
+
+class StageProfiler:
+    """
+    Samples the stack of the main thread of one process while a stage is active.
+
+    :ivar run_id: The ID of the profiled run.
+    :ivar label: The name of the process (root frame of its stacks).
+    :ivar directory: The output directory of the run.
+    :ivar stages: The stack of the active stage names.
+    :ivar samples: The number of samples per folded stack.
+    """
+
+    def __init__(self, run_id, label, directory, interval):
+        self.run_id = run_id
+        self.label = label
+        self.directory = directory
+        self.interval = interval
+        self.pid = os.getpid()
+        self.stages = []
+        self.samples = Counter()
+        self.running = False
+
+    def start(self):
+        """Install the timer; sampling is only possible in the main thread of a process."""
+        if threading.current_thread() is not threading.main_thread():
+            return
+        signal.signal(signal.SIGALRM, self.sample)
+        signal.setitimer(signal.ITIMER_REAL, self.interval, self.interval)
+        self.running = True
+        atexit.register(self.flush)
+        # Worker processes of multiprocessing leave with os._exit and skip atexit
+        multiprocessing.util.Finalize(self, self.flush, exitpriority=10)
+
+    def stop(self):
+        if self.running:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            self.running = False
+
+    def sample(self, signum, frame):
+        if not self.stages:
+            return
+        stack = []
+        while frame is not None:
+            code = frame.f_code
+            stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+            frame = frame.f_back
+        self.samples[";".join([self.label, *self.stages, *reversed(stack)])] += 1
+
+    def enter(self, name):
+        self.stages.append(name)
+
+    def leave(self):
+        if self.stages:
+            self.stages.pop()
+
+    def flush(self):
+        """Write the samples of this process (the file is rewritten on every call)."""
+        if not self.samples or os.getpid() != self.pid:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, f"{self.label}-{self.pid}.folded")
+        with open(path, "w", encoding="utf-8") as file:
+            for stack, count in self.samples.items():
+                file.write(f"{stack} {count}\n")
+
+
+_profiler = None
+
+
+def get_profiler(label=None):
+    """
+    Return the profiler of the current process if the run is profiled.
+
+    The profiler is started on first use in every process whose environment contains `PROFILE_RUN_ID`.
+    Forked child processes do not reuse the samples of their parent.
+
+    :param label: The process name; defaults to "parse_worker" in multiprocessing children and the script name otherwise.
+    :return: The StageProfiler, or None if the run is not profiled.
+    """
+    global _profiler
+    run_id = os.getenv("PROFILE_RUN_ID")
+    if not run_id:
+        return None
+    if _profiler is None or _profiler.pid != os.getpid():
+        if label is None:
+            is_child = multiprocessing.parent_process() is not None
+            label = "parse_worker" if is_child else os.path.splitext(os.path.basename(sys.argv[0]))[0] or "python"
+        directory = os.path.join(os.getenv("PROFILE_DIR", "profiles"), run_id)
+        _profiler = StageProfiler(run_id, label, directory, float(os.getenv("PROFILE_INTERVAL", 0.01)))
+        _profiler.start()
+    return _profiler
+
+
+@contextmanager
+def stage(name):
+    """
+    Mark a pipeline stage; a no-op unless the run is profiled.
+
+    :param name: The stage name, e.g. "link collection", "detail fetch", "parse" or "store".
+    """
+    profiler = get_profiler()
+    if profiler is None:
+        yield
+        return
+    profiler.enter(name)
+    try:
+        yield
+    finally:
+        profiler.leave()
+
+
+def start_run(label):
+    """
+    Decide whether this run is profiled (`PROFILE_RATE`) and pass the decision on to the child processes.
+
+    :param label: The name of the main process.
+    :return: The run ID, or None if the run is not profiled.
+    """
+    if os.getenv("PROFILE_RUN_ID"):
+        return os.environ["PROFILE_RUN_ID"]
+    if random.random() >= float(os.getenv("PROFILE_RATE", 0)):
+        return None
+    run_id = f"{datetime.now().strftime('%Y-%m-%d_%H-%M-%S')}-{uuid.uuid4().hex[:6]}"
+    os.environ["PROFILE_RUN_ID"] = run_id
+    # Child processes may run in another working directory
+    os.environ["PROFILE_DIR"] = os.path.abspath(os.getenv("PROFILE_DIR", "profiles"))
+    get_profiler(label)
+    print(f"🔬 Profiling aktiv: {run_id}")
+    return run_id
+
+
+def merge_run(directory):
+    """
+    Merge the process files of a run into ``merged.folded`` and one ``stage-<name>.folded`` file per stage.
+
+    A sample counts for every stage on its stack, so nested stages contain the samples of their inner stages.
+
+    :param directory: The output directory of the run.
+    :return: The total number of samples.
+    """
+    merged = Counter()
+    if not os.path.isdir(directory):
+        return 0
+    for name in os.listdir(directory):
+        if name.endswith(".folded") and name != "merged.folded" and not name.startswith("stage-"):
+            with open(os.path.join(directory, name), "r", encoding="utf-8") as file:
+                for line in file:
+                    stack, _, count = line.rstrip("\n").rpartition(" ")
+                    if stack:
+                        merged[stack] += int(count)
+
+    stages = {}
+    for stack, count in merged.items():
+        # Stage frames follow the process frame and have no "(file:line)" suffix
+        for frame in stack.split(";")[1:]:
+            if frame.endswith(")"):
+                break
+            stages.setdefault(frame, Counter())[stack] += count
+
+    write_folded(os.path.join(directory, "merged.folded"), merged)
+    for name, samples in stages.items():
+        write_folded(os.path.join(directory, f"stage-{name.replace(' ', '_')}.folded"), samples)
+    return sum(merged.values())
+
+
+def write_folded(path, samples):
+    with open(path, "w", encoding="utf-8") as file:
+        for stack, count in sorted(samples.items()):
+            file.write(f"{stack} {count}\n")
+
+
+def finish_run():
+    """
+    Stop the profiler of the main process, write its samples and merge the files of all processes of the run.
+
+    Must be called after the child processes (crawl subprocesses, parse pools) have finished.
+    """
+    profiler = get_profiler()
+    if profiler is None:
+        return
+    profiler.stop()
+    profiler.flush()
+    total = merge_run(profiler.directory)
+    print(f"🔬 Profil: {total} Samples in '{profiler.directory}' (merged.folded, stage-*.folded)")
@@ -1,11 +1,15 @@
 import time
-from seleniumbase import SB
-from indeed_scraper import scrape_indeed_for_title
-from stepstone_scraper import run_spiders
-import pymongo
 import os
+from contextlib import ExitStack
+from startup_timing import StartupTimer
+
+startup = StartupTimer()
+
+import pymongo
 from dotenv import load_dotenv
 
+startup.mark("import pymongo, dotenv")
+
 
 """
 This module contains a script for scraping job listings from Indeed and Stepstone
@@ -22,6 +26,11 @@ Dependencies:
 
 Configuration:
 - The MongoDB URI must be set in the environment variable `MONGO_URI` or in a `.env` file.
+- `SCRAPER_SOURCES` selects the sources (default: "indeed,stepstone"). The modules of a source, including
+  SeleniumBase for Indeed, are only imported if the source is enabled.
+- `QUEUE_MODE=1` lets several containers share the job titles: every (source, job title) pair becomes a task
+  in a MongoDB lease queue and each container claims tasks until the batch is done (see work_queue.py).
+- `STARTUP_TIMING=1` prints a cold-start breakdown (see startup_timing.py).
 
 Usage:
 - Run the script directly: `python run_scrapers_parallel.py`
@@ -36,6 +45,12 @@ MONGO_URI = os.getenv("MONGO_URI")
 if not MONGO_URI:
     raise ValueError("Keine MONGO_URI in den Umgebungsvariablen gefunden")
 
+# Quellen, die gescrapt werden sollen
+SOURCES = [source.strip() for source in os.getenv("SCRAPER_SOURCES", "indeed,stepstone").split(",") if source.strip()]
+
+# Aufgaben aus der gemeinsamen Lease-Queue statt der kompletten Jobtitel-Liste abarbeiten
+QUEUE_MODE = os.getenv("QUEUE_MODE") == "1"
+
 def fetch_job_titles_from_mongodb(client):
     """
      Fetches the list of job titles from the MongoDB database.
@@ -82,28 +97,154 @@ def main():
       - The script uses a 2-second delay between scraping each job title to
         avoid overwhelming the websites.
       - Ensure that the MongoDB URI is correctly set in the environment.
-      - The script requires SeleniumBase and the necessary webdrivers.
+      - The script requires SeleniumBase and the necessary webdrivers if Indeed is enabled in `SCRAPER_SOURCES`.
+      - Indeed job pages are parsed in worker processes (see parse_pool.py); set `PARSE_WORKERS`
+        to change their number.
+      - With `QUEUE_MODE=1` the tasks are claimed from the lease queue (see work_queue.py) instead of
+        processing every job title, so any number of containers can run in parallel.
+      - The Indeed browser uses a proxy of the identity pool (see identity_pool.py) and keeps its own user
+        agent; set `PROXY_URLS` to route it through a proxy. Challenge pages lower the score of the identity, and
+        once it is benched the browser is relaunched with another proxy before the next job title.
+      - If `PAGE_ARCHIVE_DIR` is set, the raw HTML of every fetched page is archived (see page_archive.py).
+      - With `PROFILE_RATE` (share of runs, e.g. 0.05) a run is profiled per pipeline stage, including the
+        crawl subprocesses and parse workers (see profiling.py).
+      - If `PARQUET_EXPORT_DIR` is set, the jobs inserted since the last export are appended to a partitioned
+        Parquet dataset at the end of the run (see export_parquet.py).
       """
 
+    # Entscheidet per PROFILE_RATE, ob dieser Lauf profiliert wird (siehe profiling.py)
+    from profiling import finish_run, stage, start_run
+    start_run("run_scrapers")
+
     client = pymongo.MongoClient(MONGO_URI)
     job_titles = fetch_job_titles_from_mongodb(client)
     db = client["stepstone_data"]
-
-    # für lokale Durchführung
-    #with SB(uc=True, test=True, locale_code="de") as sb:
-
-    chrome_args = ["--headless", "--no-sandbox", "--disable-dev-shm-usage"]
-    with SB(uc=True, test=True, locale_code="de", disable_csp=True, chromium_arg=chrome_args) as sb:
-        for job_title in job_titles:
-            print(f"🚀 Starte Scraping für: {job_title}")
-            # Scrape Indeed
-            scrape_indeed_for_title(job_title, sb, db)
-            # Scrape Stepstone
-            run_spiders(job_title, db)
-            print(f"✅ Fertig: {job_title}\n")
-            time.sleep(2)  # Kurze Pause zwischen den Jobtiteln
-
+    startup.mark("MongoDB: Jobtitel laden")
+
+    run_indeed = "indeed" in SOURCES
+    run_stepstone = "stepstone" in SOURCES
+    if run_stepstone:
+        run_spiders = startup.timed_import("stepstone_scraper").run_spiders
+
+    parse_pool = archive = indeed_breaker = identity_pool = indeed_identity = sb = None
+    browsers = ExitStack()
+    if run_indeed:
+        scrape_indeed_for_title = startup.timed_import("indeed_scraper").scrape_indeed_for_title
+        SB = startup.timed_import("seleniumbase").SB
+        from parse_pool import ParsePool
+        from page_archive import PageArchive
+        from challenge import CircuitBreaker
+        from identity_pool import IdentityPool
+
+        # Worker-Prozesse parsen die Indeed-Jobseiten, während der Browser die nächste Seite lädt
+        parse_pool = ParsePool()
+        # Rohseiten-Archiv zum Prüfen und erneuten Parsen, nur mit PAGE_ARCHIVE_DIR
+        archive_dir = os.getenv("PAGE_ARCHIVE_DIR")
+        archive = PageArchive(archive_dir, "indeed") if archive_dir else None
+        # Pausiert das Indeed-Scraping mit exponentiellem Backoff, wenn sich Challenge-Seiten häufen
+        indeed_breaker = CircuitBreaker("Indeed")
+        # Proxy des Browsers (PROXY_URLS); der User-Agent bleibt der des Chromium
+        identity_pool = IdentityPool()
+        indeed_identity = identity_pool.acquire(session="indeed")
+
+    def launch_browser():
+        """Start the Indeed browser with the proxy of the current identity and quit the previous browser."""
+        nonlocal sb
+        browsers.close()
+
+        # für lokale Durchführung
+        #sb = browsers.enter_context(SB(uc=True, test=True, locale_code="de"))
+
+        chrome_args = ["--headless", "--no-sandbox", "--disable-dev-shm-usage"]
+        sb = browsers.enter_context(SB(uc=True, test=True, locale_code="de", disable_csp=True,
+                                       chromium_arg=chrome_args, **indeed_identity.browser_options()))
+
+    def rotate_indeed_identity():
+        """Relaunch the Indeed browser with another identity if the current one was benched."""
+        nonlocal indeed_identity
+        if identity_pool.available(indeed_identity):
+            return
+        identity = identity_pool.acquire(session="indeed")
+        if identity is not indeed_identity:
+            print(f"🔄 Identität {indeed_identity.name} pausiert, starte Browser neu mit {identity.name}")
+            indeed_identity = identity
+            launch_browser()
+
+    def scrape(source, job_title, stop=None):
+        with stage(source):
+            scrape_source(source, job_title, stop)
+
+    def scrape_source(source, job_title, stop):
+        if source == "indeed":
+            rotate_indeed_identity()
+            challenges, opens = indeed_breaker.challenges, indeed_breaker.opens
+            identity_pool.mark_used(indeed_identity)
+            try:
+                # Blockierte Jobtitel lösen SourceBlocked aus, damit die Queue sie erneut versucht
+                scrape_indeed_for_title(job_title, sb, db, parse_pool, archive, indeed_breaker, stop)
+            finally:
+                # Challenge-Seiten senken den Health-Score der Browser-Identität
+                if indeed_breaker.challenges > challenges:
+                    identity_pool.record_failure(indeed_identity, blocked=indeed_breaker.opens > opens)
+                else:
+                    identity_pool.record_success(indeed_identity)
+        elif source == "stepstone":
+            run_spiders(job_title, db, stop=stop)
+
+    try:
+        with browsers:
+            if run_indeed:
+                launch_browser()
+            startup.mark("Browser starten" if run_indeed else "Setup")
+            if QUEUE_MODE:
+                # Mehrere Container teilen sich die (Quelle, Jobtitel)-Aufgaben über die Lease-Queue
+                from work_queue import LeaseQueue
+                queue = LeaseQueue(client)
+                created = queue.seed(job_titles, SOURCES)
+                print(f"📋 Queue '{queue.batch}': {created} neue Aufgaben, Worker {queue.worker_id}")
+                for idx, task in enumerate(queue.tasks(SOURCES)):
+                    print(f"🚀 Starte Scraping für: {task['title']} ({task['source']}, Versuch {task['attempts']})")
+                    try:
+                        # Bei verlorener Lease bricht das Scraping ab und die Aufgabe wird nicht abgeschlossen
+                        with queue.leased(task) as lease:
+                            scrape(task["source"], task["title"], lease.lost)
+                    except Exception as e:
+                        print(f"❌ Fehler bei {task['title']} ({task['source']}): {e}")
+                    else:
+                        print(f"✅ Fertig: {task['title']} ({task['source']})\n")
+                    if idx == 0:
+                        startup.mark("Erste Aufgabe")
+                    time.sleep(2)  # Kurze Pause zwischen den Aufgaben
+                print(f"📋 Queue '{queue.batch}': {queue.stats()}")
+            else:
+                for idx, job_title in enumerate(job_titles):
+                    print(f"🚀 Starte Scraping für: {job_title}")
+                    # Scrape Indeed, dann Stepstone
+                    for source in SOURCES:
+                        try:
+                            scrape(source, job_title)
+                        except Exception as e:
+                            print(f"❌ Fehler bei {job_title} ({source}): {e}")
+                    print(f"✅ Fertig: {job_title}\n")
+                    if idx == 0:
+                        startup.mark("Erster Jobtitel")
+                    time.sleep(2)  # Kurze Pause zwischen den Jobtiteln
+    finally:
+        # Worker-Prozesse und Archiv-Segmente auch freigeben, wenn ein Scraper abbricht
+        if parse_pool:
+            parse_pool.shutdown()
+        if archive:
+            archive.close()
+    if identity_pool:
+        identity_pool.report("Indeed")
+    # Neue Jobs für Analysen als Parquet exportieren, ohne dass diese die Datenbank belasten
+    export_dir = os.getenv("PARQUET_EXPORT_DIR")
+    if export_dir:
+        from export_parquet import export_jobs
+        export_jobs(db, export_dir, SOURCES)
     client.close()
+    finish_run()
+    startup.report()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
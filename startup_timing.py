@@ -0,0 +1,65 @@
+import importlib
+import os
+import time
+
+"""
+This module measures the cold start of a scraper run.
+
+The StartupTimer records how long each step of the boot takes (container entry to Python, imports per source,
+browser launch, first crawl) so short scheduled runs can see where their time goes.
+
+Configuration:
+- `STARTUP_TIMING=1` prints the breakdown at the end of the run.
+- `CONTAINER_START_NS` (set by docker-entrypoint.sh) is the container start time in nanoseconds; if present,
+  the time from container entry to the first Python statement (Xvfb start, interpreter start) is included.
+"""
+
+
+class StartupTimer:
+    """
+    Records named durations of the startup steps.
+
+    :ivar steps: A list of (label, seconds) tuples in the order they were recorded.
+    """
+
+    def __init__(self):
+        self.steps = []
+        self.last = time.perf_counter()
+        container_start = os.getenv("CONTAINER_START_NS")
+        if container_start:
+            self.steps.append(("Container → Python", (time.time_ns() - int(container_start)) / 1e9))
+
+    def mark(self, label):
+        """
+        Record the time since the previous mark under the given label.
+
+        :param label: The name of the step that just finished.
+        """
+        now = time.perf_counter()
+        self.steps.append((label, now - self.last))
+        self.last = now
+
+    def timed_import(self, module_name):
+        """
+        Import a module and record the import time.
+
+        :param module_name: The dotted module name.
+        :return: The imported module.
+        """
+        start = time.perf_counter()
+        module = importlib.import_module(module_name)
+        self.steps.append((f"import {module_name}", time.perf_counter() - start))
+        self.last = time.perf_counter()
+        return module
+
+    def report(self):
+        """
+        Print the startup breakdown if `STARTUP_TIMING` is enabled.
+        """
+        if os.getenv("STARTUP_TIMING") != "1":
+            return
+        total = sum(seconds for _, seconds in self.steps)
+        print("⏱️ Startzeiten:")
+        for label, seconds in self.steps:
+            print(f"   {label:<40} {seconds * 1000:>9.1f} ms")
+        print(f"   {'Summe':<40} {total * 1000:>9.1f} ms")
@@ -1,9 +1,14 @@
 import subprocess
 import os
+import re
+import sys
+import gzip
 import json
 import time
 from pymongo import ASCENDING, UpdateOne
 
+from profiling import stage
+
 """
 This module contains functions to run Scrapy spiders for scraping job listings from Stepstone and to save the scraped data to a MongoDB database.
 It handles waiting for spider output files, saving data to MongoDB, and managing file paths for the scraped data.
@@ -29,14 +34,32 @@ def wait_for_file(json_file, timeout=30):
         time.sleep(1)
     return True
 
+# Number of jobs written to MongoDB per bulk_write
+BULK_SIZE = 500
+
+
+def read_jobs(json_file):
+    """
+    Stream the jobs of a JSON lines output file (plain or gzip-compressed) one by one.
+
+    :param json_file: The path to a ``.jsonl`` or ``.jsonl.gz`` file written by the sitespider spider.
+    :return: A generator of job dictionaries.
+    """
+    opener = gzip.open if json_file.endswith(".gz") else open
+    with opener(json_file, "rt", encoding="utf-8") as file:
+        for line in file:
+            if line.strip():
+                yield json.loads(line)
+
+
 def save_to_mongo(json_file, job_title, db):
     """
-    Save the scraped job data from a JSON file to a MongoDB collection.
+    Save the scraped job data from a JSON lines file to a MongoDB collection.
 
-    This function reads the JSON file produced by the Scrapy spider, processes the data, and inserts or updates the records
-    in the specified MongoDB collection. It handles both single job entries and lists of jobs.
+    This function reads the output file produced by the Scrapy spider line by line and inserts or updates the records
+    in the specified MongoDB collection in chunks of `BULK_SIZE`, so memory use does not grow with the number of jobs.
 
-    :param json_file: The path to the JSON file containing the scraped job data.
+    :param json_file: The path to the JSON lines file (optionally gzip-compressed) containing the scraped job data.
     :param job_title: The job title used to determine the MongoDB collection name.
     :param db: A MongoDB database instance to store the data.
     """
@@ -50,53 +73,60 @@ def save_to_mongo(json_file, job_title, db):
         if "jobId_1" not in collection.index_information():
             collection.create_index([("jobId", ASCENDING)], unique=True)
 
-        with open(json_file, "r", encoding="utf-8") as file:
-            data = json.load(file)
-
-            if isinstance(data, list):
-                bulk_ops = [
-                    UpdateOne({"jobId": item["jobId"]}, {"$set": item}, upsert=True)
-                    for item in data
-                ]
-                if bulk_ops:
-                    collection.bulk_write(bulk_ops, ordered=False)
-            else:
-                collection.update_one(
-                    {"jobId": data["jobId"]},
-                    {"$set": data},
-                    upsert=True
-                )
-
-        print(f"✅ Data saved/updated in '{collection_name}'")
+        count = 0
+        bulk_ops = []
+        for item in read_jobs(json_file):
+            bulk_ops.append(UpdateOne({"jobId": item["jobId"]}, {"$set": item}, upsert=True))
+            if len(bulk_ops) >= BULK_SIZE:
+                collection.bulk_write(bulk_ops, ordered=False)
+                count += len(bulk_ops)
+                bulk_ops = []
+        if bulk_ops:
+            collection.bulk_write(bulk_ops, ordered=False)
+            count += len(bulk_ops)
+
+        print(f"✅ {count} jobs saved/updated in '{collection_name}' ({os.path.basename(json_file)})")
 
     except Exception as e:
         print(f"❌ Critical error: {e}")
 
-def get_latest_output_file(directory, job_title):
+def get_latest_output_files(directory, job_title):
     """
-    Retrieve the most recent JSON output file for a given job title in the specified directory.
+    Retrieve the JSON lines output files of the most recent sitespider run for a given job title.
 
-    This function lists all JSON files in the directory that start with the job title and selects the most recently created one.
+    The sitespider spider writes ``<job_title>_<timestamp>-<batch>.jsonl`` (or ``.jsonl.gz``) files and starts a
+    new file every ``STEPSTONE_OUTPUT_BATCH_SIZE`` jobs. This function selects the most recent timestamp and
+    returns all batch files of that run.
 
-    :param directory: The directory to search for JSON files.
+    :param directory: The directory to search for output files.
     :param job_title: The job title used to filter the files.
-    :return: The path to the most recent JSON file, or None if no files are found.
+    :return: The sorted paths of the output files of the latest run, or an empty list if no files are found.
     """
-    files = [f for f in os.listdir(directory) if f.startswith(job_title) and f.endswith(".json")]
-    if not files:
-        return None
-    files.sort(reverse=True)
-    return os.path.join(directory, files[0])
-
-def run_spiders(job_title, db):
+    pattern = re.compile(re.escape(job_title) + r"_(\d{4}-\d{2}-\d{2}_\d{2}-\d{2}-\d{2})-\d+\.jsonl(\.gz)?")
+    runs = {}
+    for f in os.listdir(directory):
+        match = pattern.fullmatch(f)
+        if match:
+            runs.setdefault(match.group(1), []).append(f)
+    if not runs:
+        return []
+    return [os.path.join(directory, f) for f in sorted(runs[max(runs)])]
+
+def run_spiders(job_title, db, fetch_mode=None, stop=None):
     """
     Run Scrapy spiders to scrape job listings from Stepstone and save the data to MongoDB.
 
     This function sets up and runs two Scrapy spiders: one to collect job links and another to scrape detailed job information.
+    Both spiders run one after another in a single subprocess (see stepstonesearch/crawl.py), so Scrapy is only started once per job title.
     It manages the output files and ensures the scraped data is saved to the appropriate MongoDB collection.
 
     :param job_title: The job title to search for on Stepstone.
     :param db: A MongoDB database instance to store the scraped data.
+    :param fetch_mode: "html" or "api" (see stepstonesearch/api.py); defaults to the environment variable
+        `STEPSTONE_FETCH_MODE` or "html".
+    :param stop: Optional threading.Event; when it is set (e.g. the lease of the job title was lost, see
+        work_queue.py), the crawl subprocess is terminated and nothing is stored.
+    :raises RuntimeError: If the crawl subprocess failed (after storing the jobs it already wrote).
 
     the project_path is defined as follows for the Docker configuration: ‘/app/stepstonesearch’,
     in the case of local execution this must be adapted accordingly (localpath/stepstonesearch)
@@ -104,20 +134,34 @@ def run_spiders(job_title, db):
     project_path = "/app/stepstonesearch"
     links_output_file = f"{project_path}/links_output.json"
 
+    fetch_mode = fetch_mode or os.getenv("STEPSTONE_FETCH_MODE", "html")
+
     if os.path.exists(links_output_file):
         os.remove(links_output_file)
 
-    subprocess.run(
-        ["scrapy", "crawl", "Links", "-o", links_output_file, "-a", f"job_title={job_title}"],
-        cwd=project_path
-    )
-
-    subprocess.run(
-        ["scrapy", "crawl", "sitespider", "-a", f"input_file={links_output_file}", "-a", f"job_title={job_title}"],
-        cwd=project_path
-    )
+    # The package directory must be importable while the working directory stays the project directory
+    python_path = os.pathsep.join(filter(None, [os.path.dirname(project_path), os.getenv("PYTHONPATH")]))
+    # Profiled runs pass PROFILE_RUN_ID on, the subprocess then profiles itself (see profiling.py)
+    with stage("crawl"):
+        crawl = subprocess.Popen(
+            [sys.executable, "-m", "stepstonesearch.crawl", "--job-title", job_title,
+             "--links-output", links_output_file, "-s", f"STEPSTONE_FETCH_MODE={fetch_mode}"],
+            cwd=project_path,
+            env={**os.environ, "PYTHONPATH": python_path}
+        )
+        while crawl.poll() is None:
+            if stop is not None and stop.is_set():
+                crawl.terminate()
+                crawl.wait()
+                print(f"⏹️ Crawl für '{job_title}' abgebrochen")
+                return
+            time.sleep(1)
 
     time.sleep(2)
-    job_details_file = get_latest_output_file(project_path, job_title)
-    if job_details_file:
-        save_to_mongo(job_details_file, job_title, db)
\ No newline at end of file
+    with stage("store"):
+        for job_details_file in get_latest_output_files(project_path, job_title):
+            save_to_mongo(job_details_file, job_title, db)
+
+    # The jobs streamed before the failure are stored; the error lets the lease queue retry the job title
+    if crawl.returncode != 0:
+        raise RuntimeError(f"Stepstone crawl for '{job_title}' failed with exit code {crawl.returncode}")
\ No newline at end of file
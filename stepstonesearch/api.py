@@ -0,0 +1,137 @@
+import json
+from urllib.parse import urlparse
+
+"""
+This module bundles the Stepstone endpoints used by the spiders.
+
+Besides the HTML search and job pages, Stepstone serves the same data as structured JSON payloads
+(the reverse-engineered API endpoint). With ``STEPSTONE_FETCH_MODE = "api"`` the spiders request these
+payloads directly and only fall back to downloading and parsing HTML when a payload is missing or incomplete.
+All URLs are built from the ``STEPSTONE_BASE_URL`` setting, so the spiders can be pointed at a local stub server.
+
+Schema of the payloads: the endpoint paths (``STEPSTONE_SEARCH_API_PATH``, ``STEPSTONE_DETAIL_API_PATH``) and the
+payload keys (``STEPSTONE_SEARCH_PAYLOAD_ITEMS``, ``STEPSTONE_DETAIL_PAYLOAD_FIELDS``) are the ones served by the
+local stub server (benchmarks/stepstone_stub.py); the item fields of the search payload are the same as in the
+``"items"`` array embedded in the HTML search pages. They have not been verified against captured traffic of the
+live site, which is why all of them are settings and the fetch mode defaults to "html". If they do not match, every
+job costs one failed payload request before the HTML fallback; the crawler stats ``api/fallback`` show how often
+that happens.
+"""
+
+FETCH_MODES = ("html", "api")
+
+# Default payload keys of the detail endpoint that map onto the job_data fields of sitespider
+# (setting STEPSTONE_DETAIL_PAYLOAD_FIELDS). A payload missing any of them is considered incomplete and the job page
+# is fetched as HTML instead.
+DETAIL_PAYLOAD_FIELDS = {
+    "paragraphs": "textSections",
+    "lists": "listSections",
+}
+
+
+def fetch_mode(settings):
+    """
+    Return the configured fetch mode ("html" or "api").
+
+    :param settings: The Scrapy settings of the running crawler.
+    :return: The fetch mode; unknown values fall back to "html".
+    """
+    mode = settings.get("STEPSTONE_FETCH_MODE", "html")
+    return mode if mode in FETCH_MODES else "html"
+
+
+def search_page_url(settings, job_title, page):
+    """
+    Build the URL of an HTML search result page.
+
+    :param settings: The Scrapy settings of the running crawler.
+    :param job_title: The job title to search for.
+    :param page: The result page number (starting at 1).
+    :return: The absolute URL of the search result page.
+    """
+    return settings.get("STEPSTONE_BASE_URL") + f"/jobs/{job_title}?page={page}"
+
+
+def search_api_url(settings, job_title, page):
+    """
+    Build the URL of the structured search payload for a result page.
+
+    :param settings: The Scrapy settings of the running crawler.
+    :param job_title: The job title to search for.
+    :param page: The result page number (starting at 1).
+    :return: The absolute URL of the search API endpoint.
+    """
+    path = settings.get("STEPSTONE_SEARCH_API_PATH").format(job_title=job_title, page=page)
+    return settings.get("STEPSTONE_BASE_URL") + path
+
+
+def detail_api_url(settings, job_id):
+    """
+    Build the URL of the structured detail payload of a job.
+
+    :param settings: The Scrapy settings of the running crawler.
+    :param job_id: The Stepstone job ID.
+    :return: The absolute URL of the detail API endpoint.
+    """
+    path = settings.get("STEPSTONE_DETAIL_API_PATH").format(job_id=job_id)
+    return settings.get("STEPSTONE_BASE_URL") + path
+
+
+def allowed_domains(settings, domains):
+    """
+    Extend the allowed domains of a spider with the host of ``STEPSTONE_BASE_URL``.
+
+    Without this, Scrapy's offsite filtering would drop every follow-up request when the base URL
+    points to another host (e.g. a local stub server).
+
+    :param settings: The Scrapy settings of the running crawler.
+    :param domains: The allowed domains defined on the spider.
+    :return: The list of allowed domains including the base URL host.
+    """
+    host = urlparse(settings.get("STEPSTONE_BASE_URL")).hostname
+    if host and not any(host == d or host.endswith("." + d) for d in domains):
+        return list(domains) + [host]
+    return list(domains)
+
+
+def load_payload(response):
+    """
+    Decode a JSON payload from a response.
+
+    :param response: The Scrapy response of an API request.
+    :return: The decoded payload, or None if the body is not valid JSON.
+    """
+    try:
+        return json.loads(response.text)
+    except (ValueError, AttributeError):
+        return None
+
+
+def detail_payload_fields(settings):
+    """
+    Return the mapping of job_data fields to detail payload keys (``STEPSTONE_DETAIL_PAYLOAD_FIELDS``).
+
+    :param settings: The Scrapy settings of the running crawler.
+    :return: A dictionary with the payload keys of "paragraphs" and "lists".
+    """
+    return {**DETAIL_PAYLOAD_FIELDS, **settings.getdict("STEPSTONE_DETAIL_PAYLOAD_FIELDS")}
+
+
+def detail_fields_from_payload(payload, field_map=None):
+    """
+    Map a detail payload onto the paragraph and list fields of a job.
+
+    :param payload: The decoded detail payload.
+    :param field_map: The payload key of each field (see `detail_payload_fields`); defaults to DETAIL_PAYLOAD_FIELDS.
+    :return: A dictionary with "paragraphs" and "lists", or None if the payload is incomplete.
+    """
+    if not isinstance(payload, dict):
+        return None
+    fields = {}
+    for field, key in (field_map or DETAIL_PAYLOAD_FIELDS).items():
+        if key not in payload:
+            return None
+        fields[field] = payload[key]
+    if not isinstance(fields["paragraphs"], list) or not isinstance(fields["lists"], dict):
+        return None
+    return fields
@@ -0,0 +1,83 @@
+import argparse
+import sys
+
+from scrapy.crawler import Crawler, CrawlerRunner
+from scrapy.utils.log import configure_logging
+from scrapy.utils.project import get_project_settings
+from scrapy.utils.reactor import install_reactor
+
+"""
+This module runs the Links and the sitespider spider one after another in a single process.
+
+Starting ``scrapy crawl`` twice per job title starts the interpreter and imports Scrapy, Twisted and the project
+twice. Running both crawls in one process halves that startup cost. Connections are not shared: every Crawler
+has its own downloader with its own connection pool.
+
+Usage (from the Scrapy project directory, with its parent directory on the PYTHONPATH):
+- ``python -m stepstonesearch.crawl --job-title pwc-consultant --links-output links_output.json [-s NAME=VALUE]``
+"""
+
+
+def crawl_stepstone(job_title, links_output, overrides=None):
+    """
+    Run the Links spider and then the sitespider spider on its output within one reactor.
+
+    :param job_title: The job title to search for on Stepstone.
+    :param links_output: The path of the JSON file the Links spider writes and sitespider reads.
+    :param overrides: Optional dictionary of settings overriding the project settings (like ``scrapy crawl -s``).
+    :return: True if both crawls finished regularly, False if a crawl raised or was closed for another reason.
+    """
+    settings = get_project_settings()
+    settings.setdict(overrides or {}, priority="cmdline")
+    install_reactor(settings.get("TWISTED_REACTOR"))
+    configure_logging(settings)
+
+    from twisted.internet import defer, reactor
+
+    runner = CrawlerRunner(settings)
+
+    # Only the Links crawl exports its items to the links file
+    links_settings = settings.copy()
+    links_settings.set("FEEDS", {links_output: {"format": "json", "encoding": "utf8", "overwrite": True}},
+                       priority="cmdline")
+    links_crawler = Crawler(runner.spider_loader.load("Links"), links_settings)
+    site_crawler = Crawler(runner.spider_loader.load("sitespider"), settings.copy())
+
+    failures = []
+
+    @defer.inlineCallbacks
+    def crawl():
+        try:
+            yield runner.crawl(links_crawler, job_title=job_title)
+            yield runner.crawl(site_crawler, input_file=links_output, job_title=job_title)
+        except Exception as e:
+            failures.append(repr(e))
+        finally:
+            reactor.stop()
+
+    crawl()
+    reactor.run()
+
+    for crawler in (links_crawler, site_crawler):
+        reason = crawler.stats.get_value("finish_reason") if crawler.stats else None
+        if reason not in (None, "finished"):
+            failures.append(f"{crawler.spidercls.name}: {reason}")
+    for failure in failures:
+        print(f"❌ Stepstone-Crawl fehlgeschlagen: {failure}")
+    return not failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the Stepstone spiders in a single process.")
+    parser.add_argument("--job-title", required=True)
+    parser.add_argument("--links-output", required=True)
+    parser.add_argument("-s", "--set", action="append", default=[], metavar="NAME=VALUE",
+                        help="set/override a setting (may be repeated)")
+    args = parser.parse_args()
+    overrides = dict(option.split("=", 1) for option in args.set)
+    if not crawl_stepstone(args.job_title, args.links_output, overrides):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
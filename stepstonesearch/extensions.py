@@ -0,0 +1,41 @@
+# Define here your extensions
+#
+# See documentation in:
+# https://docs.scrapy.org/en/latest/topics/extensions.html
+
+from scrapy import signals
+from scrapy.exceptions import NotConfigured
+
+from profiling import get_profiler
+
+
+class ProfilingExtension:
+    """
+    Extension that marks the crawl of each spider as pipeline stage of the profiler (see profiling.py).
+
+    It is only enabled in profiled runs, i.e. if run_scrapers_parallel.py passed ``PROFILE_RUN_ID`` to the crawl
+    subprocess. The Links spider is recorded as "link collection", sitespider as "detail fetch"; the parse workers
+    of sitespider record their own "parse" stage.
+    """
+
+    STAGES = {"Links": "link collection", "sitespider": "detail fetch"}
+
+    def __init__(self, profiler):
+        self.profiler = profiler
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        profiler = get_profiler("stepstone_crawl")
+        if profiler is None:
+            raise NotConfigured
+        ext = cls(profiler)
+        crawler.signals.connect(ext.spider_opened, signal=signals.spider_opened)
+        crawler.signals.connect(ext.spider_closed, signal=signals.spider_closed)
+        return ext
+
+    def spider_opened(self, spider):
+        self.profiler.enter(self.STAGES.get(spider.name, spider.name))
+
+    def spider_closed(self, spider):
+        self.profiler.leave()
+        self.profiler.flush()
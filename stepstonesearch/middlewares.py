@@ -3,11 +3,19 @@
 # See documentation in:
 # https://docs.scrapy.org/en/latest/topics/spider-middleware.html
 
+import re
+
 from scrapy import signals
+from scrapy.exceptions import IgnoreRequest, NotConfigured
+from scrapy.utils.misc import load_object
 
 # useful for handling different item types with a single interface
 from itemadapter import is_item, ItemAdapter
 
+from challenge import CHALLENGE_STATUS_CODES, CircuitBreaker, is_challenge_page
+from identity_pool import IdentityPool
+from page_archive import PageArchive
+
 
 class StepstonesearchSpiderMiddleware:
     # Not all methods need to be defined. If a method is not defined,
@@ -101,3 +109,210 @@ class StepstonesearchDownloaderMiddleware:
 
     def spider_opened(self, spider):
         spider.logger.info("Spider opened: %s" % spider.name)
+
+
+class PageArchiveMiddleware:
+    """
+    Downloader middleware that appends every downloaded page to the raw page archive (see page_archive.py).
+
+    It is only enabled if the setting ``PAGE_ARCHIVE_DIR`` is set. Job pages are keyed by their jobId,
+    all other pages by their URL.
+    """
+
+    def __init__(self, crawler, root):
+        self.crawler = crawler
+        self.archive = PageArchive(root, "stepstone")
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        root = crawler.settings.get("PAGE_ARCHIVE_DIR")
+        if not root:
+            raise NotConfigured
+        m = cls(crawler, root)
+        crawler.signals.connect(m.spider_closed, signal=signals.spider_closed)
+        return m
+
+    def process_response(self, request, response, spider=None):
+        # Newer Scrapy versions no longer pass the spider to downloader middlewares
+        spider = spider or self.crawler.spider
+        if response.status != 200:
+            return response
+
+        kind = "detail" if spider.name == "sitespider" else "search"
+        if b"json" in response.headers.get("Content-Type", b""):
+            kind += "_api"
+        key = request.meta.get("job_id")
+        if key is None and kind == "detail":
+            match = re.search(r'-(\d+)-inline\.html', response.url)
+            key = match.group(1) if match else None
+
+        self.archive.append(response.url, response.body, key=key, kind=kind,
+                            job_title=getattr(spider, "job_title", ""))
+        return response
+
+    def spider_closed(self, spider):
+        self.archive.close()
+
+
+class ChallengeMiddleware:
+    """
+    Downloader middleware that detects challenge pages and pauses the crawl with a circuit breaker (see challenge.py).
+
+    A challenge response is not passed to the spider. Its request is requeued up to ``CHALLENGE_MAX_RETRIES`` times;
+    once ``CHALLENGE_THRESHOLD`` consecutive challenges occurred, the engine is paused with exponential backoff
+    (``CHALLENGE_BASE_DELAY`` up to ``CHALLENGE_MAX_DELAY`` seconds). The challenge rate is written to the crawl stats.
+    """
+
+    def __init__(self, crawler):
+        self.crawler = crawler
+        settings = crawler.settings
+        self.breaker = CircuitBreaker(
+            "Stepstone",
+            threshold=settings.getint("CHALLENGE_THRESHOLD", 3),
+            base_delay=settings.getfloat("CHALLENGE_BASE_DELAY", 30),
+            max_delay=settings.getfloat("CHALLENGE_MAX_DELAY", 900),
+        )
+        self.max_retries = settings.getint("CHALLENGE_MAX_RETRIES", 2)
+        self.paused = False
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        m = cls(crawler)
+        crawler.signals.connect(m.spider_closed, signal=signals.spider_closed)
+        return m
+
+    def process_response(self, request, response, spider=None):
+        stats = self.crawler.stats
+        stats.inc_value("challenge/responses")
+        if not is_challenge_page(response.body, response.status):
+            self.breaker.record_success()
+            return response
+
+        stats.inc_value("challenge/detected")
+        delay = self.breaker.record_challenge()
+        if delay and not self.paused:
+            self.pause(delay)
+
+        retries = request.meta.get("challenge_retries", 0) + 1
+        if retries > self.max_retries:
+            stats.inc_value("challenge/given_up")
+            raise IgnoreRequest(f"Challenge page for {request.url} after {retries - 1} retries")
+        stats.inc_value("challenge/requeued")
+        retry = request.replace(dont_filter=True)
+        retry.meta["challenge_retries"] = retries
+        return retry
+
+    def pause(self, delay):
+        """
+        Pause the engine for the backoff delay of the opened breaker.
+
+        :param delay: The pause in seconds.
+        """
+        from twisted.internet import reactor
+
+        self.crawler.stats.inc_value("challenge/breaker_opened")
+        self.crawler.engine.pause()
+        self.paused = True
+        reactor.callLater(delay, self.resume)
+
+    def resume(self):
+        self.paused = False
+        self.breaker.allow()
+        self.crawler.engine.unpause()
+
+    def spider_closed(self, spider):
+        self.crawler.stats.set_value("challenge/rate", self.breaker.challenge_rate)
+
+
+def is_h2_handler(handler):
+    """Check whether a DOWNLOAD_HANDLERS entry is Scrapy's HTTP/2 download handler (or a subclass)."""
+    from scrapy.core.downloader.handlers.http2 import H2DownloadHandler
+
+    handler = load_object(handler)
+    return isinstance(handler, type) and issubclass(handler, H2DownloadHandler)
+
+
+class IdentityRotationMiddleware:
+    """
+    Downloader middleware that sends every request through an identity of the identity pool (see identity_pool.py).
+
+    An identity is a proxy (or the direct connection) with a consistent browser header profile; it replaces the static
+    ``USER_AGENT``. The identity name is used as download slot, so ``DOWNLOAD_DELAY`` and the concurrency limits apply
+    per identity. Requests with the same ``identity_session`` meta key keep their identity while it is healthy.
+    Responses update the health score; challenge pages and blocking status codes bench the identity for
+    ``IDENTITY_COOLDOWN`` seconds. Proxies are taken from ``PROXY_URLS``; disable with ``IDENTITY_ROTATION_ENABLED``.
+
+    Scrapy's HTTP/2 download handler cannot send requests through a proxy, so proxies cannot be combined with the
+    ``http2`` transport profile.
+    """
+
+    def __init__(self, crawler, pool):
+        self.crawler = crawler
+        self.pool = pool
+        self.default_headers = {
+            name.lower(): value for name, value in crawler.settings.getdict("DEFAULT_REQUEST_HEADERS").items()
+        }
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        settings = crawler.settings
+        if not settings.getbool("IDENTITY_ROTATION_ENABLED", True):
+            raise NotConfigured
+        pool = IdentityPool(
+            proxies=settings.getlist("PROXY_URLS"),
+            include_direct=settings.getbool("PROXY_INCLUDE_DIRECT"),
+            min_score=settings.getfloat("IDENTITY_MIN_SCORE", 0.3),
+            cooldown=settings.getfloat("IDENTITY_COOLDOWN", 300),
+        )
+        https_handler = settings.getdict("DOWNLOAD_HANDLERS").get("https")
+        if any(identity.proxy for identity in pool.identities) and https_handler and is_h2_handler(https_handler):
+            raise ValueError(
+                "PROXY_URLS cannot be used with the HTTP/2 download handler (STEPSTONE_TRANSPORT_PROFILE=http2), "
+                "because it does not support proxies; use the 'default' or 'limits' profile"
+            )
+        m = cls(crawler, pool)
+        crawler.signals.connect(m.spider_closed, signal=signals.spider_closed)
+        return m
+
+    def process_request(self, request, spider=None):
+        identity = self.pool.acquire(request.meta.get("identity_session"))
+        self.pool.mark_used(identity)
+        request.meta["identity"] = identity.name
+        request.meta["download_slot"] = identity.name
+        if identity.proxy:
+            request.meta["proxy"] = identity.proxy
+        else:
+            request.meta.pop("proxy", None)
+
+        # Headers set by the spider itself (e.g. Accept of the API requests) are kept
+        for name, value in identity.headers.items():
+            current = request.headers.get(name)
+            if name == "User-Agent" or current is None or current.decode() == self.default_headers.get(name.lower()):
+                request.headers[name] = value
+        self.crawler.stats.inc_value(f"identity/{identity.name}/requests")
+        return None
+
+    def process_response(self, request, response, spider=None):
+        identity = self.pool.by_name.get(request.meta.get("identity"))
+        if identity is None:
+            return response
+        if response.status in CHALLENGE_STATUS_CODES or is_challenge_page(response.body, response.status):
+            self.pool.record_failure(identity, blocked=True)
+            self.crawler.stats.inc_value(f"identity/{identity.name}/blocked")
+        elif response.status >= 500:
+            self.pool.record_failure(identity)
+            self.crawler.stats.inc_value(f"identity/{identity.name}/failures")
+        else:
+            self.pool.record_success(identity)
+        return response
+
+    def process_exception(self, request, exception, spider=None):
+        identity = self.pool.by_name.get(request.meta.get("identity"))
+        if identity is not None:
+            self.pool.record_failure(identity)
+            self.crawler.stats.inc_value(f"identity/{identity.name}/failures")
+        return None
+
+    def spider_closed(self, spider):
+        for name, stats in self.pool.stats().items():
+            self.crawler.stats.set_value(f"identity/{name}/score", stats["score"])
@@ -6,8 +6,12 @@
 #     https://docs.scrapy.org/en/latest/topics/settings.html
 #     https://docs.scrapy.org/en/latest/topics/downloader-middleware.html
 #     https://docs.scrapy.org/en/latest/topics/spider-middleware.html
+import os
+
 from scrapy.settings.default_settings import USER_AGENT
 
+from stepstonesearch.transport import transport_settings
+
 BOT_NAME = "stepstonesearch"
 
 SPIDER_MODULES = ["stepstonesearch.spiders"]
@@ -54,12 +58,39 @@ DEFAULT_REQUEST_HEADERS = {
 #DOWNLOADER_MIDDLEWARES = {
 #    "stepstonesearch.middlewares.StepstonesearchDownloaderMiddleware": 543,
 #}
+# The page archive stores the decompressed bodies, so it runs below HttpCompressionMiddleware (590).
+# The identity rotation sets its headers after UserAgentMiddleware (500) and its proxy before HttpProxyMiddleware (750),
+# and sees the challenge pages before ChallengeMiddleware requeues them.
+DOWNLOADER_MIDDLEWARES = {
+    "stepstonesearch.middlewares.PageArchiveMiddleware": 555,
+    "stepstonesearch.middlewares.ChallengeMiddleware": 560,
+    "stepstonesearch.middlewares.IdentityRotationMiddleware": 580,
+}
+
+# Proxy and identity rotation (see identity_pool.py); USER_AGENT is only used if the rotation is disabled.
+# DOWNLOAD_DELAY applies per identity, so every proxy adds its own request budget.
+IDENTITY_ROTATION_ENABLED = True
+PROXY_URLS = os.getenv("PROXY_URLS", "")  # Comma-separated proxy URLs; empty = direct connection only
+PROXY_INCLUDE_DIRECT = os.getenv("PROXY_INCLUDE_DIRECT") == "1"
+IDENTITY_MIN_SCORE = 0.3  # Identities with a lower health score are benched
+IDENTITY_COOLDOWN = 300  # Seconds a blocked identity is benched
+
+# Challenge detection and circuit breaker (see challenge.py)
+CHALLENGE_THRESHOLD = 3  # Consecutive challenge pages that open the breaker
+CHALLENGE_BASE_DELAY = 30  # First pause in seconds, doubled on every further opening
+CHALLENGE_MAX_DELAY = 900
+CHALLENGE_MAX_RETRIES = 2  # How often a request is requeued after a challenge page
+
+# Raw page archive (see page_archive.py), only written if the directory is set;
+# use an absolute path, the spiders run with the project directory as working directory
+PAGE_ARCHIVE_DIR = os.getenv("PAGE_ARCHIVE_DIR")
 
 # Enable or disable extensions
 # See https://docs.scrapy.org/en/latest/topics/extensions.html
-#EXTENSIONS = {
-#    "scrapy.extensions.telnet.TelnetConsole": None,
-#}
+# The profiling extension is only active in profiled runs (see profiling.py)
+EXTENSIONS = {
+    "stepstonesearch.extensions.ProfilingExtension": 500,
+}
 
 #FEEDS = {
    # 'output.csv': {
@@ -70,6 +101,12 @@ DEFAULT_REQUEST_HEADERS = {
 #}
 #FEED_EXPORT_INDENT = 4
 
+# Output of the sitespider spider (see sitespiderSpider.update_settings): the jobs are streamed to JSON lines
+# files while crawling, optionally gzip-compressed, and a new file is started every STEPSTONE_OUTPUT_BATCH_SIZE
+# jobs (0 = a single file)
+STEPSTONE_OUTPUT_GZIP = os.getenv("STEPSTONE_OUTPUT_GZIP", "0") == "1"
+STEPSTONE_OUTPUT_BATCH_SIZE = int(os.getenv("STEPSTONE_OUTPUT_BATCH_SIZE", 1000))
+
 
 # Configure item pipelines
 # See https://docs.scrapy.org/en/latest/topics/item-pipeline.html
@@ -98,8 +135,21 @@ DEFAULT_REQUEST_HEADERS = {
 #HTTPCACHE_IGNORE_HTTP_CODES = []
 #HTTPCACHE_STORAGE = "scrapy.extensions.httpcache.FilesystemCacheStorage"
 
+# Stepstone endpoints (see stepstonesearch/api.py)
+# "html" downloads and parses the search and job pages, "api" requests the structured
+# payloads first and only falls back to HTML when a payload is missing or incomplete.
+STEPSTONE_FETCH_MODE = "html"
+STEPSTONE_BASE_URL = "https://www.stepstone.de"
+STEPSTONE_SEARCH_API_PATH = "/public-api/resultlist/unifiedResultlist?searchedTerm={job_title}&page={page}"
+STEPSTONE_DETAIL_API_PATH = "/public-api/job-ads/{job_id}"
+# Payload keys of the API mode; modelled on the stub server, not verified against the live site (see api.py)
+STEPSTONE_SEARCH_PAYLOAD_ITEMS = "items"
+STEPSTONE_DETAIL_PAYLOAD_FIELDS = {"paragraphs": "textSections", "lists": "listSections"}
+
 # Set settings whose default value is deprecated to a future-proof value
 TWISTED_REACTOR = "twisted.internet.asyncioreactor.AsyncioSelectorReactor"
 FEED_EXPORT_ENCODING = "utf-8"
 
-
+# Transport profile (see stepstonesearch/transport.py): "default", "limits" or "http2"
+TRANSPORT_PROFILE = os.getenv("STEPSTONE_TRANSPORT_PROFILE", "default")
+globals().update(transport_settings(TRANSPORT_PROFILE, globals()))
@@ -1,6 +1,15 @@
 import scrapy
 import json
 
+from extraction import map_record
+from stepstonesearch.api import (
+    allowed_domains,
+    fetch_mode,
+    load_payload,
+    search_api_url,
+    search_page_url,
+)
+
 """
 This module defines a Scrapy spider for scraping job listing links from Stepstone search result pages.
 The spider collects job links up to a specified number of pages or jobs and saves them to a JSON file.
@@ -13,11 +22,12 @@ class LinksSpider(scrapy.Spider):
     This spider starts from the search results page for a given job title, extracts job listing data (e.g., title, company, location, link),
     and follows pagination up to a specified maximum number of pages or jobs. The results are saved to a JSON file.
 
+    In API mode (``STEPSTONE_FETCH_MODE = "api"``) the structured search payload is requested instead of the HTML page.
+    If the payload cannot be decoded or carries no items, the spider falls back to the HTML result page.
+
     :ivar name: The name of the spider.
     :ivar allowed_domains: Domains allowed for the spider to crawl.
     :ivar custom_settings: Custom settings for the spider, including the output feed configuration.
-    :ivar base_url: The base URL template for Stepstone job search pages.
-    :ivar start_urls: The initial URL(s) to start scraping from.
     :ivar jobs_collected: A counter for the number of jobs collected so far.
     """
     name = "Links"
@@ -39,12 +49,57 @@ class LinksSpider(scrapy.Spider):
         """
         super(LinksSpider, self).__init__(*args, **kwargs)
         self.job_title = job_title
-        self.base_url = "https://www.stepstone.de/jobs/{job_title}?page={page}"
-        self.start_urls = [self.base_url.format(job_title=self.job_title, page=1)]
-        self.max_pages = max_pages
-        self.max_jobs = max_jobs
+        self.max_pages = int(max_pages)
+        self.max_jobs = int(max_jobs)
         self.jobs_collected = 0
 
+    @classmethod
+    def from_crawler(cls, crawler, *args, **kwargs):
+        """
+        Create the spider and allow requests to the host of ``STEPSTONE_BASE_URL``.
+        """
+        spider = super(LinksSpider, cls).from_crawler(crawler, *args, **kwargs)
+        spider.allowed_domains = allowed_domains(crawler.settings, cls.allowed_domains)
+        return spider
+
+    async def start(self):
+        """
+        Yield the start requests (Scrapy >= 2.13 entry point, older versions call `start_requests` directly).
+        """
+        for request in self.start_requests():
+            yield request
+
+    def start_requests(self):
+        """
+        Generate the request for the first search result page, either as API payload or as HTML page.
+        """
+        yield self.page_request(1)
+
+    def page_request(self, page, mode=None):
+        """
+        Build the request for a search result page.
+
+        All result pages of a job title share one sticky identity (see identity_pool.py).
+
+        :param page: The result page number (starting at 1).
+        :param mode: "api" or "html"; defaults to the configured fetch mode.
+        :return: A Scrapy request for the result page.
+        """
+        mode = mode or fetch_mode(self.settings)
+        if mode == "api":
+            return scrapy.Request(
+                search_api_url(self.settings, self.job_title, page),
+                callback=self.parse_api,
+                errback=self.api_failed,
+                headers={"Accept": "application/json"},
+                meta={"page": page, "identity_session": self.job_title},
+            )
+        return scrapy.Request(
+            search_page_url(self.settings, self.job_title, page),
+            callback=self.parse,
+            meta={"page": page, "identity_session": self.job_title},
+        )
+
     def extract_items(self, data):
         """
         Extract the 'items' array from the JSON-like data in the page source.
@@ -55,9 +110,10 @@ class LinksSpider(scrapy.Spider):
         :return: The extracted 'items' array as a string, or None if not found.
         """
         stack = []
-        start_idx = data.find('"items":[') + 8
+        start_idx = data.find('"items":[')
         if start_idx == -1:
             return None
+        start_idx += 8
 
         for i in range(start_idx, len(data)):
             if data[i] == '[':
@@ -90,26 +146,73 @@ class LinksSpider(scrapy.Spider):
                 items_list = json.loads(items_list_str)
                 self.logger.info(f"Extracted {len(items_list)} items.")
 
-                for item in items_list:
-                    if self.jobs_collected >= self.max_jobs:
-                        break
-
-                    yield {
-                        'title': item.get('title', '').strip(),
-                        'companyName': item.get('companyName', '').strip(),
-                        'location': item.get('location', '').strip(),
-                        'link': item.get('url', ''),
-                        'Kurztext': item.get('textSnippet', ''),
-                        'salary': item.get('salary', ''),
-                        'datePosted': item.get('datePosted', ''),
-                    }
-                    self.jobs_collected += 1
+                yield from self.collect_items(items_list)
 
             except json.JSONDecodeError as e:
                 self.logger.error(f"Error decoding JSON: {e}")
 
-        current_page = int(response.url.split("page=")[-1]) if "page=" in response.url else 1
+        yield from self.follow_pagination(response)
+
+    def parse_api(self, response):
+        """
+        Parse the structured search payload of a result page.
+
+        Falls back to the HTML result page if the payload cannot be decoded or contains no items
+        (``STEPSTONE_SEARCH_PAYLOAD_ITEMS`` names the key of the items).
+
+        :param response: The Scrapy response object containing the search API payload.
+        """
+        if self.jobs_collected >= self.max_jobs:
+            return
+
+        payload = load_payload(response)
+        items_key = self.settings.get("STEPSTONE_SEARCH_PAYLOAD_ITEMS", "items")
+        items_list = payload.get(items_key) if isinstance(payload, dict) else None
+        if not isinstance(items_list, list):
+            self.logger.warning(f"No items in API payload of {response.url}, falling back to HTML.")
+            self.crawler.stats.inc_value("api/fallback")
+            yield self.page_request(response.meta.get("page", 1), mode="html")
+            return
+
+        self.crawler.stats.inc_value("api/payloads")
+        self.logger.info(f"Extracted {len(items_list)} items from API payload ({len(response.body)} bytes).")
+        yield from self.collect_items(items_list)
+        yield from self.follow_pagination(response)
+
+    def api_failed(self, failure):
+        """
+        Fall back to the HTML result page if the search payload request fails.
+
+        :param failure: The Twisted failure of the API request.
+        """
+        page = failure.request.meta.get("page", 1)
+        self.logger.warning(f"API request for page {page} failed ({failure.value!r}), falling back to HTML.")
+        self.crawler.stats.inc_value("api/fallback")
+        yield self.page_request(page, mode="html")
+
+    def collect_items(self, items_list):
+        """
+        Yield link entries for the given job items until the maximum number of jobs is reached.
+
+        :param items_list: The job items of a result page (decoded JSON).
+        """
+        for item in items_list:
+            if self.jobs_collected >= self.max_jobs:
+                break
+
+            yield map_record("stepstone_search_item", item)
+            self.jobs_collected += 1
+
+    def follow_pagination(self, response):
+        """
+        Request the next result page as long as the page and job limits are not reached.
+
+        The next page is requested in the configured fetch mode, so an HTML fallback only affects a single page.
+
+        :param response: The response of the current result page.
+        """
+        current_page = response.meta.get("page", 1)
         if current_page < self.max_pages and self.jobs_collected < self.max_jobs:
-            next_page_url = self.base_url.format(job_title=self.job_title, page=current_page + 1)
-            self.logger.info(f"Navigating to next page: {next_page_url}")
-            yield scrapy.Request(next_page_url, callback=self.parse)
\ No newline at end of file
+            request = self.page_request(current_page + 1)
+            self.logger.info(f"Navigating to next page: {request.url}")
+            yield request
\ No newline at end of file
@@ -2,26 +2,60 @@ import scrapy
 import json
 from datetime import datetime
 import re
+import asyncio
+
+from extraction import extract
+from parse_pool import ParsePool
+from stepstonesearch.api import (
+    allowed_domains,
+    detail_api_url,
+    detail_fields_from_payload,
+    detail_payload_fields,
+    fetch_mode,
+    load_payload,
+)
 
 """
 This module defines a Scrapy spider for scraping detailed job information from Stepstone job pages.
-The spider reads job links from a JSON file, extracts relevant data from each job page, and saves the results to another JSON file.
+The spider reads job links from a JSON file, extracts relevant data from each job page, and yields the results as items.
+The items are streamed to JSON lines files by the feed exports (see `sitespiderSpider.update_settings`).
 """
 
+def extract_job_details(html):
+    """
+    Extract the description paragraphs and lists (e.g., benefits) from the HTML of a job page.
+
+    This function only depends on the raw HTML, so it can run in a worker process of the parse pool.
+    The selectors are defined in the "stepstone_detail" spec of extraction.py.
+
+    :param html: The raw HTML of the job page.
+    :return: A tuple of (cleaned paragraphs, lists grouped by section name).
+    """
+    details = extract("stepstone_detail", html)
+    return details["paragraphs"], details["lists"]
+
+
 class sitespiderSpider(scrapy.Spider):
     """
     A Scrapy spider to scrape detailed job information from Stepstone.
 
     This spider reads job links from a provided JSON file, visits each job page, extracts job details such as job title,
-    company name, location, salary, job description paragraphs, and lists (e.g., benefits), and saves the data in the variable job_data.
+    company name, location, salary, job description paragraphs, and lists (e.g., benefits), and yields one item per job.
+
+    The items are not kept in memory: the feed export writes them to
+    ``<job_title>_<timestamp>-<batch>.jsonl`` (``.jsonl.gz`` with ``STEPSTONE_OUTPUT_GZIP``) while crawling and starts
+    a new file every ``STEPSTONE_OUTPUT_BATCH_SIZE`` items.
+
+    In API mode (``STEPSTONE_FETCH_MODE = "api"``) the structured detail payload of each job is requested first.
+    The HTML job page is only downloaded if the payload request fails or the payload lacks required fields.
 
     :ivar name: The name of the spider.
     :ivar allowed_domains: Domains allowed for the spider to crawl.
     :ivar input_file: Path to the JSON file containing job links.
-    :ivar output_file: Path to the output JSON file where scraped data will be saved.
+    :ivar output_stamp: The timestamp used in the names of the output files.
     :ivar items: List of job items loaded from the input JSON file.
-    :ivar job_details: List to store scraped job details.
-    :ivar job_title: The job title used for naming the output file.
+    :ivar job_title: The job title used for naming the output files.
+    :ivar parse_pool: The process pool that runs the HTML extraction (see parse_pool.py).
     """
     name = "sitespider"
     allowed_domains = ["stepstone.de"]
@@ -31,15 +65,42 @@ class sitespiderSpider(scrapy.Spider):
         Initialize the spider with the input JSON file and job title.
 
         :param input_file: Path to the JSON file containing job links (default is "links_output.json").
-        :param job_title: The job title used to name the output file (default is "default_job").
+        :param job_title: The job title used to name the output files (default is "default_job").
         """
         super(sitespiderSpider, self).__init__(*args, **kwargs)
         self.input_file = input_file
-        timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
-        self.output_file = f"{job_title}_{timestamp}.json"
+        self.output_stamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
         self.items = self.load_items()
-        self.job_details = []
         self.job_title = job_title
+        self.parse_pool = ParsePool()
+
+    @classmethod
+    def from_crawler(cls, crawler, *args, **kwargs):
+        """
+        Create the spider and allow requests to the host of ``STEPSTONE_BASE_URL``.
+        """
+        spider = super(sitespiderSpider, cls).from_crawler(crawler, *args, **kwargs)
+        spider.allowed_domains = allowed_domains(crawler.settings, cls.allowed_domains)
+        return spider
+
+    @classmethod
+    def update_settings(cls, settings):
+        """
+        Stream the items to rotating JSON lines files.
+
+        The file names contain the spider attributes ``job_title`` and ``output_stamp`` and the batch number.
+        Feeds given on the command line (``-o``/``-O``) have a higher priority and replace these files.
+        """
+        super().update_settings(settings)
+        gzip = settings.getbool("STEPSTONE_OUTPUT_GZIP")
+        feed = {"format": "jsonlines", "encoding": "utf8", "overwrite": True}
+        batch_size = settings.getint("STEPSTONE_OUTPUT_BATCH_SIZE")
+        if batch_size:
+            feed["batch_item_count"] = batch_size
+        if gzip:
+            feed["postprocessing"] = ["scrapy.extensions.postprocessing.GzipPlugin"]
+        uri = "%(job_title)s_%(output_stamp)s-%(batch_id)05d.jsonl" + (".gz" if gzip else "")
+        settings.set("FEEDS", {uri: feed}, priority="spider")
 
     def load_items(self):
         """
@@ -54,15 +115,34 @@ class sitespiderSpider(scrapy.Spider):
             self.logger.error(f"Error loading items: {e}")
             return []
 
+    async def start(self):
+        """
+        Yield the start requests (Scrapy >= 2.13 entry point, older versions call `start_requests` directly).
+        """
+        for request in self.start_requests():
+            yield request
+
     def start_requests(self):
         """
         Generate Scrapy requests for each job link in the input items.
 
         Each request includes the job item metadata and is sent to the `parse` method for processing.
+        In API mode, the request targets the detail payload and is sent to `parse_api` instead.
         """
+        api_mode = fetch_mode(self.settings) == "api"
         for item in self.items:
-            url = "https://www.stepstone.de" + item.get("link", "")
-            yield scrapy.Request(url=url, callback=self.parse, meta={'item': item})
+            url = self.settings.get("STEPSTONE_BASE_URL") + item.get("link", "")
+            job_id = self.extract_job_id(url)
+            if api_mode and job_id:
+                yield scrapy.Request(
+                    url=detail_api_url(self.settings, job_id),
+                    callback=self.parse_api,
+                    errback=self.api_failed,
+                    headers={"Accept": "application/json"},
+                    meta={'item': item, 'html_url': url, 'job_id': job_id, 'identity_session': job_id},
+                )
+            else:
+                yield scrapy.Request(url=url, callback=self.parse, meta={'item': item})
 
     def extract_job_id(self, url):
         """
@@ -78,82 +158,99 @@ class sitespiderSpider(scrapy.Spider):
             return match.group(1)
         return None
 
-    def parse(self, response):
+    async def parse(self, response):
         """
         Parse the job page and extract relevant job details.
 
-        This method extracts paragraphs, lists (e.g., benefits), and other job details from the page.
-        It cleans the text and organizes the data into a dictionary, which is then appended to the job_details list.
+        The raw HTML is handed to the parse pool (see parse_pool.py), so the XPath extraction runs in a worker
+        process and does not block the reactor while further pages are downloaded.
+        The extracted paragraphs and lists are combined with the item metadata and yielded as item.
 
         :param response: The Scrapy response object containing the job page HTML.
         """
-        item = kohta.meta.get('item', {})
+        item = response.meta.get('item', {})
+        job_id = self.extract_job_id(response.url)
 
-        def clean_text(text):
-            """Clean the text by stripping whitespace and removing text with unwanted characters."""
-            return text.strip() if not ("{" in text or ":" in text or "}" in text) else ""
+        future = self.parse_pool.submit(extract_job_details, response.text)
+        paragraphs_cleaned, lists_data = await asyncio.wrap_future(future)
 
-        job_id = self.extract_job_id(response.url)
+        yield self.build_job_data(item, response.url, job_id, paragraphs_cleaned, lists_data)
 
-        paragraphs = response.xpath('//p[not(ancestor::*[contains(@class, "job-ad-display-1wh962r")])]//text()').getall()
-        paragraphs_cleaned = [clean_text(p) for p in paragraphs if clean_text(p)]
-
-        lists_data = {}
-        lists = response.xpath('//ul[not(ancestor::*[contains(@class, "job-ad-display-1wh962r")])]')
-
-        for ul in lists:
-            parent_class = ul.xpath('./ancestor::*[contains(@class, "")][1]/@class').get()
-            if parent_class:
-                class_name = parent_class.split()[0]
-                if class_name == "job-ad-display-kyg8or" and ul.xpath('./ancestor::*[@id="SeoRelatedLinks"]'):
-                    continue
-                if class_name == "job-ad-display-1cat3iu":
-                    class_name = "content/benefits"
-                if class_name == "job-ad-display-kyg8or":
-                    class_name = "company"
-                if class_name == "job-ad-display-1yd5hr5":
-                    class_name = "companySize"
-            else:
-                class_name = "CompanyInfo"
+    def parse_api(self, response):
+        """
+        Parse the structured detail payload of a job.
+
+        If the payload is complete, the job is stored without downloading the HTML page.
+        Otherwise the HTML job page is requested and handled by `parse`.
+
+        :param response: The Scrapy response object containing the detail API payload.
+        """
+        item = response.meta.get('item', {})
+        fields = detail_fields_from_payload(load_payload(response), detail_payload_fields(self.settings))
+        if fields is None:
+            self.logger.warning(f"Incomplete API payload for job {response.meta.get('job_id')}, falling back to HTML.")
+            self.crawler.stats.inc_value("api/fallback")
+            yield self.html_request(response.meta)
+            return
+
+        self.crawler.stats.inc_value("api/payloads")
+        yield self.build_job_data(
+            item, response.meta['html_url'], response.meta['job_id'], fields["paragraphs"], fields["lists"]
+        )
+
+    def api_failed(self, failure):
+        """
+        Fall back to the HTML job page if the detail payload request fails.
 
-            items = ul.xpath('.//li//text()').getall()
-            items_cleaned = [clean_text(item) for item in items if clean_text(item)]
+        :param failure: The Twisted failure of the API request.
+        """
+        meta = failure.request.meta
+        self.logger.warning(f"API request for job {meta.get('job_id')} failed ({failure.value!r}), falling back to HTML.")
+        self.crawler.stats.inc_value("api/fallback")
+        yield self.html_request(meta)
 
-            if class_name not in lists_data:
-                lists_data[class_name] = []
-            lists_data[class_name].append(items_cleaned)
+    def html_request(self, meta):
+        """
+        Build the request for the HTML job page of an API request.
 
-        company_data = {}
-        companyURL = response.xpath(
-            '//div[@id="JobAdContent"]//a[contains(@class, "job-ad-display-1ifgnl6")]/@href'
-        ).get()
-        if companyURL:
-            company_data["companyLogoResultPageUrl"] = companyURL
+        :param meta: The meta dictionary of the API request.
+        :return: A Scrapy request handled by `parse`.
+        """
+        # The HTML page is requested with the same identity (see identity_pool.py) as the payload
+        return scrapy.Request(url=meta['html_url'], callback=self.parse,
+                              meta={'item': meta.get('item', {}), 'identity_session': meta.get('job_id')})
+
+    def build_job_data(self, item, url, job_id, paragraphs, lists):
+        """
+        Combine the link item metadata with the extracted details into the job_data dictionary.
 
-        job_data = {
+        :param item: The job item loaded from the input JSON file.
+        :param url: The URL of the job page.
+        :param job_id: The Stepstone job ID.
+        :param paragraphs: The cleaned description paragraphs.
+        :param lists: The extracted lists grouped by section name.
+        :return: The job_data dictionary.
+        """
+        return {
             "Job Title": self.job_title,
             "specific job title": item.get('title', '').strip(),
             'companyName': item.get('companyName', '').strip(),
             'location': item.get('location', '').strip(),
             'datePosted': item.get('datePosted', '').strip(),
             'salary': item.get('salary', '').strip(),
-            "url": response.url,
+            "url": url,
             "jobId": job_id,
-            "paragraphs": paragraphs_cleaned,
-            "lists": lists_data,
+            "paragraphs": paragraphs,
+            "lists": lists,
         }
 
-        self.job_details.append(job_data)
-
     def closed(self, reason):
         """
-        Save the collected job details to a JSON file when the spider is closed.
+        Shut down the parse pool and record its statistics when the spider is closed.
 
         :param reason: The reason for the spider being closed.
         """
-        try:
-            with open(self.output_file, "w", encoding="utf-8") as file:
-                json.dump(self.job_details, file, ensure_ascii=False, indent=4)
-            self.logger.info(f"Job details saved to '{self.output_file}'.")
-        except Exception as e:
-            self.logger.error(f"Error saving job details: {e}")
\ No newline at end of file
+        self.parse_pool.shutdown()
+        for key, value in self.parse_pool.stats().items():
+            self.crawler.stats.set_value(f"parse_pool/{key}", value)
+        self.parse_pool.report(f"Parse-Pool {self.name}")
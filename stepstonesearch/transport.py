@@ -0,0 +1,63 @@
+"""
+This module defines the transport profiles of the Stepstone crawler.
+
+A transport profile is a set of Scrapy settings that controls how pages are downloaded: the download handler
+(HTTP/1.1 or HTTP/2) and the limits of a single download.
+The profile is selected with the environment variable ``STEPSTONE_TRANSPORT_PROFILE`` and applied at the end
+of ``settings.py``. Scrapy's defaults already cache DNS lookups and negotiate the content encodings whose decoders
+are installed (``HttpCompressionMiddleware``: gzip, deflate and Brotli/zstd if available), so the profiles
+leave those settings alone. Scrapy's HTTP/1.1 handler also keeps its connections alive, and with the project's
+``DOWNLOAD_DELAY`` every download slot has at most one request in flight, so a larger connection pool per host
+would not change anything.
+
+Profiles:
+- ``default``: Scrapy's HTTP/1.1 handler with the project settings as they are.
+- ``limits``: Scrapy's HTTP/1.1 handler with download limits that fail fast instead of blocking the download slot
+  of Stepstone (30 s timeout instead of 180 s, 16 MiB instead of 1 GiB).
+- ``http2``: The download limits of ``limits``, but HTTPS requests are multiplexed over a single HTTP/2
+  connection per host. Requires the ``h2`` package (``pip install Twisted[http2]``). Scrapy's HTTP/2 handler does
+  not support proxies, so the profile cannot be combined with ``PROXY_URLS``.
+"""
+
+# A job page is far below these limits; hung or runaway downloads give up their slot early
+DOWNLOAD_LIMITS = {
+    "DOWNLOAD_TIMEOUT": 30,
+    "DOWNLOAD_MAXSIZE": 16 * 1024 * 1024,
+    "DOWNLOAD_WARNSIZE": 4 * 1024 * 1024,
+    "DNS_TIMEOUT": 10,
+}
+
+TRANSPORT_PROFILES = {
+    "default": {},
+    "limits": DOWNLOAD_LIMITS,
+    "http2": {
+        **DOWNLOAD_LIMITS,
+        "DOWNLOAD_HANDLERS": {
+            "https": "scrapy.core.downloader.handlers.http2.H2DownloadHandler",
+        },
+    },
+}
+
+
+def transport_settings(profile, current):
+    """
+    Return the settings of a transport profile merged onto the current project settings.
+
+    Dictionary settings (e.g. ``DOWNLOAD_HANDLERS``) are merged key by key instead of replaced,
+    so the profile only adds or overrides the keys it defines.
+
+    :param profile: The name of the transport profile.
+    :param current: The current project settings (e.g. ``globals()`` of settings.py).
+    :return: A dictionary of settings to apply.
+    :raises ValueError: If the profile is unknown.
+    """
+    if profile not in TRANSPORT_PROFILES:
+        raise ValueError(f"Unknown transport profile '{profile}', choose one of {', '.join(TRANSPORT_PROFILES)}")
+
+    merged = {}
+    for name, value in TRANSPORT_PROFILES[profile].items():
+        if isinstance(value, dict) and isinstance(current.get(name), dict):
+            merged[name] = {**current[name], **value}
+        else:
+            merged[name] = value
+    return merged
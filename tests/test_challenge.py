@@ -0,0 +1,72 @@
+from challenge import CircuitBreaker, is_challenge_page
+
+# A regular job page behind Cloudflare with the injected JavaScript detection snippet
+REGULAR_PAGE = (
+    "<!DOCTYPE html><html><head><title>Data Analyst (m/w/d) - Berlin</title></head><body>"
+    "<div id=\"jobDescriptionText\"><p>Wir suchen ...</p></div>"
+    "<form><div class=\"g-recaptcha\" data-sitekey=\"x\"></div></form>"
+    "<script>(function(){var a=document.createElement('script');"
+    "a.src='/cdn-cgi/challenge-platform/scripts/jsd/main.js';document.head.appendChild(a);})();</script>"
+    "</body></html>"
+)
+
+INTERSTITIAL = (
+    "<!DOCTYPE html><html lang=\"en-US\"><head><title>Just a moment...</title></head><body>"
+    "<div class=\"main-wrapper\"><h2>Verifying you are human. This may take a few seconds.</h2>"
+    "<div class=\"cf-turnstile\"></div></div>"
+    "<script>(function(){window._cf_chl_opt={cvId: '3', cZone: 'de.indeed.com'};"
+    "var a=document.createElement('script');a.src='/cdn-cgi/challenge-platform/h/g/orchestrate/chl_page/v1';"
+    "})();</script></body></html>"
+)
+
+
+def test_regular_page_with_cloudflare_snippet_is_no_challenge():
+    assert not is_challenge_page(REGULAR_PAGE)
+    assert not is_challenge_page(REGULAR_PAGE.encode("utf-8"), status=200)
+
+
+def test_interstitial_is_challenge():
+    assert is_challenge_page(INTERSTITIAL, status=403)
+    assert is_challenge_page(INTERSTITIAL.encode("utf-8"))
+
+
+def test_short_blocked_response_is_challenge():
+    assert is_challenge_page("Too Many Requests", status=429)
+    assert not is_challenge_page("Not Found", status=404)
+
+
+def test_breaker_opens_after_threshold(clock):
+    breaker = CircuitBreaker("test", threshold=3, base_delay=30, clock=clock)
+    assert breaker.record_challenge() == 0
+    assert breaker.record_challenge() == 0
+    assert breaker.allow()
+    assert breaker.record_challenge() == 30
+    assert breaker.state == "open"
+    assert not breaker.allow()
+    assert breaker.remaining() == 30
+
+
+def test_breaker_half_open_trial_closes_on_success(clock):
+    breaker = CircuitBreaker("test", threshold=1, base_delay=30, clock=clock)
+    breaker.record_challenge()
+    clock.now = 30
+    assert breaker.allow()
+    assert breaker.state == "half-open"
+    breaker.record_success()
+    assert breaker.state == "closed"
+    # The backoff starts over after the breaker closed
+    assert breaker.record_challenge() == 30
+
+
+def test_breaker_failed_trial_doubles_the_pause(clock):
+    breaker = CircuitBreaker("test", threshold=3, base_delay=30, max_delay=100, clock=clock)
+    for _ in range(3):
+        breaker.record_challenge()
+    clock.now = 30
+    assert breaker.allow()
+    assert breaker.record_challenge() == 60
+    assert breaker.state == "open"
+    clock.now = 90
+    assert breaker.allow()
+    assert breaker.record_challenge() == 100
+    assert breaker.stats()["opens"] == 3
@@ -0,0 +1,137 @@
+import os
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from bson import ObjectId
+
+pq = pytest.importorskip("pyarrow.parquet")
+
+import export_parquet
+from export_parquet import export_collection, load_state, partition_value
+
+START = datetime(2025, 1, 31, 12, 0, tzinfo=timezone.utc)
+
+
+class FakeCursor(list):
+    def sort(self, key, direction):
+        return FakeCursor(sorted(self, key=lambda doc: doc[key], reverse=direction < 0))
+
+
+class FakeCollection:
+    """Supports the range queries on _id used by the export."""
+
+    def __init__(self, name):
+        self.name = name
+        self.docs = []
+
+    def insert(self, created, **fields):
+        doc = {"_id": ObjectId.from_datetime(created), **fields}
+        # ObjectId.from_datetime only sets the timestamp; make the IDs unique like a real client
+        doc["_id"] = ObjectId(str(doc["_id"])[:8] + os.urandom(8).hex())
+        self.docs.append(doc)
+        return doc["_id"]
+
+    def find(self, query, batch_size=None):
+        bounds = query.get("_id", {})
+        checks = {"$lt": lambda a, b: a < b, "$gte": lambda a, b: a >= b, "$gt": lambda a, b: a > b}
+        return FakeCursor(
+            doc for doc in self.docs if all(checks[op](doc["_id"], value) for op, value in bounds.items())
+        )
+
+
+def exported_ids(output):
+    table = pq.read_table(output)
+    return sorted(table.column("mongo_id").to_pylist())
+
+
+def test_late_insert_with_older_objectid_is_exported_once(tmp_path):
+    output = str(tmp_path)
+    collection = FakeCollection("indeed_data_analyst")
+    first = collection.insert(START, jobID="a")
+    state = {}
+    assert export_collection(collection, "indeed", "data_analyst", output, state, "r1", START + timedelta(minutes=1)) == 1
+
+    # Another container inserted a document whose ObjectId is older than the end of the first window
+    late = collection.insert(START + timedelta(seconds=50), jobID="b")
+    newer = collection.insert(START + timedelta(minutes=2), jobID="c")
+    state = load_state(output)
+    assert export_collection(collection, "indeed", "data_analyst", output, state, "r2", START + timedelta(minutes=3)) == 2
+    assert exported_ids(output) == sorted(str(i) for i in (first, late, newer))
+
+    # The next window skips the documents of the overlap that were already exported
+    state = load_state(output)
+    assert export_collection(collection, "indeed", "data_analyst", output, state, "r3", START + timedelta(minutes=4)) == 0
+    assert set(state["indeed_data_analyst"]["seen"]) == {str(first), str(late), str(newer)}
+
+
+def test_seen_ids_outside_the_overlap_are_dropped(tmp_path):
+    collection = FakeCollection("indeed_data_analyst")
+    collection.insert(START, jobID="a")
+    state = {}
+    export_collection(collection, "indeed", "data_analyst", str(tmp_path), state, "r1",
+                      START + export_parquet.EXPORT_OVERLAP + timedelta(minutes=1))
+    assert state["indeed_data_analyst"]["seen"] == []
+
+
+def test_interrupted_export_does_not_write_documents_twice(tmp_path, monkeypatch):
+    output = str(tmp_path)
+    collection = FakeCollection("stepstone_data_analyst")
+    for i in range(5):
+        collection.insert(START + timedelta(seconds=i), jobId=str(i))
+
+    write_chunk = export_parquet.write_chunk
+    calls = []
+
+    def failing_write_chunk(rows, output, basename):
+        if calls:
+            raise OSError("disk full")
+        calls.append(basename)
+        write_chunk(rows, output, basename)
+
+    monkeypatch.setattr(export_parquet, "write_chunk", failing_write_chunk)
+    with pytest.raises(OSError):
+        export_collection(collection, "stepstone", "data_analyst", output, {}, "r1", START + timedelta(minutes=1),
+                          chunk_size=2)
+    monkeypatch.setattr(export_parquet, "write_chunk", write_chunk)
+
+    state = load_state(output)
+    assert state["stepstone_data_analyst"]["last"] == str(collection.docs[1]["_id"])
+    assert export_collection(collection, "stepstone", "data_analyst", output, state, "r2",
+                             START + timedelta(minutes=1), chunk_size=2) == 3
+    assert len(exported_ids(output)) == 5
+
+
+def test_state_stays_bounded_over_many_chunks(tmp_path, monkeypatch):
+    output = str(tmp_path)
+    collection = FakeCollection("stepstone_data_analyst")
+    until = START + timedelta(hours=2)
+    for i in range(60):
+        collection.insert(START + timedelta(minutes=i), jobId=str(i))
+    recent = [collection.insert(until - timedelta(minutes=1), jobId=f"r{i}") for i in range(3)]
+
+    save_state = export_parquet.save_state
+    sizes = []
+
+    def recording_save_state(output, state):
+        entry = state["stepstone_data_analyst"]
+        sizes.append(len(entry.get("seen", [])) + len(entry.get("pending", [])))
+        save_state(output, state)
+
+    monkeypatch.setattr(export_parquet, "save_state", recording_save_state)
+    assert export_collection(collection, "stepstone", "data_analyst", output, {}, "r1", until, chunk_size=2) == 63
+    assert len(sizes) == 33
+    assert max(sizes) <= len(recent)
+    assert load_state(output)["stepstone_data_analyst"] == {
+        "until": until.isoformat(), "seen": sorted(str(i) for i in recent),
+    }
+
+
+def test_titles_are_safe_partition_values(tmp_path):
+    assert partition_value("c/c++_entwickler") == "c_c__entwickler"
+    assert partition_value("a=b") == "a_b"
+    assert partition_value("..") == "_"
+
+    collection = FakeCollection("indeed_c/c++_entwickler")
+    collection.insert(START, jobID="a")
+    export_collection(collection, "indeed", "c/c++_entwickler", str(tmp_path), {}, "r1", START + timedelta(minutes=1))
+    assert os.listdir(os.path.join(tmp_path, "source=indeed")) == ["title=c_c__entwickler"]
@@ -0,0 +1,57 @@
+import json
+import os
+
+import pytest
+
+from extraction import SPECS, compile_spec, extract, map_record
+
+"""
+The expected outputs in fixtures/extraction/expected.json were produced by the parsers that existed before the
+extraction engine (BeautifulSoup for Indeed, parsel for Stepstone, the dictionary of Links.collect_items).
+"""
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures", "extraction")
+
+HTML_CASES = [
+    ("indeed_detail", "indeed_detail.html"),
+    ("indeed_detail", "indeed_detail_empty_benefits.html"),
+    ("indeed_detail", "indeed_detail_bare.html"),
+    ("indeed_search", "indeed_search.html"),
+    ("stepstone_detail", "stepstone_detail.html"),
+    ("stepstone_detail", "stepstone_detail_edge.html"),
+]
+
+
+def read_fixture(name):
+    with open(os.path.join(FIXTURES, name), "r", encoding="utf-8") as file:
+        return file.read()
+
+
+@pytest.fixture(scope="module")
+def expected():
+    return json.loads(read_fixture("expected.json"))
+
+
+@pytest.mark.parametrize("spec, fixture", HTML_CASES)
+def test_extract_matches_previous_parsers(spec, fixture, expected):
+    assert extract(spec, read_fixture(fixture)) == expected[fixture]
+
+
+def test_empty_benefit_items_are_kept(expected):
+    assert extract("indeed_detail", read_fixture("indeed_detail.html"))["benefits"] == ["Homeoffice", "", "Bonusextra"]
+
+
+def test_map_record_matches_previous_link_entries(expected):
+    items = json.loads(read_fixture("stepstone_search_items.json"))
+    assert [map_record("stepstone_search_item", item) for item in items] == expected["stepstone_search_items.json"]
+
+
+def test_specs_are_compiled_once_per_version(monkeypatch):
+    compiled = compile_spec("indeed_search")
+    assert compile_spec("indeed_search") is compiled
+
+    spec = {**SPECS["indeed_search"], "version": SPECS["indeed_search"]["version"] + 1}
+    monkeypatch.setitem(SPECS, "indeed_search", spec)
+    recompiled = compile_spec("indeed_search")
+    assert recompiled is not compiled
+    assert recompiled.version == spec["version"]
@@ -0,0 +1,60 @@
+from identity_pool import IdentityPool
+
+PROXIES = ["http://127.0.0.1:8960", "http://127.0.0.1:8961"]
+
+
+def test_least_recently_used_identity_is_chosen(clock):
+    pool = IdentityPool(proxies=PROXIES, clock=clock)
+    used = []
+    for _ in range(4):
+        clock.now += 1
+        identity = pool.acquire()
+        pool.mark_used(identity)
+        used.append(identity.name)
+    assert used == ["proxy-0", "proxy-1", "proxy-0", "proxy-1"]
+
+
+def test_blocked_identity_is_benched_and_session_moves(clock):
+    pool = IdentityPool(proxies=PROXIES, cooldown=60, clock=clock)
+    identity = pool.acquire(session="data analyst")
+    assert pool.acquire(session="data analyst") is identity
+
+    pool.record_failure(identity, blocked=True)
+    other = pool.acquire(session="data analyst")
+    assert other is not identity
+    assert pool.stats()[identity.name]["benched"]
+
+    clock.now = 60
+    assert pool.available(identity)
+
+
+def test_direct_identity_without_proxies_keeps_browser_user_agent():
+    identity = IdentityPool(proxies=[]).acquire()
+    assert identity.proxy is None
+    assert identity.browser_options() == {}
+
+
+def test_sessions_of_a_benched_identity_are_dropped(clock):
+    pool = IdentityPool(proxies=PROXIES, clock=clock)
+    first = pool.acquire(session="job-1")
+    clock.now = 1
+    pool.mark_used(first)
+    second = pool.acquire(session="job-2")
+    assert first is not second
+
+    pool.record_failure(first, blocked=True)
+    assert pool.sessions == {"job-2": second.name}
+
+
+def test_least_recently_used_sessions_are_dropped_above_the_cap(clock):
+    pool = IdentityPool(proxies=PROXIES, max_sessions=3, clock=clock)
+    for i in range(3):
+        pool.acquire(session=f"job-{i}")
+    # Using a session keeps it, the oldest unused one is dropped
+    pool.acquire(session="job-0")
+    pool.acquire(session="job-3")
+    assert list(pool.sessions) == ["job-2", "job-0", "job-3"]
+
+    for i in range(100):
+        pool.acquire(session=f"page-{i}")
+    assert len(pool.sessions) == 3
@@ -0,0 +1,25 @@
+import pytest
+from scrapy.utils.test import get_crawler
+
+from stepstonesearch.middlewares import IdentityRotationMiddleware
+from stepstonesearch.transport import TRANSPORT_PROFILES
+
+H2_HANDLERS = TRANSPORT_PROFILES["http2"]["DOWNLOAD_HANDLERS"]
+
+
+def test_proxies_are_rejected_with_http2():
+    crawler = get_crawler(settings_dict={"PROXY_URLS": ["http://127.0.0.1:8960"], "DOWNLOAD_HANDLERS": H2_HANDLERS})
+    with pytest.raises(ValueError, match="HTTP/2"):
+        IdentityRotationMiddleware.from_crawler(crawler)
+
+
+def test_direct_connection_works_with_http2():
+    crawler = get_crawler(settings_dict={"PROXY_URLS": [], "DOWNLOAD_HANDLERS": H2_HANDLERS})
+    middleware = IdentityRotationMiddleware.from_crawler(crawler)
+    assert [identity.proxy for identity in middleware.pool.identities] == [None]
+
+
+def test_proxies_work_with_http11():
+    crawler = get_crawler(settings_dict={"PROXY_URLS": ["http://127.0.0.1:8960"]})
+    middleware = IdentityRotationMiddleware.from_crawler(crawler)
+    assert [identity.proxy for identity in middleware.pool.identities] == ["http://127.0.0.1:8960"]
@@ -0,0 +1,117 @@
+import os
+
+import pytest
+
+import indeed_scraper
+from challenge import CircuitBreaker
+from indeed_scraper import collect_links_by_url, extract_job_keys, fetch_in_tabs, job_view_url, search_page_url
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures", "indeed")
+
+MOSAIC_KEYS = ["a1b2c3d4e5f60001", "a1b2c3d4e5f60002", "a1b2c3d4e5f60003"]
+LINK_KEYS = ["b0000001", "b0000002", "b0000003"]
+
+CHALLENGE = "<html><head><title>Just a moment...</title></head><body>Verifying you are human</body></html>"
+
+
+def read_fixture(name):
+    with open(os.path.join(FIXTURES, name), "r", encoding="utf-8") as file:
+        return file.read()
+
+
+class FakeSB:
+    """A browser without the CDP tab API that serves fixed page sources by URL."""
+
+    def __init__(self, pages):
+        self.pages = pages
+        self.opened = []
+        self.current = None
+
+    def open(self, url):
+        self.opened.append(url)
+        self.current = url
+
+    def sleep(self, seconds):
+        pass
+
+    def get_page_source(self):
+        return self.pages.get(self.current, "<html><body></body></html>")
+
+    def uc_gui_click_captcha(self):
+        pass
+
+
+class FakeCDP:
+    def __init__(self, sb):
+        self.sb = sb
+        self.tabs = ["main"]
+        self.active = "main"
+
+    def get_active_tab(self):
+        return self.active
+
+    def open_new_tab(self, url, switch_to=True):
+        self.tabs.append(url)
+
+    def get_tabs(self):
+        return list(self.tabs)
+
+    def switch_to_tab(self, tab):
+        self.active = tab
+        self.sb.current = None if tab == "main" else tab
+
+    def close_active_tab(self):
+        self.tabs.remove(self.active)
+
+
+@pytest.fixture
+def breaker(clock):
+    return CircuitBreaker("Indeed", clock=clock)
+
+
+def test_search_page_url():
+    assert search_page_url("data analyst", 0) == "https://de.indeed.com/jobs?q=data%20analyst"
+    assert search_page_url("c++ entwickler", 2) == "https://de.indeed.com/jobs?q=c%2B%2B%20entwickler&start=20"
+
+
+def test_job_keys_are_taken_from_the_job_cards_json():
+    # The sponsored link outside the JSON is not a result of the search
+    assert extract_job_keys(read_fixture("search_mosaic.html")) == MOSAIC_KEYS
+
+
+def test_job_keys_fall_back_to_attributes_and_links():
+    assert extract_job_keys(read_fixture("search_links.html")) == LINK_KEYS
+    assert extract_job_keys("<html><body>Keine Ergebnisse</body></html>") == []
+
+
+def test_fetch_in_tabs_returns_the_pages_in_url_order():
+    urls = [search_page_url("data analyst", page) for page in (1, 2, 3)]
+    sb = FakeSB({url: f"<html>{url}</html>" for url in urls})
+    sb.cdp = FakeCDP(sb)
+    assert fetch_in_tabs(sb, urls) == [(url, f"<html>{url}</html>") for url in urls]
+    assert sb.cdp.tabs == ["main"] and sb.cdp.active == "main"
+
+
+def test_links_are_collected_in_page_order_without_duplicates(monkeypatch, breaker):
+    monkeypatch.setattr(indeed_scraper, "SEARCH_TABS", 2)
+    links_page = read_fixture("search_links.html")
+    sb = FakeSB({
+        search_page_url("data analyst", 1): links_page,
+        search_page_url("data analyst", 2): '<a data-jk="b0000003"></a><a data-jk="c0000001"></a>',
+        search_page_url("data analyst", 3): links_page,
+    })
+    links = collect_links_by_url(sb, "data analyst", read_fixture("search_mosaic.html"), breaker, max_pages=10)
+    assert links == [job_view_url(key) for key in MOSAIC_KEYS + LINK_KEYS + ["c0000001"]]
+    # Page 3 has no new keys, so no batch after the one of pages 3 and 4 is loaded
+    assert sb.opened == [search_page_url("data analyst", page) for page in (1, 2, 3, 4)]
+
+
+def test_blocked_result_page_returns_the_links_collected_so_far(monkeypatch, breaker):
+    monkeypatch.setattr(indeed_scraper, "SEARCH_TABS", 1)
+    sb = FakeSB({
+        search_page_url("data analyst", 1): read_fixture("search_links.html"),
+        search_page_url("data analyst", 2): CHALLENGE,
+    })
+    links = collect_links_by_url(sb, "data analyst", read_fixture("search_mosaic.html"), breaker, max_pages=10)
+    assert links == [job_view_url(key) for key in MOSAIC_KEYS + LINK_KEYS]
+    assert breaker.challenges == 1
@@ -0,0 +1,99 @@
+import json
+import os
+from datetime import datetime, timedelta, timezone
+
+from indeed_scraper import parse_indeed_job
+from page_archive import ArchiveReader, PageArchive, reextract, segment_name
+
+FETCHED = datetime(2025, 1, 31, 12, 0, tzinfo=timezone.utc)
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures", "extraction")
+
+
+def read_fixture(name):
+    with open(os.path.join(FIXTURES, name), "r", encoding="utf-8") as file:
+        return file.read()
+
+
+def segments(root, source):
+    return sorted(f for f in os.listdir(os.path.join(root, source)) if f.startswith("segment-"))
+
+
+def test_new_segment_is_started_at_the_size_limit(tmp_path):
+    archive = PageArchive(str(tmp_path), "indeed", segment_size=300)
+    # Random bytes do not compress, so every record takes about 200 bytes
+    bodies = [os.urandom(200) for _ in range(3)]
+    entries = [archive.append(f"https://example.org/{i}", body) for i, body in enumerate(bodies)]
+    # A record larger than the limit still goes into an empty segment
+    large = os.urandom(1000)
+    entries.append(archive.append("https://example.org/large", large))
+    archive.close()
+
+    assert [entry["segment"] for entry in entries] == [1, 2, 3, 4]
+    assert all(entry["offset"] == 0 for entry in entries)
+    assert segments(str(tmp_path), "indeed") == [segment_name(i) for i in range(1, 5)]
+
+    reader = ArchiveReader(str(tmp_path), "indeed")
+    assert [reader.read(entry) for entry in reader.entries] == bodies + [large]
+    reader.close()
+
+
+def test_reopened_archive_appends_to_the_last_segment(tmp_path):
+    archive = PageArchive(str(tmp_path), "stepstone")
+    first = archive.append("https://example.org/1", "<html>1</html>", key="1")
+    archive.close()
+
+    archive = PageArchive(str(tmp_path), "stepstone")
+    second = archive.append("https://example.org/2", "<html>2</html>", key="2")
+    archive.close()
+
+    assert second["segment"] == first["segment"] == 1
+    assert second["offset"] == first["offset"] + first["length"]
+    reader = ArchiveReader(str(tmp_path), "stepstone")
+    assert [entry["key"] for entry in reader.entries] == ["1", "2"]
+    assert reader.get("2")[1] == b"<html>2</html>"
+    reader.close()
+
+
+def test_get_and_latest_return_the_newest_version_per_key(tmp_path):
+    archive = PageArchive(str(tmp_path), "indeed")
+    archive.append("https://example.org/a", "a1", key="a", fetched_at=FETCHED)
+    archive.append("https://example.org/search", "s", kind="search", fetched_at=FETCHED)
+    archive.append("https://example.org/b", "b1", key="b", fetched_at=FETCHED)
+    archive.append("https://example.org/a", "a2", key="a", fetched_at=FETCHED + timedelta(hours=1))
+    archive.close()
+
+    reader = ArchiveReader(str(tmp_path), "indeed")
+    entry, body = reader.get("a")
+    assert body == b"a2" and entry["fetched_at"] == (FETCHED + timedelta(hours=1)).isoformat()
+    assert reader.get("a", at=FETCHED + timedelta(minutes=30))[1] == b"a1"
+    assert reader.get("a", at=FETCHED - timedelta(minutes=1)) is None
+    assert reader.get("missing") is None
+
+    assert [(e["key"], reader.read(e)) for e in reader.latest("detail")] == [("a", b"a2"), ("b", b"b1")]
+    assert [e["key"] for e in reader.latest()] == ["a", "https://example.org/search", "b"]
+    reader.close()
+
+
+def test_reextract_parses_the_latest_detail_pages(tmp_path):
+    root = str(tmp_path / "archive")
+    old_page = read_fixture("indeed_detail_bare.html")
+    page = read_fixture("indeed_detail.html")
+    other_page = read_fixture("indeed_detail_empty_benefits.html")
+    archive = PageArchive(root, "indeed")
+    archive.append("https://de.indeed.com/jobs?q=data", "<html></html>", kind="search", job_title="data analyst")
+    archive.append("https://de.indeed.com/viewjob?jk=a1", old_page, key="a1", fetched_at=FETCHED,
+                   job_title="data analyst")
+    archive.append("https://de.indeed.com/viewjob?jk=b2", other_page, key="b2", fetched_at=FETCHED,
+                   job_title="data analyst")
+    archive.append("https://de.indeed.com/viewjob?jk=a1", page, key="a1", fetched_at=FETCHED + timedelta(days=1),
+                   job_title="data analyst")
+    archive.close()
+
+    output = str(tmp_path / "jobs.jsonl")
+    assert reextract(root, "indeed", output, workers=0) == 2
+    with open(output, "r", encoding="utf-8") as file:
+        jobs = [json.loads(line) for line in file]
+    assert jobs == [
+        parse_indeed_job(page, "https://de.indeed.com/viewjob?jk=a1", "data analyst"),
+        parse_indeed_job(other_page, "https://de.indeed.com/viewjob?jk=b2", "data analyst"),
+    ]
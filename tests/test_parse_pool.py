@@ -0,0 +1,59 @@
+import pytest
+
+import parse_pool
+from parse_pool import ParsePool
+
+
+def count_words(html):
+    return len(html.split())
+
+
+def broken_parser(html):
+    raise ValueError(f"cannot parse {html}")
+
+
+def test_parse_workers_zero_parses_inline(monkeypatch):
+    monkeypatch.setenv("PARSE_WORKERS", "0")
+    pool = ParsePool()
+    assert pool.workers == 0 and pool.executor is None
+    future = pool.submit(count_words, "<p>a b c</p>")
+    assert future.done() and future.result() == 3
+    pool.shutdown()
+
+
+def test_default_workers(monkeypatch):
+    monkeypatch.delenv("PARSE_WORKERS", raising=False)
+    assert parse_pool.default_workers() == parse_pool.DEFAULT_WORKERS
+    monkeypatch.setenv("PARSE_WORKERS", "5")
+    assert parse_pool.default_workers() == 5
+
+
+@pytest.mark.parametrize("workers", [0, 2])
+def test_counters_and_results(workers):
+    pool = ParsePool(workers)
+    try:
+        futures = [pool.submit(count_words, "a " * n) for n in range(1, 5)]
+        assert [future.result() for future in futures] == [1, 2, 3, 4]
+        stats = pool.stats()
+    finally:
+        pool.shutdown()
+    assert stats["workers"] == workers
+    assert stats["submitted"] == stats["completed"] == 4
+    assert stats["failed"] == 0 and stats["queue_depth"] == 0
+    assert stats["max_queue_depth"] >= 1
+    assert stats["avg_parse_ms"] >= 0
+
+
+@pytest.mark.parametrize("workers", [0, 1])
+def test_parse_errors_are_raised_by_the_future(workers):
+    pool = ParsePool(workers)
+    try:
+        failing = pool.submit(broken_parser, "<html>")
+        working = pool.submit(count_words, "a b")
+        with pytest.raises(ValueError, match="cannot parse <html>"):
+            failing.result()
+        assert working.result() == 2
+        stats = pool.stats()
+    finally:
+        pool.shutdown()
+    assert stats["completed"] == 2 and stats["failed"] == 1
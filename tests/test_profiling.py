@@ -0,0 +1,136 @@
+import atexit
+import multiprocessing
+import os
+import signal
+import time
+
+import pytest
+
+import profiling
+from profiling import finish_run, get_profiler, merge_run, stage
+
+
+@pytest.fixture
+def run_dir(tmp_path, monkeypatch):
+    """Profile the test as run "test-run" and return the output directory of the run."""
+    monkeypatch.setenv("PROFILE_RUN_ID", "test-run")
+    monkeypatch.setenv("PROFILE_DIR", str(tmp_path))
+    monkeypatch.setenv("PROFILE_INTERVAL", "0.001")
+    monkeypatch.setattr(profiling, "_profiler", None)
+    yield os.path.join(tmp_path, "test-run")
+    profiler = profiling._profiler
+    if profiler is not None:
+        profiler.stop()
+        atexit.unregister(profiler.flush)
+    signal.signal(signal.SIGALRM, signal.SIG_DFL)
+
+
+def busy_parse(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+def busy_store(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+def read_folded(path):
+    with open(path, "r", encoding="utf-8") as file:
+        return {stack: int(count) for stack, _, count in (line.rstrip("\n").rpartition(" ") for line in file)}
+
+
+def write_folded(path, lines):
+    with open(path, "w", encoding="utf-8") as file:
+        file.write("".join(f"{line}\n" for line in lines))
+
+
+def test_samples_are_attributed_to_the_active_stage(run_dir):
+    get_profiler("main")
+    with stage("parse"):
+        busy_parse(0.2)
+    with stage("store"):
+        busy_store(0.2)
+    busy_parse(0.05)  # Outside of a stage, not sampled
+    finish_run()
+
+    assert sorted(os.listdir(run_dir)) == [
+        f"main-{os.getpid()}.folded", "merged.folded", "stage-parse.folded", "stage-store.folded",
+    ]
+    parse = read_folded(os.path.join(run_dir, "stage-parse.folded"))
+    store = read_folded(os.path.join(run_dir, "stage-store.folded"))
+    assert parse and all(stack.startswith("main;parse;") for stack in parse)
+    assert store and all(stack.startswith("main;store;") for stack in store)
+    assert any("busy_parse (test_profiling.py" in stack for stack in parse)
+    assert not any("busy_store" in stack for stack in parse)
+    assert not any("busy_parse" in stack for stack in store)
+    merged = read_folded(os.path.join(run_dir, "merged.folded"))
+    assert sum(merged.values()) == sum(parse.values()) + sum(store.values())
+
+
+def test_merge_run_combines_the_process_files(tmp_path):
+    run_dir = str(tmp_path)
+    write_folded(os.path.join(run_dir, "run_scrapers-10.folded"), [
+        "run_scrapers;indeed;detail fetch;main (run.py:1);open (sb.py:2) 3",
+        "run_scrapers;indeed;store;main (run.py:1);insert_one (mongo.py:3) 1",
+    ])
+    write_folded(os.path.join(run_dir, "parse_worker-11.folded"), [
+        "parse_worker;parse;_timed_call (parse_pool.py:1);extract (extraction.py:2) 4",
+    ])
+    write_folded(os.path.join(run_dir, "parse_worker-12.folded"), [
+        "parse_worker;parse;_timed_call (parse_pool.py:1);extract (extraction.py:2) 2",
+    ])
+
+    assert merge_run(run_dir) == 10
+    # Merging again does not count the merged and stage files
+    assert merge_run(run_dir) == 10
+
+    assert read_folded(os.path.join(run_dir, "merged.folded")) == {
+        "parse_worker;parse;_timed_call (parse_pool.py:1);extract (extraction.py:2)": 6,
+        "run_scrapers;indeed;detail fetch;main (run.py:1);open (sb.py:2)": 3,
+        "run_scrapers;indeed;store;main (run.py:1);insert_one (mongo.py:3)": 1,
+    }
+    # Nested stages contain the samples of their inner stages
+    assert sum(read_folded(os.path.join(run_dir, "stage-indeed.folded")).values()) == 4
+    assert sum(read_folded(os.path.join(run_dir, "stage-detail_fetch.folded")).values()) == 3
+    assert sum(read_folded(os.path.join(run_dir, "stage-parse.folded")).values()) == 6
+
+
+def report_child_profiler(queue):
+    profiler = get_profiler()
+    queue.put((profiler.label, profiler.pid, sum(profiler.samples.values())))
+
+
+def test_forked_child_does_not_flush_the_parent_samples(run_dir):
+    parent = get_profiler("main")
+    parent.samples["main;parse;busy_parse (test_profiling.py:1)"] += 5
+
+    pid = os.fork()
+    if pid == 0:
+        # A forked child that exits normally runs the atexit flush it inherited from the parent
+        try:
+            parent.flush()
+            child = get_profiler()
+            os._exit(0 if child is not parent and child.pid == os.getpid() and not child.samples else 1)
+        finally:
+            os._exit(2)
+    _, status = os.waitpid(pid, 0)
+
+    assert os.waitstatus_to_exitcode(status) == 0
+    assert not os.path.exists(run_dir)
+    parent.flush()
+    assert os.listdir(run_dir) == [f"main-{os.getpid()}.folded"]
+
+
+def test_parse_worker_gets_its_own_profiler(run_dir):
+    get_profiler("main")
+    context = multiprocessing.get_context("fork")
+    queue = context.Queue()
+    worker = context.Process(target=report_child_profiler, args=(queue,))
+    worker.start()
+    result = queue.get(timeout=10)
+    worker.join(10)
+    assert worker.exitcode == 0
+    assert result == ("parse_worker", worker.pid, 0)
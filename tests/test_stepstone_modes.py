@@ -0,0 +1,96 @@
+import glob
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from benchmarks.bench_stepstone_modes import REPO_ROOT, free_port, start_stub, stub_call
+from benchmarks.stepstone_stub import make_details
+
+"""
+Runs the Links and sitespider spiders (stepstonesearch/crawl.py) against the local stub server in both fetch modes,
+including the fallbacks from incomplete or unknown payloads to HTML.
+"""
+
+SEARCH_PAGES = 2  # The stub serves 25 jobs per page, so the Links default of 35 jobs needs two pages
+MAX_JOBS = 35
+
+
+@pytest.fixture(scope="module", params=[False, True], ids=["complete", "incomplete"])
+def stub(request):
+    port = free_port()
+    args = ["--pages", str(SEARCH_PAGES), "--padding-kb", "1"] + (["--incomplete-payloads"] if request.param else [])
+    process = start_stub(port, args)
+    yield f"http://127.0.0.1:{port}", request.param
+    process.terminate()
+    process.wait()
+
+
+def run_crawl(base_url, workdir, mode, **settings):
+    """
+    Crawl the stub for one job title and return the stub counters and the stored jobs.
+    """
+    stub_call(base_url, "/__reset")
+    overrides = {"STEPSTONE_BASE_URL": base_url, "STEPSTONE_FETCH_MODE": mode, "DOWNLOAD_DELAY": 0, **settings}
+    command = [sys.executable, "-m", "stepstonesearch.crawl", "--job-title", "stubtest",
+               "--links-output", os.path.join(workdir, "links.json")]
+    for name, value in overrides.items():
+        command += ["-s", f"{name}={value}"]
+    env = {**os.environ, "PYTHONPATH": REPO_ROOT, "SCRAPY_SETTINGS_MODULE": "stepstonesearch.settings",
+           "PROXY_URLS": ""}
+    subprocess.run(command, cwd=workdir, env=env, check=True, capture_output=True)
+
+    jobs = []
+    for path in sorted(glob.glob(os.path.join(workdir, "stubtest_*.jsonl"))):
+        with open(path, "r", encoding="utf-8") as file:
+            jobs.extend(json.loads(line) for line in file)
+    return stub_call(base_url, "/__stats")["requests"], {job["jobId"]: job for job in jobs}
+
+
+def assert_jobs_complete(jobs):
+    assert len(jobs) == MAX_JOBS
+    for job_id, job in jobs.items():
+        paragraphs, lists = make_details(int(job_id))
+        assert job["paragraphs"] == paragraphs
+        assert job["lists"] == lists
+        assert job["companyName"] == "Stub GmbH"
+
+
+def test_html_mode(stub, tmp_path):
+    base_url, _ = stub
+    requests, jobs = run_crawl(base_url, str(tmp_path), "html")
+    assert requests.get("search_api", 0) == requests.get("detail_api", 0) == 0
+    assert requests["detail_html"] == MAX_JOBS
+    assert_jobs_complete(jobs)
+
+
+def test_api_mode(stub, tmp_path):
+    base_url, incomplete = stub
+    requests, jobs = run_crawl(base_url, str(tmp_path), "api")
+    assert requests["search_api"] == SEARCH_PAGES
+    assert requests.get("search_html", 0) == 0
+    assert requests["detail_api"] == MAX_JOBS
+    # Incomplete detail payloads fall back to the HTML job page
+    assert requests.get("detail_html", 0) == (MAX_JOBS if incomplete else 0)
+    assert_jobs_complete(jobs)
+
+
+def test_api_mode_falls_back_for_unknown_search_payload(stub, tmp_path):
+    base_url, _ = stub
+    requests, jobs = run_crawl(base_url, str(tmp_path), "api", STEPSTONE_SEARCH_PAYLOAD_ITEMS="results")
+    # Every result page falls back to HTML, the next page is requested from the API again
+    assert requests["search_api"] == SEARCH_PAGES
+    assert requests["search_html"] == SEARCH_PAGES
+    assert_jobs_complete(jobs)
+
+
+def test_api_mode_falls_back_for_failed_payload_requests(stub, tmp_path):
+    base_url, _ = stub
+    requests, jobs = run_crawl(base_url, str(tmp_path), "api", STEPSTONE_DETAIL_API_PATH="/public-api/v2/{job_id}",
+                               STEPSTONE_SEARCH_API_PATH="/public-api/v2/search?page={page}")
+    assert requests["not_found"] == SEARCH_PAGES + MAX_JOBS
+    assert requests["search_html"] == SEARCH_PAGES
+    assert requests["detail_html"] == MAX_JOBS
+    assert_jobs_complete(jobs)
@@ -0,0 +1,78 @@
+import gzip
+import json
+
+import stepstone_scraper
+from stepstone_scraper import get_latest_output_files, read_jobs, save_to_mongo
+
+JOBS = [{"jobId": str(i), "title": f"Data Analyst {i}"} for i in range(7)]
+
+
+class FakeCollection:
+    """Records the index and bulk_write calls of save_to_mongo."""
+
+    def __init__(self):
+        self.indexes = {"_id_": {"key": [("_id", 1)]}}
+        self.bulks = []
+
+    def index_information(self):
+        return dict(self.indexes)
+
+    def create_index(self, keys, unique=False):
+        name = "_".join(f"{field}_{direction}" for field, direction in keys)
+        self.indexes[name] = {"key": keys, "unique": unique}
+        return name
+
+    def bulk_write(self, requests, ordered=True):
+        self.bulks.append(list(requests))
+
+
+def write_jsonl(path, jobs, compress=False):
+    opener = gzip.open if compress else open
+    with opener(path, "wt", encoding="utf-8") as file:
+        for job in jobs:
+            file.write(json.dumps(job) + "\n")
+        file.write("\n")  # Blank lines are skipped
+
+
+def test_read_jobs_streams_plain_and_gzip_files(tmp_path):
+    plain = str(tmp_path / "data analyst_2025-01-31_12-00-00-1.jsonl")
+    compressed = str(tmp_path / "data analyst_2025-01-31_12-00-00-2.jsonl.gz")
+    write_jsonl(plain, JOBS[:3])
+    write_jsonl(compressed, JOBS[3:], compress=True)
+
+    assert list(read_jobs(plain)) == JOBS[:3]
+    assert list(read_jobs(compressed)) == JOBS[3:]
+
+
+def test_latest_output_files_are_the_batches_of_the_newest_run(tmp_path):
+    for name in [
+        "data analyst_2025-01-30_08-00-00-1.jsonl",
+        "data analyst_2025-01-31_12-00-00-1.jsonl.gz",
+        "data analyst_2025-01-31_12-00-00-2.jsonl.gz",
+        "data scientist_2025-02-01_08-00-00-1.jsonl",
+        "data analyst_links.json",
+    ]:
+        (tmp_path / name).write_text("")
+
+    assert get_latest_output_files(str(tmp_path), "data analyst") == [
+        str(tmp_path / "data analyst_2025-01-31_12-00-00-1.jsonl.gz"),
+        str(tmp_path / "data analyst_2025-01-31_12-00-00-2.jsonl.gz"),
+    ]
+    assert get_latest_output_files(str(tmp_path), "data engineer") == []
+
+
+def test_save_to_mongo_writes_in_chunks_of_bulk_size(tmp_path, monkeypatch):
+    monkeypatch.setattr(stepstone_scraper, "BULK_SIZE", 3)
+    path = str(tmp_path / "data analyst_2025-01-31_12-00-00-1.jsonl.gz")
+    write_jsonl(path, JOBS, compress=True)
+    collection = FakeCollection()
+    db = {"stepstone_data_analyst": collection}
+
+    save_to_mongo(path, "Data Analyst", db)
+
+    assert [len(bulk) for bulk in collection.bulks] == [3, 3, 1]
+    operations = [operation for bulk in collection.bulks for operation in bulk]
+    assert [operation._filter for operation in operations] == [{"jobId": job["jobId"]} for job in JOBS]
+    assert all(operation._doc == {"$set": job} and operation._upsert for operation, job in zip(operations, JOBS))
+    assert collection.indexes["jobId_1"]["unique"]
+
@@ -0,0 +1,65 @@
+import importlib
+
+import pytest
+from scrapy.crawler import Crawler
+from scrapy.settings.default_settings import DOWNLOAD_HANDLERS_BASE
+from scrapy.utils.project import get_project_settings
+
+import stepstonesearch.settings
+from stepstonesearch.spiders.sitespider import sitespiderSpider
+from stepstonesearch.transport import transport_settings
+
+H2_HANDLER = "scrapy.core.downloader.handlers.http2.H2DownloadHandler"
+
+
+@pytest.fixture
+def crawler_settings(monkeypatch):
+    """Return the settings a crawler gets with a transport profile (project settings as loaded by crawl.py)."""
+    monkeypatch.setenv("SCRAPY_SETTINGS_MODULE", "stepstonesearch.settings")
+
+    def load(profile):
+        monkeypatch.setenv("STEPSTONE_TRANSPORT_PROFILE", profile)
+        importlib.reload(stepstonesearch.settings)
+        return Crawler(sitespiderSpider, get_project_settings()).settings
+
+    yield load
+    monkeypatch.delenv("STEPSTONE_TRANSPORT_PROFILE")
+    importlib.reload(stepstonesearch.settings)
+
+
+def test_default_profile_keeps_scrapy_transport(crawler_settings):
+    settings = crawler_settings("default")
+    assert settings.getint("DOWNLOAD_TIMEOUT") == 180
+    assert settings.getint("DOWNLOAD_MAXSIZE") == 1024 * 1024 * 1024
+    assert settings.getwithbase("DOWNLOAD_HANDLERS")["https"] == DOWNLOAD_HANDLERS_BASE["https"]
+
+
+@pytest.mark.parametrize("profile", ["limits", "http2"])
+def test_profiles_set_download_limits_and_keep_project_settings(crawler_settings, profile):
+    settings = crawler_settings(profile)
+    assert settings.getint("DOWNLOAD_TIMEOUT") == 30
+    assert settings.getint("DOWNLOAD_MAXSIZE") == 16 * 1024 * 1024
+    assert settings.getint("DOWNLOAD_WARNSIZE") == 4 * 1024 * 1024
+    assert settings.getint("DNS_TIMEOUT") == 10
+    # Project settings and the content encodings of HttpCompressionMiddleware stay as they are
+    assert settings.getfloat("DOWNLOAD_DELAY") == 3
+    assert settings.getint("CONCURRENT_REQUESTS_PER_DOMAIN") == 8
+    assert "Accept-Encoding" not in settings.getdict("DEFAULT_REQUEST_HEADERS")
+    assert settings.getbool("COMPRESSION_ENABLED")
+
+
+def test_http2_profile_only_replaces_the_https_handler(crawler_settings):
+    handlers = crawler_settings("http2").getwithbase("DOWNLOAD_HANDLERS")
+    assert handlers["https"] == H2_HANDLER
+    assert handlers["http"] == DOWNLOAD_HANDLERS_BASE["http"]
+
+
+def test_dictionary_settings_are_merged():
+    current = {"DOWNLOAD_HANDLERS": {"ftp": None}}
+    merged = transport_settings("http2", current)
+    assert merged["DOWNLOAD_HANDLERS"] == {"ftp": None, "https": H2_HANDLER}
+
+
+def test_unknown_profile():
+    with pytest.raises(ValueError):
+        transport_settings("quic", {})
@@ -0,0 +1,218 @@
+import copy
+import itertools
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import pytest
+
+from work_queue import LeaseLost, LeaseQueue
+
+OPERATORS = {
+    "$lt": lambda value, bound: value is not None and value < bound,
+    "$gte": lambda value, bound: value is not None and value >= bound,
+    "$in": lambda value, bound: value in bound,
+}
+
+
+def matches(doc, query):
+    for key, condition in query.items():
+        if key == "$or":
+            if not any(matches(doc, sub) for sub in condition):
+                return False
+        elif isinstance(condition, dict):
+            if not all(OPERATORS[op](doc.get(key), bound) for op, bound in condition.items()):
+                return False
+        elif doc.get(key) != condition:
+            return False
+    return True
+
+
+def apply_update(doc, update, insert=False):
+    for key, value in update.get("$set", {}).items():
+        doc[key] = value
+    for key, value in update.get("$inc", {}).items():
+        doc[key] = doc.get(key, 0) + value
+    for key in update.get("$unset", {}):
+        doc.pop(key, None)
+    if insert:
+        doc.update(update.get("$setOnInsert", {}))
+
+
+class FakeCollection:
+    """Supports the queries and updates of the lease queue in memory."""
+
+    def __init__(self):
+        self.docs = []
+        self.ids = itertools.count()
+
+    def create_index(self, keys, **kwargs):
+        pass
+
+    def find_one(self, query):
+        return next((copy.deepcopy(doc) for doc in self.docs if matches(doc, query)), None)
+
+    def bulk_write(self, ops, ordered=True):
+        upserted = 0
+        for op in ops:
+            if not self.update_one(op._filter, op._doc, upsert=op._upsert).matched_count:
+                upserted += 1
+        return SimpleNamespace(upserted_count=upserted)
+
+    def update_one(self, query, update, upsert=False):
+        doc = next((doc for doc in self.docs if matches(doc, query)), None)
+        if doc is not None:
+            apply_update(doc, update)
+        elif upsert:
+            doc = {"_id": next(self.ids), **query}
+            apply_update(doc, update, insert=True)
+            self.docs.append(doc)
+            return SimpleNamespace(matched_count=0)
+        return SimpleNamespace(matched_count=int(doc is not None))
+
+    def update_many(self, query, update):
+        docs = [doc for doc in self.docs if matches(doc, query)]
+        for doc in docs:
+            apply_update(doc, update)
+        return SimpleNamespace(matched_count=len(docs), modified_count=len(docs))
+
+    def find_one_and_update(self, query, update, sort, return_document):
+        docs = [doc for doc in self.docs if matches(doc, query)]
+        if not docs:
+            return None
+        doc = min(docs, key=lambda doc: tuple(doc[key] for key, _ in sort))
+        apply_update(doc, update)
+        return copy.deepcopy(doc)
+
+    def aggregate(self, pipeline):
+        counts = {}
+        for doc in self.docs:
+            if matches(doc, pipeline[0]["$match"]):
+                counts[doc["status"]] = counts.get(doc["status"], 0) + 1
+        return [{"_id": status, "count": count} for status, count in counts.items()]
+
+
+@pytest.fixture
+def client():
+    collection = FakeCollection()
+    return {"Jobliste": {"scrape_tasks": collection}}
+
+
+def make_queue(client, worker_id, **kwargs):
+    return LeaseQueue(client, batch="2025-01-31", worker_id=worker_id, **kwargs)
+
+
+def expire(queue, task):
+    queue.collection.update_one(
+        {"_id": task["_id"]}, {"$set": {"lease_expires": datetime.now(timezone.utc) - timedelta(seconds=1)}}
+    )
+
+
+def status(queue, task):
+    return queue.collection.find_one({"_id": task["_id"]})["status"]
+
+
+def test_seed_is_idempotent(client):
+    queue = make_queue(client, "a")
+    assert queue.seed(["data analyst", "data scientist"], ["indeed", "stepstone"]) == 4
+    assert make_queue(client, "b").seed(["data analyst", "data scientist"], ["indeed", "stepstone"]) == 0
+    assert queue.stats() == {"pending": 4}
+
+
+def test_claim_prefers_tasks_with_fewer_attempts(client):
+    queue = make_queue(client, "a")
+    queue.seed(["first", "second"], ["indeed"])
+    task = queue.claim()
+    assert task["title"] == "first" and task["attempts"] == 1
+    queue.fail(task, RuntimeError("blocked"))
+
+    assert queue.claim()["title"] == "second"
+    retried = queue.claim()
+    assert retried["title"] == "first" and retried["attempts"] == 2
+    assert queue.claim() is None
+
+
+def test_claim_filters_sources(client):
+    queue = make_queue(client, "a")
+    queue.seed(["data analyst"], ["indeed", "stepstone"])
+    assert queue.claim(["stepstone"])["source"] == "stepstone"
+    assert queue.claim(["stepstone"]) is None
+
+
+def test_expired_lease_is_claimed_by_another_worker(client):
+    first, second = make_queue(client, "a"), make_queue(client, "b")
+    first.seed(["data analyst"], ["indeed"])
+    task = first.claim()
+    assert second.claim() is None
+
+    expire(first, task)
+    reclaimed = second.claim()
+    assert reclaimed["_id"] == task["_id"] and reclaimed["attempts"] == 2
+    assert not first.heartbeat(task)
+    assert second.heartbeat(reclaimed)
+
+    # The old owner can no longer complete the task
+    first.complete(task)
+    assert status(first, task) == "leased"
+    second.complete(reclaimed)
+    assert status(first, task) == "done"
+
+
+def test_lease_expired_on_the_last_attempt_fails_the_task(client):
+    queue = make_queue(client, "a", max_attempts=1)
+    queue.seed(["data analyst"], ["indeed"])
+    task = queue.claim()
+    expire(queue, task)
+    assert queue.claim() is None
+    assert status(queue, task) == "failed"
+    assert queue.stats() == {"failed": 1}
+
+
+def test_fail_releases_the_task_until_the_attempts_are_used_up(client):
+    queue = make_queue(client, "a", max_attempts=2)
+    queue.seed(["data analyst"], ["indeed"])
+    task = queue.claim()
+    queue.fail(task, RuntimeError("blocked"))
+    assert status(queue, task) == "pending"
+
+    task = queue.claim()
+    queue.fail(task, RuntimeError("blocked again"))
+    stored = queue.collection.find_one({"_id": task["_id"]})
+    assert stored["status"] == "failed" and stored["last_error"] == "blocked again"
+    assert queue.claim() is None
+
+
+def test_heartbeat_renews_the_lease(client):
+    queue = make_queue(client, "a", lease_seconds=60)
+    queue.seed(["data analyst"], ["indeed"])
+    task = queue.claim()
+    expire(queue, task)
+    assert queue.heartbeat(task)
+    lease_expires = queue.collection.find_one({"_id": task["_id"]})["lease_expires"]
+    assert lease_expires > datetime.now(timezone.utc) + timedelta(seconds=50)
+
+
+def test_leased_completes_or_releases_the_task(client):
+    queue = make_queue(client, "a")
+    queue.seed(["first", "second"], ["indeed"])
+    with queue.leased(queue.claim()) as lease:
+        done = lease.task
+    assert status(queue, done) == "done"
+
+    task = queue.claim()
+    with pytest.raises(RuntimeError):
+        with queue.leased(task):
+            raise RuntimeError("blocked")
+    assert status(queue, task) == "pending"
+
+
+def test_lost_lease_stops_the_worker_and_is_not_completed(client):
+    queue = make_queue(client, "a", lease_seconds=0.3)
+    queue.seed(["data analyst"], ["indeed"])
+    task = queue.claim()
+    with pytest.raises(LeaseLost):
+        with queue.leased(task) as lease:
+            # Another worker took the task over after the lease expired
+            queue.collection.update_one({"_id": task["_id"]}, {"$set": {"owner": "b"}})
+            assert lease.lost.wait(2)
+    stored = queue.collection.find_one({"_id": task["_id"]})
+    assert stored["status"] == "leased" and stored["owner"] == "b"
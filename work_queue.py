@@ -0,0 +1,263 @@
+import os
+import socket
+import threading
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+
+from pymongo import ASCENDING, ReturnDocument, UpdateOne
+
+"""
+This module provides a MongoDB-backed lease queue, so several containers can share the job-title list.
+
+Every (source, job title) pair of a batch is a task document in the collection "scrape_tasks" of the
+"Jobliste" database. Workers claim tasks atomically with `find_one_and_update`; a claim is a lease that
+expires unless the worker renews it with heartbeats. Tasks of crashed workers become claimable again after
+their lease expired, and every claim counts as an attempt until `max_attempts` is reached. A task that fails or
+whose lease expires on its last attempt is marked as failed, so the batch always finishes. A worker that loses a
+lease (e.g. its heartbeats were delayed and another worker claimed the task) is told to stop via `Lease.lost` and
+does not complete the task.
+
+Task document::
+
+    {"batch": "2025-01-31", "source": "indeed", "title": "data analyst", "status": "pending|leased|done|failed",
+     "attempts": 1, "owner": "<host>-<uuid>", "lease_expires": <datetime>, "last_error": "..."}
+
+Configuration:
+- `QUEUE_MODE=1` makes run_scrapers_parallel.py take its work from the queue.
+- `QUEUE_BATCH` names the batch shared by all containers of a run (default: the current UTC date).
+- `QUEUE_LEASE_SECONDS` and `QUEUE_MAX_ATTEMPTS` tune lease duration and retries.
+"""
+
+
+class LeaseLost(Exception):
+    """Raised when a worker lost the lease of a task while processing it."""
+
+
+class Lease:
+    """
+    The lease of a claimed task while it is processed (see `LeaseQueue.leased`).
+
+    :ivar task: The claimed task document.
+    :ivar lost: A threading.Event that is set when a heartbeat finds the lease taken over; the worker should stop
+        processing the task.
+    """
+
+    def __init__(self, task):
+        self.task = task
+        self.lost = threading.Event()
+
+
+class LeaseQueue:
+    """
+    A lease-based work queue of (source, job title) tasks in MongoDB.
+
+    :ivar collection: The MongoDB collection holding the task documents.
+    :ivar batch: The name of the batch shared by all workers of a run.
+    :ivar worker_id: The unique ID of this worker, stored as owner of its leases.
+    :ivar lease_seconds: The lease duration; heartbeats renew it.
+    :ivar max_attempts: How often a task is claimed before it is marked as failed.
+    """
+
+    def __init__(self, client, batch=None, lease_seconds=None, max_attempts=None, worker_id=None):
+        """
+        Initialize the queue and ensure its indexes.
+
+        :param client: The MongoDB client instance.
+        :param batch: The batch name; defaults to `QUEUE_BATCH` or the current UTC date.
+        :param lease_seconds: The lease duration; defaults to `QUEUE_LEASE_SECONDS` or 900.
+        :param max_attempts: The maximum number of attempts; defaults to `QUEUE_MAX_ATTEMPTS` or 3.
+        :param worker_id: The worker ID; defaults to the host name with a random suffix.
+        """
+        self.collection = client["Jobliste"]["scrape_tasks"]
+        self.batch = batch or os.getenv("QUEUE_BATCH") or datetime.now(timezone.utc).strftime("%Y-%m-%d")
+        self.lease_seconds = lease_seconds or int(os.getenv("QUEUE_LEASE_SECONDS", 900))
+        self.max_attempts = max_attempts or int(os.getenv("QUEUE_MAX_ATTEMPTS", 3))
+        self.worker_id = worker_id or f"{socket.gethostname()}-{uuid.uuid4().hex[:8]}"
+
+        self.collection.create_index(
+            [("batch", ASCENDING), ("source", ASCENDING), ("title", ASCENDING)], unique=True
+        )
+        self.collection.create_index([("batch", ASCENDING), ("status", ASCENDING), ("lease_expires", ASCENDING)])
+
+    def seed(self, job_titles, sources):
+        """
+        Create the tasks of the batch for all job titles and sources.
+
+        Seeding is idempotent: every container may seed the same batch, existing tasks are left untouched.
+
+        :param job_titles: The job titles to scrape.
+        :param sources: The sources to scrape (e.g. ["indeed", "stepstone"]).
+        :return: The number of newly created tasks.
+        """
+        now = datetime.now(timezone.utc)
+        ops = [
+            UpdateOne(
+                {"batch": self.batch, "source": source, "title": title},
+                {"$setOnInsert": {"status": "pending", "attempts": 0, "created_at": now}},
+                upsert=True,
+            )
+            for title in job_titles
+            for source in sources
+        ]
+        if not ops:
+            return 0
+        return self.collection.bulk_write(ops, ordered=False).upserted_count
+
+    def claim(self, sources=None):
+        """
+        Atomically claim the next pending task or a task whose lease expired.
+
+        :param sources: Optional list of sources this worker can handle.
+        :return: The claimed task document, or None if no task is available.
+        """
+        now = datetime.now(timezone.utc)
+        self.fail_exhausted(now)
+        query = {
+            "batch": self.batch,
+            "attempts": {"$lt": self.max_attempts},
+            "$or": [
+                {"status": "pending"},
+                {"status": "leased", "lease_expires": {"$lt": now}},
+            ],
+        }
+        if sources:
+            query["source"] = {"$in": list(sources)}
+        return self.collection.find_one_and_update(
+            query,
+            {
+                "$set": {
+                    "status": "leased",
+                    "owner": self.worker_id,
+                    "claimed_at": now,
+                    "lease_expires": now + timedelta(seconds=self.lease_seconds),
+                },
+                "$inc": {"attempts": 1},
+            },
+            sort=[("attempts", ASCENDING), ("_id", ASCENDING)],
+            return_document=ReturnDocument.AFTER,
+        )
+
+    def fail_exhausted(self, now=None):
+        """
+        Mark tasks as failed whose lease expired on their last attempt (e.g. the worker crashed).
+
+        :param now: The current time; defaults to now.
+        :return: The number of tasks marked as failed.
+        """
+        now = now or datetime.now(timezone.utc)
+        result = self.collection.update_many(
+            {
+                "batch": self.batch,
+                "status": "leased",
+                "lease_expires": {"$lt": now},
+                "attempts": {"$gte": self.max_attempts},
+            },
+            {
+                "$set": {"status": "failed", "last_error": "lease expired on the last attempt"},
+                "$unset": {"lease_expires": ""},
+            },
+        )
+        return result.modified_count
+
+    def heartbeat(self, task):
+        """
+        Renew the lease of a task held by this worker.
+
+        :param task: The claimed task document.
+        :return: True if the lease is still held, False if it was lost (e.g. expired and claimed by another worker).
+        """
+        result = self.collection.update_one(
+            {"_id": task["_id"], "owner": self.worker_id, "status": "leased"},
+            {"$set": {"lease_expires": datetime.now(timezone.utc) + timedelta(seconds=self.lease_seconds)}},
+        )
+        return result.matched_count == 1
+
+    def complete(self, task):
+        """
+        Mark a task held by this worker as done.
+
+        :param task: The claimed task document.
+        """
+        self.collection.update_one(
+            {"_id": task["_id"], "owner": self.worker_id},
+            {"$set": {"status": "done", "finished_at": datetime.now(timezone.utc)}, "$unset": {"lease_expires": ""}},
+        )
+
+    def fail(self, task, error):
+        """
+        Release a failed task: it becomes pending again, or failed once all attempts are used up.
+
+        :param task: The claimed task document.
+        :param error: The error that occurred.
+        """
+        status = "failed" if task.get("attempts", 0) >= self.max_attempts else "pending"
+        self.collection.update_one(
+            {"_id": task["_id"], "owner": self.worker_id},
+            {"$set": {"status": status, "last_error": str(error)}, "$unset": {"lease_expires": ""}},
+        )
+
+    @contextmanager
+    def leased(self, task):
+        """
+        Keep the lease of a task alive while it is processed.
+
+        A heartbeat thread renews the lease every third of the lease duration. The task is completed when the
+        block finishes and released via `fail` if it raises. If a heartbeat loses the lease, `Lease.lost` is set
+        and the task is neither completed nor released, because another worker owns it now.
+
+        :param task: The claimed task document.
+        :return: A context manager yielding the Lease of the task.
+        :raises LeaseLost: If the block finished after the lease was lost.
+        """
+        lease = Lease(task)
+        stop = threading.Event()
+
+        def beat():
+            while not stop.wait(self.lease_seconds / 3):
+                if not self.heartbeat(task):
+                    print(f"⚠️ Lease verloren: {task['source']} / {task['title']}")
+                    lease.lost.set()
+                    return
+
+        thread = threading.Thread(target=beat, daemon=True)
+        thread.start()
+        try:
+            yield lease
+        except Exception as e:
+            stop.set()
+            thread.join()
+            if not lease.lost.is_set():
+                self.fail(task, e)
+            raise
+        else:
+            stop.set()
+            thread.join()
+            if lease.lost.is_set():
+                raise LeaseLost(f"Lease of {task['source']} / {task['title']} was lost")
+            self.complete(task)
+        finally:
+            stop.set()
+
+    def tasks(self, sources=None):
+        """
+        Claim tasks until the batch has no more available work.
+
+        :param sources: Optional list of sources this worker can handle.
+        :return: A generator of claimed task documents.
+        """
+        while True:
+            task = self.claim(sources)
+            if task is None:
+                return
+            yield task
+
+    def stats(self):
+        """
+        Count the tasks of the batch per status.
+
+        :return: A dictionary mapping status to number of tasks.
+        """
+        self.fail_exhausted()
+        pipeline = [{"$match": {"batch": self.batch}}, {"$group": {"_id": "$status", "count": {"$sum": 1}}}]
+        return {row["_id"]: row["count"] for row in self.collection.aggregate(pipeline)}